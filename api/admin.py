@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils.translation import ngettext
 from .models import TeamMember, Contact, Testimonial, ContactFAQ, MembershipFAQ
 
 
@@ -30,6 +31,7 @@ class ContactAdmin(admin.ModelAdmin):
     search_fields = ("first_name", "last_name", "email", "message")
     readonly_fields = ("created_at", "updated_at")
     list_editable = ("responded",)
+    actions = ["mark_responded"]
     fieldsets = (
         (
             "Contact Information",
@@ -43,6 +45,19 @@ class ContactAdmin(admin.ModelAdmin):
         ),
     )
 
+    @admin.action(description="Mark selected submissions as responded")
+    def mark_responded(self, request, queryset):
+        updated = queryset.mark_responded()
+        self.message_user(
+            request,
+            ngettext(
+                "%d submission was marked as responded.",
+                "%d submissions were marked as responded.",
+                updated,
+            )
+            % updated,
+        )
+
 
 @admin.register(Testimonial)
 class TestimonialAdmin(admin.ModelAdmin):
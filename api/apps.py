@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import checks, registry, signals  # noqa: F401
+        from .instrumentation import install_query_counting
+
+        install_query_counting()
@@ -0,0 +1,120 @@
+"""
+Async read path of the public viewsets, for ASGI deployments.
+
+Under ASGI, Django runs a sync view with ``sync_to_async`` on a thread of its
+request, which is held for the whole of DRF's dispatch, rendering included.
+With ``API_ASYNC_VIEWS``, viewsets using ``AsyncReadMixin`` are routed to an
+async view answering list and retrieve requests without the sync view when
+they can be served from what is already known:
+
+* responses found in the response cache (see ``CachedResponseMixin``), read
+  with Django's async cache methods,
+* conditional retrieve requests matching the validators of the detail (see
+  ``ConditionalGetMixin``), fingerprinted through the async ORM.
+
+Authentication, permissions and throttles run first, as in the sync view,
+in a thread since throttle stores block on I/O.
+Everything else, cache misses included, is handed to the regular sync view,
+as are requests with an ``Authorization`` header, whose token or basic
+authentication would query the user table.
+
+Django 5.2's cache backends and database backends are sync, and their async
+methods still run them in a thread, so the async path saves DRF's dispatch
+rather than the thread hops: bench_asgi measures whether it pays off.
+"""
+
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+
+ASYNC_ACTIONS = ("list", "retrieve")
+
+
+def plain_response(response):
+    """
+    Render a DRF response into a plain ``HttpResponse``: Django renders
+    responses with a ``render`` method on the sync thread.
+    """
+    if not hasattr(response, "render"):
+        return response
+    response.render()
+    return HttpResponse(
+        response.content, status=response.status_code, headers=dict(response.items())
+    )
+
+
+class AsyncReadMixin:
+    """
+    Viewset mixin routing list and retrieve requests through an async view
+    when ``API_ASYNC_VIEWS`` is set. The viewset must also use
+    ``CachedResponseMixin``.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not getattr(settings, "API_ASYNC_VIEWS", False):
+            return view
+        return cls.as_async_view(view)
+
+    @classmethod
+    def as_async_view(cls, view):
+        """Wrap the sync ``view`` returned by ``as_view`` in an async view."""
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            action = view.actions.get("get")
+            if request.method in ("GET", "HEAD") and action in ASYNC_ACTIONS:
+                response = await cls.async_read(view, action, request, args, kwargs)
+                if response is not None:
+                    return response
+            return await sync_view(request, *args, **kwargs)
+
+        # Keeps cls, actions and csrf_exempt for the resolver and middleware
+        return update_wrapper(async_view, view)
+
+    @classmethod
+    async def async_read(cls, view, action, request, args, kwargs):
+        """
+        Return the response to a read request if it needs no query, otherwise
+        None, once the request has been authenticated and throttled.
+        """
+        if "HTTP_AUTHORIZATION" in request.META:
+            return None
+        auser = getattr(request, "auser", None)
+        # Resolved here, so that SessionAuthentication does not query it
+        request.user = await auser() if auser else AnonymousUser()
+
+        self = cls(**view.initkwargs)
+        self.action_map = view.actions
+        self.args = args
+        self.kwargs = kwargs
+        self.request = self.initialize_request(request, *args, **kwargs)
+        self.action = action
+        self.headers = self.default_response_headers
+        try:
+            # Throttle stores and authentication may block on I/O
+            await sync_to_async(self.initial)(self.request, *args, **kwargs)
+            # The sync view taking over must not count the request twice
+            request.api_throttles_checked = True
+            response = await self.acached_response(self.request, action)
+            if response is None and action == "retrieve":
+                response = await self.anot_modified_detail(self.request)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        if response is None:
+            return None
+        response = self.finalize_response(self.request, response, *args, **kwargs)
+        return plain_response(response)
+
+    async def acached_response(self, request, name):
+        if name == "retrieve" and not self.cache_retrieve:
+            return None
+        return await super().acached_response(request, name)
+
+    def check_throttles(self, request):
+        if not getattr(request._request, "api_throttles_checked", False):
+            super().check_throttles(request)
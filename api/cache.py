@@ -0,0 +1,93 @@
+"""
+Per-model version counters for response caching.
+
+Cached responses are keyed by the current version of every model they are
+built from. Saving or deleting a tracked model (or changing a tracked
+many-to-many relation) bumps its version, so stale entries are never read
+again and simply expire from the cache.
+
+Inside a transaction the version is bumped again once it commits: other
+requests still read the old rows until then, and may cache them under the
+version bumped by the write.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+VERSION_KEY_PREFIX = "api:version:"
+
+
+def version_key(model):
+    return f"{VERSION_KEY_PREFIX}{model._meta.label_lower}"
+
+
+def initial_version():
+    # Start from the clock so that a counter evicted from the cache never
+    # comes back with a value that was already used in a cache key
+    return time.time_ns()
+
+
+def get_versions(models):
+    """Return the current version of each model, in order."""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(models):
+    """``get_versions`` for async views."""
+    keys = [version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, initial_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, initial_version(), timeout=None)
+
+
+def bump_version_on_commit(model, using=None):
+    """
+    Bump the version of ``model`` now, for the reads of the writing
+    transaction, and again when it commits.
+    """
+    bump_version(model)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: bump_version(model), using=using)
+
+
+def _bump_sender(sender, using=None, **kwargs):
+    bump_version_on_commit(sender, using)
+
+
+def _bump_m2m_sender(sender, action, using=None, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_version_on_commit(sender, using)
+
+
+def track_versions(*models):
+    """
+    Bump the version of each model whenever one of its rows changes.
+    Auto-created through models are tracked through ``m2m_changed``.
+    """
+    for model in models:
+        uid = f"api.cache:{model._meta.label_lower}"
+        if model._meta.auto_created:
+            m2m_changed.connect(_bump_m2m_sender, sender=model, dispatch_uid=uid)
+        else:
+            post_save.connect(_bump_sender, sender=model, dispatch_uid=uid)
+            post_delete.connect(_bump_sender, sender=model, dispatch_uid=uid)
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+def uses_local_memory_cache():
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+@register(Tags.caches, deploy=True)
+def check_response_cache(app_configs, **kwargs):
+    if not uses_local_memory_cache():
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process, so cached API "
+            "responses are only invalidated in the worker that saved the "
+            "change.",
+            hint=(
+                "Set CACHE_BACKEND to a shared backend (Redis or memcached) "
+                "when running several worker processes."
+            ),
+            id="api.W001",
+        )
+    ]
+
+
+@register(Tags.caches, deploy=True)
+def check_throttle_store(app_configs, **kwargs):
+    if getattr(settings, "API_THROTTLE_STORE", "cache") != "cache":
+        return []
+    if not uses_local_memory_cache():
+        return []
+    return [
+        Warning(
+            "API throttles count requests in the default cache, which is local "
+            "to each process: every worker allows the full rate.",
+            hint=(
+                "Use a shared cache backend, or set API_THROTTLE_STORE to "
+                '"sqlite" for the workers of a single host.'
+            ),
+            id="api.W002",
+        )
+    ]
@@ -0,0 +1,139 @@
+"""
+Read-only fast path for list serializers.
+
+``ValuesSerializer`` renders the same dicts as a model serializer's list
+output, but from ``.values()`` rows: model instances are never built, and
+each field is compiled once per request into a getter reading its column(s)
+from the row. Plain model fields reuse the DRF field's ``to_representation``,
+so formatting (datetimes, decimals, choices) stays identical.
+
+Fields that cannot be read from a row (nested serializers, method fields
+without a ``get_<name>_getter`` on the subclass) make the serializer
+unsupported, and views fall back to the regular serializer.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .images import build_srcset, metadata_field
+from .serializers import ImageSrcsetField
+from .storage import MediaURLBuilder
+
+
+def column_getter(column, convert=None):
+    """Getter of one column, converted unless it is None."""
+    if convert is None:
+        return lambda row: row[column]
+
+    def get(row):
+        value = row[column]
+        return None if value is None else convert(value)
+
+    return get
+
+
+def datetime_converter(field):
+    """
+    ``DateTimeField.to_representation`` of aware datetimes in ISO 8601, with
+    the field's timezone resolved once.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = getattr(field, "timezone", None) or field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def converter(field):
+    """Return the fastest equivalent of ``field.to_representation``."""
+    to_representation = type(field).to_representation
+    if to_representation is serializers.CharField.to_representation:
+        return str
+    if to_representation is serializers.IntegerField.to_representation:
+        return int
+    if to_representation is serializers.DateTimeField.to_representation:
+        return datetime_converter(field)
+    return field.to_representation
+
+
+class ValuesSerializer:
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.request = serializer.context.get("request")
+        self.columns = []
+        self.getters = []
+        self.supported = True
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            compiled = self.compile(name, field)
+            if compiled is None:
+                self.supported = False
+                break
+            columns, getter = compiled
+            self.columns.extend(c for c in columns if c not in self.columns)
+            self.getters.append((name, getter))
+
+    def compile(self, name, field):
+        """Return ``(columns, getter)`` for ``field``, or None if unsupported."""
+        custom = getattr(self, f"get_{name}_getter", None)
+        if custom is not None:
+            return custom(field)
+        if isinstance(field, ImageSrcsetField):
+            return self.srcset_getter(field.image_field)
+        if "." in field.source:
+            return None
+
+        source = field.source
+        if source.startswith("get_") and source.endswith("_display"):
+            source = source[len("get_") : -len("_display")]
+            display = True
+        else:
+            display = False
+        try:
+            model_field = self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        column = model_field.attname
+
+        if display:
+            choices = dict(model_field.flatchoices)
+            return [column], column_getter(
+                column, lambda value: field.to_representation(choices.get(value, value))
+            )
+        if isinstance(field, serializers.ImageField):
+            urls = MediaURLBuilder.for_request(self.request, model_field.storage)
+            if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+                return [column], lambda row: row[column] or None
+            return [column], lambda row: urls.url(row[column])
+        if isinstance(field, serializers.ReadOnlyField):
+            return [column], column_getter(column)
+        return [column], column_getter(column, converter(field))
+
+    def srcset_getter(self, image_field):
+        storage = self.model._meta.get_field(image_field).storage
+        urls = MediaURLBuilder.for_request(self.request, storage)
+        metadata = metadata_field(image_field)
+        return [image_field, metadata], lambda row: build_srcset(
+            row[image_field], row[metadata], urls
+        )
+
+    def to_representation(self, row):
+        return {name: getter(row) for name, getter in self.getters}
+
+    def render(self, rows):
+        getters = self.getters
+        return [{name: getter(row) for name, getter in getters} for row in rows]
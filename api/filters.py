@@ -0,0 +1,18 @@
+from django_filters import rest_framework as filters
+
+from .models import Contact
+
+
+class ContactFilter(filters.FilterSet):
+    """Filters of the contact inbox, including a ``created_at`` range."""
+
+    created_after = filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="gte"
+    )
+    created_before = filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="lt"
+    )
+
+    class Meta:
+        model = Contact
+        fields = ["inquiry_type", "responded", "created_after", "created_before"]
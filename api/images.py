@@ -0,0 +1,180 @@
+"""
+Responsive derivatives of uploaded images.
+
+Registered image fields get resized copies at ``IMAGE_DERIVATIVE_WIDTHS`` in
+every ``IMAGE_DERIVATIVE_FORMATS`` once an upload is committed. The copies are
+generated by a pool of ``IMAGE_DERIVATIVE_WORKERS`` threads (Pillow releases
+the GIL while resizing and encoding) and stored next to the original as
+``<dir>/derivatives/<name>-<width>w.<ext>``, or whatever name the storage
+picks for that (see api.storage).
+
+The stored names are recorded in the model's ``<field>_derivatives`` JSON
+field together with the original file name, so serializers can build
+``srcset`` values without touching the storage, and a replaced upload never
+advertises the derivatives of the previous one. Images uploaded before a
+field was registered are processed by the ``generate_image_derivatives``
+command.
+"""
+
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_version_on_commit
+from .storage import HASHED_NAME_RE
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+# Sent with the model as sender and the ``pk`` whose derivatives were stored
+derivatives_generated = Signal()
+
+_registry = {}
+_executor = None
+
+
+def derivative_widths():
+    return sorted(getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", [320, 640, 1280]))
+
+
+def derivative_formats():
+    return list(getattr(settings, "IMAGE_DERIVATIVE_FORMATS", ["webp", "jpeg"]))
+
+
+def derivative_name(name, width, image_format):
+    directory, filename = posixpath.split(name)
+    # Derivatives get their own content hash from a hashing storage
+    stem = posixpath.splitext(HASHED_NAME_RE.sub("", filename))[0]
+    return posixpath.join(
+        directory, "derivatives", f"{stem}-{width}w.{EXTENSIONS[image_format]}"
+    )
+
+
+def metadata_field(field_name):
+    return f"{field_name}_derivatives"
+
+
+def register(model, field_name="image"):
+    """Generate derivatives of ``field_name`` whenever a new file is saved."""
+    _registry[model] = field_name
+    post_save.connect(
+        _image_saved,
+        sender=model,
+        dispatch_uid=f"api.images:{model._meta.label_lower}",
+    )
+
+
+def registered_models():
+    return dict(_registry)
+
+
+def needs_derivatives(instance, field_name):
+    name = getattr(instance, field_name).name
+    metadata = getattr(instance, metadata_field(field_name)) or {}
+    return bool(name) and metadata.get("name") != name
+
+
+def _image_saved(sender, instance, raw=False, **kwargs):
+    field_name = _registry[sender]
+    if raw or not needs_derivatives(instance, field_name):
+        return
+    name = getattr(instance, field_name).name
+    transaction.on_commit(lambda: schedule(sender, instance.pk, name))
+
+
+def schedule(model, pk, name):
+    """Generate derivatives in the worker pool, or inline without workers."""
+    global _executor
+    workers = getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 2)
+    if not workers:
+        return generate(model, pk, name)
+    if _executor is None:
+        _executor = ThreadPoolExecutor(workers, thread_name_prefix="derivatives")
+    return _executor.submit(_generate_in_thread, model, pk, name)
+
+
+def _generate_in_thread(model, pk, name):
+    try:
+        return generate(model, pk, name)
+    except Exception:
+        logger.exception("Could not generate derivatives of %s", name)
+    finally:
+        connections.close_all()
+
+
+def render(image, width, image_format):
+    resized = image.copy()
+    resized.thumbnail((width, width * 100), Image.Resampling.LANCZOS)
+    if image_format == "jpeg" and resized.mode not in ("RGB", "L"):
+        resized = resized.convert("RGB")
+    buffer = BytesIO()
+    quality = getattr(settings, "IMAGE_DERIVATIVE_QUALITY", 80)
+    resized.save(buffer, image_format.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def generate(model, pk, name):
+    """
+    Store the derivatives of the file ``name`` of row ``pk`` and record them,
+    unless the row got another file in the meantime. Returns the widths.
+    """
+    field_name = _registry[model]
+    storage = model._meta.get_field(field_name).storage
+    with storage.open(name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    # Never upscale: widths from the original's up are left out
+    widths = [width for width in derivative_widths() if width < image.width]
+    files = {}
+    for image_format in derivative_formats():
+        files[image_format] = []
+        for width in widths:
+            path = derivative_name(name, width, image_format)
+            if storage.exists(path):
+                storage.delete(path)
+            files[image_format].append(
+                storage.save(path, ContentFile(render(image, width, image_format)))
+            )
+
+    changes = {
+        metadata_field(field_name): {"name": name, "widths": widths, "files": files}
+    }
+    if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+        changes["updated_at"] = timezone.now()
+    updated = model._default_manager.filter(pk=pk, **{field_name: name}).update(
+        **changes
+    )
+    if updated:
+        # update() sends no post_save, so cached responses are expired here
+        bump_version_on_commit(model)
+        derivatives_generated.send(sender=model, pk=pk)
+    return widths
+
+
+def build_srcset(name, metadata, urls):
+    """
+    Return ``{format: srcset}`` for the derivatives recorded in ``metadata``,
+    or an empty dict when the file ``name`` has none (yet). ``urls`` is the
+    ``MediaURLBuilder`` of the request.
+    """
+    if not name or not metadata or metadata.get("name") != name:
+        return {}
+    return {
+        image_format: ", ".join(
+            f"{urls.url(path)} {width}w"
+            for path, width in zip(paths, metadata["widths"])
+        )
+        for image_format, paths in metadata.get("files", {}).items()
+        if paths
+    }
@@ -0,0 +1,175 @@
+"""
+Queued ingestion of contact form submissions.
+
+With ``CONTACT_INGEST_MODE = "queue"`` the contact endpoint validates a
+submission, appends it to a spool file and answers ``202 Accepted`` without
+touching the database. The ``process_contact_queue`` worker later moves the
+spooled submissions into the ``Contact`` table with batched ``bulk_create``
+calls, so a burst of submissions costs a few write transactions instead of one
+per request.
+
+Delivery is at least once: a spool file is deleted only after its rows are
+committed, and a worker that dies half way replays the whole file. Each
+submission carries a unique ``submission_id``, so replayed rows are ignored
+instead of duplicated. Submissions are stamped with ``created_at`` when they
+are stored, not when they were received.
+
+Once the spool holds ``CONTACT_INGEST_MAX_QUEUE_BYTES``, new submissions are
+refused with ``503 Service Unavailable`` and a ``Retry-After`` header until
+the worker catches up.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Contact
+
+logger = logging.getLogger(__name__)
+
+SPOOL_FILE = "current.jsonl"
+BATCH_GLOB = "batch-*.jsonl"
+
+
+class QueueFull(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many submissions are waiting, please retry shortly.")
+    default_code = "queue_full"
+
+    def __init__(self, wait, detail=None, code=None):
+        # DRF's exception handler turns ``wait`` into a Retry-After header
+        self.wait = wait
+        super().__init__(detail, code)
+
+
+def lock_file(handle, blocking):
+    """Lock the open file ``handle``, returning False if it is taken."""
+    if fcntl is not None:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(handle, flags)
+        except BlockingIOError:
+            return False
+        return True
+    # msvcrt locks byte ranges from the current position, and its blocking
+    # mode gives up after ten seconds
+    handle.seek(0)
+    while True:
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.01)
+        else:
+            return True
+
+
+def unlock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ContactQueue:
+    """Append-only spool of validated contact submissions."""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or settings.CONTACT_INGEST_QUEUE_DIR)
+
+    @contextmanager
+    def lock(self, name, blocking=True):
+        """Hold an exclusive lock on ``name``, yielding False if it is taken."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / name, "a") as handle:
+            if not lock_file(handle, blocking):
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                unlock_file(handle)
+
+    def pending_bytes(self):
+        if not self.directory.exists():
+            return 0
+        return sum(path.stat().st_size for path in self.directory.glob("*.jsonl"))
+
+    def put(self, data):
+        """Durably append ``data`` to the spool and return its submission id."""
+        limit = getattr(settings, "CONTACT_INGEST_MAX_QUEUE_BYTES", 64 * 1024 * 1024)
+        if self.pending_bytes() >= limit:
+            raise QueueFull(
+                wait=getattr(settings, "CONTACT_INGEST_RETRY_AFTER", 30)
+            )
+
+        submission_id = str(uuid.uuid4())
+        line = json.dumps({"id": submission_id, "data": data}, cls=DjangoJSONEncoder)
+        with self.lock("spool.lock"):
+            with open(self.directory / SPOOL_FILE, "a", encoding="utf-8") as spool:
+                spool.write(line + "\n")
+                spool.flush()
+                if getattr(settings, "CONTACT_INGEST_FSYNC", True):
+                    os.fsync(spool.fileno())
+        return submission_id
+
+    def rotate(self):
+        """Close the current spool file so that it can be flushed."""
+        with self.lock("spool.lock"):
+            spool = self.directory / SPOOL_FILE
+            if spool.exists() and spool.stat().st_size:
+                spool.rename(self.directory / f"batch-{time.time_ns()}.jsonl")
+
+    def flush(self, batch_size=None):
+        """
+        Store every spooled submission and return how many were read. Returns
+        0 without waiting when another worker is already flushing.
+        """
+        batch_size = batch_size or getattr(settings, "CONTACT_INGEST_BATCH_SIZE", 500)
+        processed = 0
+        with self.lock("worker.lock", blocking=False) as acquired:
+            if not acquired:
+                return 0
+            self.rotate()
+            for path in sorted(self.directory.glob(BATCH_GLOB)):
+                processed += self.store(path, batch_size)
+                path.unlink()
+        return processed
+
+    def store(self, path, batch_size):
+        contacts = []
+        with open(path, encoding="utf-8") as batch:
+            for number, line in enumerate(batch, 1):
+                try:
+                    record = json.loads(line)
+                    contacts.append(
+                        Contact(submission_id=record["id"], **record["data"])
+                    )
+                except (ValueError, KeyError, TypeError):
+                    # A crash while appending can leave a truncated last line
+                    logger.warning("Skipping unreadable line %d of %s", number, path)
+        for start in range(0, len(contacts), batch_size):
+            with transaction.atomic():
+                Contact.objects.bulk_create(
+                    contacts[start : start + batch_size], ignore_conflicts=True
+                )
+        return len(contacts)
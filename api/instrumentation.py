@@ -0,0 +1,239 @@
+"""
+Per-endpoint SQL and timing instrumentation.
+
+``InstrumentationMiddleware`` records, for every request resolved to a view,
+the number of SQL queries and the time spent running them, the time spent
+serializing, the total time and the response size. The numbers are sent in
+a ``Server-Timing`` header as set by ``API_SERVER_TIMING`` (to every client,
+to staff users only with "staff", or to none), and aggregated per endpoint
+("<view>.<action>") in this process for the staff-only stats endpoint.
+
+Queries are counted by an execute wrapper installed on every database
+connection as it opens, which reports to the request running in the current
+context, so the queries of async views, run by Django on another thread,
+are counted as well.
+
+Views can declare a ``query_budget``: a number of queries, or a mapping of
+actions to numbers. Requests going over it are logged, or fail with
+``QueryBudgetExceeded`` when ``API_QUERY_BUDGETS`` is "raise", which the test
+runner (see api.testing) sets so that N+1 regressions fail the test suite.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("api_instrumentation_record", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class Record:
+    """Measurements of one request, called by ``count_query`` for its queries."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+def count_query(execute, sql, params, many, context):
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    return record(execute, sql, params, many, context)
+
+
+def _add_query_counter(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def install_query_counting():
+    """Count the queries of every connection, opened or to be opened."""
+    for connection in connections.all(initialized_only=True):
+        _add_query_counter(connection)
+    connection_created.connect(_add_query_counter, dispatch_uid=__name__)
+
+
+@contextmanager
+def serializing():
+    """Count the time spent in the block as serializer time of the request."""
+    record = _current.get()
+    if record is None or record.serializing:
+        # Not in a request, or nested in an outer serializer
+        yield
+        return
+    record.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.serializer_time += time.perf_counter() - started
+        record.serializing = False
+
+
+class EndpointStats:
+    """Aggregated measurements per endpoint, shared by the process's threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def add(self, endpoint, record, total_time, size, over_budget=False):
+        with self.lock:
+            stats = self.endpoints.setdefault(
+                endpoint,
+                {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_ms": 0.0,
+                    "serializer_ms": 0.0,
+                    "total_ms": 0.0,
+                    "max_total_ms": 0.0,
+                    "bytes": 0,
+                    "over_budget": 0,
+                },
+            )
+            stats["requests"] += 1
+            stats["queries"] += record.queries
+            stats["max_queries"] = max(stats["max_queries"], record.queries)
+            stats["db_ms"] += record.db_time * 1000
+            stats["serializer_ms"] += record.serializer_time * 1000
+            stats["total_ms"] += total_time * 1000
+            stats["max_total_ms"] = max(stats["max_total_ms"], total_time * 1000)
+            stats["bytes"] += size or 0
+            stats["over_budget"] += over_budget
+
+    def snapshot(self):
+        """Return the stats of every endpoint, with per-request averages."""
+        with self.lock:
+            endpoints = {name: dict(stats) for name, stats in self.endpoints.items()}
+        for stats in endpoints.values():
+            requests = stats["requests"]
+            for total in ("queries", "db_ms", "serializer_ms", "total_ms", "bytes"):
+                stats[f"avg_{total}"] = round(stats[total] / requests, 3)
+            for name in ("db_ms", "serializer_ms", "total_ms", "max_total_ms"):
+                stats[name] = round(stats[name], 3)
+        return dict(sorted(endpoints.items()))
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+stats = EndpointStats()
+
+
+def resolve_endpoint(request):
+    """Return ``(endpoint, view_class, action)`` of a resolved request."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None, None, None
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None:
+        return match.view_name or match._func_path, None, None
+    actions = getattr(match.func, "actions", None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f"{view_class.__name__}.{action}", view_class, action
+
+
+def get_query_budget(view_class, action):
+    budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        return budget.get(action)
+    return budget
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, "API_INSTRUMENTATION", True):
+            return self.get_response(request)
+
+        record = Record()
+        token = _current.set(record)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.process(request, response, record, started)
+
+    async def __acall__(self, request):
+        if not getattr(settings, "API_INSTRUMENTATION", True):
+            return await self.get_response(request)
+
+        record = Record()
+        token = _current.set(record)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.process(request, response, record, started)
+
+    def sends_server_timing(self, request):
+        send = getattr(settings, "API_SERVER_TIMING", settings.DEBUG)
+        if send == "staff":
+            user = getattr(request, "user", None)
+            return bool(user and user.is_staff)
+        return bool(send)
+
+    def process(self, request, response, record, started):
+        total_time = time.perf_counter() - started
+        endpoint, view_class, action = resolve_endpoint(request)
+        if endpoint is None:
+            return response
+        size = None if response.streaming else len(response.content)
+        budget = get_query_budget(view_class, action)
+        over_budget = budget is not None and record.queries > budget
+        stats.add(endpoint, record, total_time, size, over_budget)
+
+        if self.sends_server_timing(request):
+            timings = [
+                f'db;dur={record.db_time * 1000:.2f};desc="{record.queries} queries"',
+                f"serializer;dur={record.serializer_time * 1000:.2f}",
+                f"total;dur={total_time * 1000:.2f}",
+            ]
+            response["Server-Timing"] = ", ".join(timings)
+
+        if over_budget:
+            message = (
+                f"{endpoint} ran {record.queries} queries, over its budget of "
+                f"{budget}: {request.get_full_path()}"
+            )
+            if getattr(settings, "API_QUERY_BUDGETS", "warn") == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
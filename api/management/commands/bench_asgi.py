@@ -0,0 +1,253 @@
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.bench_endpoints import benchmarking, percentile
+
+# Server modes, as API_ASYNC_VIEWS values of the worker processes
+MODES = {"wsgi": "0", "asgi-sync": "0", "asgi": "1"}
+
+
+def read_paths():
+    """Return the public list and detail paths served by the benchmark."""
+    from api.models import ContactFAQ, TeamMember, Testimonial
+    from programs.models import Project
+
+    paths = [
+        "/api/team-members/",
+        "/api/testimonials/",
+        "/api/contact-faqs/",
+        "/api/projects/",
+    ]
+    member = TeamMember.objects.filter(is_active=True).order_by("pk").first()
+    if member is not None:
+        paths.append(f"/api/team-members/{member.pk}/")
+    faq = ContactFAQ.objects.filter(is_published=True).order_by("pk").first()
+    if faq is not None:
+        paths.append(f"/api/contact-faqs/{faq.pk}/")
+    testimonial = Testimonial.objects.filter(is_featured=True).order_by("pk").first()
+    if testimonial is not None:
+        paths.append(f"/api/testimonials/{testimonial.pk}/")
+    project = Project.objects.order_by("pk").first()
+    if project is not None:
+        paths.append(f"/api/projects/{project.slug}/")
+    return paths
+
+
+class WSGIClient:
+    """Requests to the WSGI application, one thread per concurrent client."""
+
+    def __init__(self):
+        from django.core.wsgi import get_wsgi_application
+
+        self.application = get_wsgi_application()
+
+    def environ(self, path):
+        return {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": "localhost",
+            "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+
+    def request(self, path):
+        statuses = []
+        result = self.application(
+            self.environ(path), lambda status, headers: statuses.append(status)
+        )
+        try:
+            b"".join(result)
+        finally:
+            result.close()
+        return int(statuses[0].split()[0])
+
+    def run(self, paths, count, concurrency):
+        def client(index):
+            latencies = []
+            statuses = set()
+            for number in range(index, count, concurrency):
+                started = time.perf_counter()
+                statuses.add(self.request(paths[number % len(paths)]))
+                latencies.append(time.perf_counter() - started)
+            return latencies, statuses
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            return list(executor.map(client, range(concurrency)))
+
+
+class ASGIClient:
+    """Requests to the ASGI application, one task per concurrent client."""
+
+    def __init__(self):
+        from django.core.asgi import get_asgi_application
+
+        self.application = get_asgi_application()
+
+    def scope(self, path):
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"localhost")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+
+    async def request(self, path):
+        received = False
+        done = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif not message.get("more_body", False):
+                done.set()
+
+        await self.application(self.scope(path), receive, send)
+        return statuses[0]
+
+    def run(self, paths, count, concurrency):
+        async def client(index):
+            latencies = []
+            statuses = set()
+            for number in range(index, count, concurrency):
+                started = time.perf_counter()
+                statuses.add(await self.request(paths[number % len(paths)]))
+                latencies.append(time.perf_counter() - started)
+            return latencies, statuses
+
+        async def clients():
+            return await asyncio.gather(*(client(i) for i in range(concurrency)))
+
+        return asyncio.run(clients())
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput and latency of the public read endpoints under "
+        "WSGI (one thread per client), ASGI with sync views, and ASGI with the "
+        "async read path (API_ASYNC_VIEWS), at several concurrency levels. "
+        "Each mode runs in its own process against the current database, "
+        "filled beforehand with seed_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--concurrency",
+            default="1,10,50",
+            help="Comma separated numbers of concurrent clients.",
+        )
+        parser.add_argument(
+            "--modes", default=",".join(MODES), help="Comma separated modes."
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--worker", choices=MODES, help="Internal: run one mode.")
+
+    def handle(self, *args, **options):
+        concurrency = [int(level) for level in options["concurrency"].split(",")]
+        if options["worker"]:
+            results = self.run_worker(options["worker"], concurrency, options)
+            self.stdout.write(json.dumps(results))
+            return
+
+        modes = options["modes"].split(",")
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        results = {mode: self.spawn(mode, options) for mode in modes}
+
+        self.stdout.write(
+            f"{'mode':<11}{'clients':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+            "  status"
+        )
+        for mode, levels in results.items():
+            for level in levels:
+                self.stdout.write(
+                    f"{mode:<11}{level['concurrency']:>8}"
+                    f"{level['requests_per_second']:>10.0f}"
+                    f"{level['p50_ms']:>9.2f}{level['p95_ms']:>9.2f}"
+                    f"  {','.join(map(str, level['status']))}"
+                )
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+    def spawn(self, mode, options):
+        env = dict(os.environ, API_ASYNC_VIEWS=MODES[mode])
+        command = [
+            sys.executable,
+            "-m",
+            "django",
+            "bench_asgi",
+            f"--worker={mode}",
+            f"--requests={options['requests']}",
+            f"--concurrency={options['concurrency']}",
+            f"--settings={os.environ['DJANGO_SETTINGS_MODULE']}",
+        ]
+        process = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if process.returncode:
+            raise CommandError(f"The {mode} worker failed:\n{process.stderr}")
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def run_worker(self, mode, concurrency, options):
+        paths = read_paths()
+        client = WSGIClient() if mode == "wsgi" else ASGIClient()
+        results = []
+        with benchmarking():
+            # Fill the response cache, as in a running deployment
+            client.run(paths, len(paths), 1)
+            for level in concurrency:
+                started = time.perf_counter()
+                clients = client.run(paths, options["requests"], level)
+                elapsed = time.perf_counter() - started
+                latencies = [latency for times, _ in clients for latency in times]
+                statuses = set().union(*(status for _, status in clients))
+                results.append(
+                    {
+                        "concurrency": level,
+                        "requests_per_second": round(len(latencies) / elapsed, 1),
+                        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+                        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+                        "status": sorted(statuses),
+                    }
+                )
+        return results
@@ -0,0 +1,92 @@
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.ingest import ContactQueue
+from api.models import Contact
+from api.views import ContactViewSet
+
+BENCH_DOMAIN = "bench.invalid"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare contact submissions per second when saved on the request "
+        "thread and when queued for the process_contact_queue worker. "
+        "Benchmark rows are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--submissions", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--no-fsync",
+            action="store_true",
+            help="Do not fsync the spool after every queued submission.",
+        )
+
+    def handle(self, *args, **options):
+        # Throttling would cap both paths at the anonymous rate
+        self.view = ContactViewSet.as_view({"post": "create"}, throttle_classes=[])
+        self.factory = APIRequestFactory()
+        try:
+            self.compare(options)
+        finally:
+            Contact.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").delete()
+
+    def compare(self, options):
+        total = options["submissions"]
+        direct = self.submit(total, options["threads"])
+        self.report("direct", total, direct)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CONTACT_INGEST_MODE="queue",
+            CONTACT_INGEST_QUEUE_DIR=directory,
+            CONTACT_INGEST_FSYNC=not options["no_fsync"],
+        ):
+            queued = self.submit(total, options["threads"])
+            self.report("queued (accept)", total, queued)
+            started = time.perf_counter()
+            stored = ContactQueue().flush()
+            flushed = time.perf_counter() - started
+            self.report("queued (store)", stored, flushed)
+            self.report("queued (end to end)", stored, queued[0] + flushed)
+
+    def submit(self, total, threads):
+        def post(index):
+            request = self.factory.post(
+                "/api/contact/",
+                {
+                    "first_name": "Bench",
+                    "last_name": f"Submitter{index}",
+                    "email": f"bench{index}@{BENCH_DOMAIN}",
+                    "inquiry_type": "other",
+                    "message": "Benchmark submission " * 10,
+                },
+                format="json",
+            )
+            try:
+                return self.view(request).status_code
+            except DatabaseError:
+                # SQLite gives up with "database is locked" under contention
+                return 500
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            statuses = list(pool.map(post, range(total)))
+        elapsed = time.perf_counter() - started
+        return elapsed, sum(status >= 400 for status in statuses)
+
+    def report(self, label, count, timing):
+        elapsed, failed = timing if isinstance(timing, tuple) else (timing, 0)
+        self.stdout.write(
+            f"{label:<22}{count / elapsed:>10.0f}/s  {elapsed:>8.2f}s"
+            f"  {failed} failed"
+        )
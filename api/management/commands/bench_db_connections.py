@@ -0,0 +1,106 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from api.management.commands.bench_asgi import WSGIClient, read_paths
+from api.management.commands.bench_endpoints import benchmarking, percentile
+
+# (label, CONN_MAX_AGE, CONN_HEALTH_CHECKS, SQLite profile)
+PROFILES = [
+    ("per request", 0, False, "default"),
+    ("per request", 0, False, "tuned"),
+    ("persistent", 60, False, "tuned"),
+    ("persistent", 60, True, "tuned"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of opening database connections: the "
+        "read endpoints are requested through the WSGI handler, with "
+        "connections closed after every request or kept open (with and "
+        "without health checks), and with the SQLite profiles of "
+        "SQLITE_PROFILES. Run it against a database filled with seed_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument(
+            "--connects",
+            type=int,
+            default=200,
+            help="Connections opened to time connection setup alone.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The benchmark compares SQLite connection profiles.")
+        paths = read_paths()
+        client = WSGIClient()
+        settings_dict = connection.settings_dict
+        saved = {
+            key: settings_dict.get(key)
+            for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")
+        }
+        opened = []
+
+        def count_connection(**kwargs):
+            opened.append(kwargs["connection"].alias)
+
+        self.stdout.write(
+            f"{'connections':<13}{'checks':>7}{'profile':>9}{'connect us':>12}"
+            f"{'opened':>8}{'req/s':>8}{'p50 ms':>8}{'p95 ms':>8}"
+        )
+        connection_created.connect(count_connection)
+        try:
+            with benchmarking():
+                for label, max_age, health_checks, profile in PROFILES:
+                    connection.close()
+                    settings_dict.update(
+                        CONN_MAX_AGE=max_age,
+                        CONN_HEALTH_CHECKS=health_checks,
+                        OPTIONS=settings.SQLITE_PROFILES[profile],
+                    )
+                    connect = self.time_connect(options["connects"])
+                    opened.clear()
+                    latencies = self.run_requests(client, paths, options["requests"])
+                    self.stdout.write(
+                        f"{label:<13}{'on' if health_checks else 'off':>7}"
+                        f"{profile:>9}{connect * 1e6:>12.1f}{len(opened):>8}"
+                        f"{len(latencies) / sum(latencies):>8.0f}"
+                        f"{statistics.median(latencies) * 1000:>8.2f}"
+                        f"{percentile(latencies, 0.95) * 1000:>8.2f}"
+                    )
+        finally:
+            connection_created.disconnect(count_connection)
+            connection.close()
+            settings_dict.update(saved)
+
+    def time_connect(self, count):
+        """
+        Return the mean time to open a connection, run a first query, which
+        loads the schema, and close it.
+        """
+        started = time.perf_counter()
+        for _ in range(count):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+            connection.close()
+        return (time.perf_counter() - started) / count
+
+    def run_requests(self, client, paths, count):
+        latencies = []
+        for number in range(count):
+            # Cached responses would not touch the database
+            cache.clear()
+            started = time.perf_counter()
+            status = client.request(paths[number % len(paths)])
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                raise CommandError(f"{paths[number % len(paths)]} returned {status}.")
+        return latencies
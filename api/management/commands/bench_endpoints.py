@@ -0,0 +1,270 @@
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+
+class Rollback(Exception):
+    pass
+
+
+def routed_endpoints(patterns=None, apps=("api", "programs")):
+    """
+    Yield ``(viewset class, initkwargs, action, url name, lookup kwarg)`` for
+    every routed GET endpoint of the viewsets of ``apps``. The lookup kwarg is
+    None for list routes.
+    """
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            yield from routed_endpoints(pattern.url_patterns, apps)
+            continue
+        callback = pattern.callback
+        actions = getattr(callback, "actions", None) or {}
+        if "get" not in actions or not pattern.name:
+            continue
+        if callback.cls.__module__.split(".")[0] not in apps:
+            continue
+        groups = pattern.pattern.regex.groupindex
+        if "format" in groups:
+            # The format suffix variant of a route already yielded
+            continue
+        yield (
+            callback.cls,
+            callback.initkwargs,
+            actions["get"],
+            pattern.name,
+            next(iter(groups), None),
+        )
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def first_visible(viewset, initkwargs, user):
+    """Return the first object ``user`` can retrieve from ``viewset``."""
+    view = viewset(**initkwargs)
+    view.action_map = {"get": "retrieve"}
+    view.action = "retrieve"
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    view.request = view.initialize_request(APIRequestFactory().get("/"))
+    view.request.user = user
+    return view.filter_queryset(view.get_queryset()).first()
+
+
+@contextmanager
+def benchmarking():
+    """Disable throttling and the logging of 4xx responses."""
+    throttle_classes = APIView.throttle_classes
+    APIView.throttle_classes = ()
+    request_logger = logging.getLogger("django.request")
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        APIView.throttle_classes = throttle_classes
+        request_logger.setLevel(level)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every routed GET endpoint and page bundle through the test client "
+        "and report p50/p95 latency, queries per request and throughput, "
+        "optionally as JSON to compare between commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Clear the cache before every request, to measure the database.",
+        )
+        parser.add_argument(
+            "--staff",
+            action="store_true",
+            help="Request as a staff user, which also covers staff-only lists.",
+        )
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Run seed_data first and roll its rows back afterwards.",
+        )
+        parser.add_argument(
+            "--scale", type=float, default=1.0, help="Volume of seed_data --seed."
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            default=[],
+            help="Only run endpoints whose name contains this, e.g. Project.",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--compare", help="JSON file of an earlier run to compare against."
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests must be at least 1.")
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as file:
+                    baseline = json.load(file)["endpoints"]
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        try:
+            with transaction.atomic():
+                results = self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        cache.clear()
+
+        self.report(results["endpoints"], baseline)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+    def run(self, options):
+        if options["seed"]:
+            call_command("seed_data", scale=options["scale"], stdout=self.stdout)
+        client = Client()
+        user = AnonymousUser()
+        if options["staff"]:
+            user = get_user_model().objects.create_user(
+                "bench@example.com", "bench", is_staff=True, is_active=True
+            )
+            client.force_login(user)
+
+        endpoints = {}
+        hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=hosts), benchmarking():
+            for name, path in self.get_endpoints(user):
+                if options["endpoint"] and not any(
+                    part in name for part in options["endpoint"]
+                ):
+                    continue
+                endpoints[name] = self.measure(client, path, options)
+        return {
+            "meta": {
+                "revision": git_revision(),
+                "date": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "database": connection.vendor,
+                "requests": options["requests"],
+                "cold": options["cold"],
+                "staff": options["staff"],
+            },
+            "endpoints": endpoints,
+        }
+
+    def get_endpoints(self, user):
+        """Return ``(name, path)`` of every endpoint to benchmark."""
+        endpoints = []
+        for viewset, initkwargs, action, url_name, lookup in routed_endpoints():
+            kwargs = {}
+            if lookup is not None:
+                obj = first_visible(viewset, initkwargs, user)
+                if obj is None:
+                    self.stderr.write(f"Skipped {url_name}: no rows to look up.")
+                    continue
+                kwargs[lookup] = getattr(obj, viewset.lookup_field)
+            endpoints.append(
+                (f"{viewset.__name__}.{action}", reverse(url_name, kwargs=kwargs))
+            )
+        for page in getattr(settings, "API_PAGES", {}):
+            endpoints.append(
+                (f"page:{page}", reverse("page-bundle", kwargs={"page": page}))
+            )
+        return sorted(endpoints)
+
+    def measure(self, client, path, options):
+        for _ in range(options["warmup"]):
+            client.get(path)
+        latencies = []
+        queries = []
+        statuses = set()
+        size = 0
+        for _ in range(options["requests"]):
+            if options["cold"]:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(path)
+                if response.streaming:
+                    content = b"".join(response.streaming_content)
+                else:
+                    content = response.content
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+            size = len(content)
+        return {
+            "path": path,
+            "status": sorted(statuses),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "queries": round(statistics.mean(queries), 2),
+            "max_queries": max(queries),
+            "requests_per_second": round(len(latencies) / sum(latencies), 1),
+            "bytes": size,
+        }
+
+    def report(self, endpoints, baseline):
+        self.stdout.write(
+            f"{'endpoint':<36}{'status':>8}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'queries':>9}{'req/s':>9}" + ("  p50 change" if baseline else "")
+        )
+        for name, result in endpoints.items():
+            line = (
+                f"{name:<36}{','.join(map(str, result['status'])):>8}"
+                f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['queries']:>9.1f}{result['requests_per_second']:>9.0f}"
+            )
+            if baseline:
+                before = baseline.get(name)
+                if before is None:
+                    line += "  new"
+                else:
+                    change = (result["p50_ms"] / before["p50_ms"] - 1) * 100
+                    line += f"  {change:+.1f}%"
+                    if result["queries"] != before["queries"]:
+                        line += f" ({before['queries']:.1f} queries before)"
+            self.stdout.write(line)
@@ -0,0 +1,130 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fastpath import ValuesSerializer
+from api.models import ContactFAQ, TeamMember, Testimonial
+from api.serializers import (
+    ContactFAQSerializer,
+    TeamMemberSerializer,
+    TestimonialSerializer,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows per second of the list serializers and of their "
+        "ValuesSerializer fast path, and check that their output is identical. "
+        "Benchmark rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            default="10,1000,100000",
+            help="Comma separated numbers of rows to serialize.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def cases(self):
+        """Yield ``(label, serializer_class, values_serializer_class, make)``."""
+        yield "team members", TeamMemberSerializer, ValuesSerializer, self.team_member
+        yield "testimonials", TestimonialSerializer, ValuesSerializer, self.testimonial
+        yield "contact faqs", ContactFAQSerializer, ValuesSerializer, self.faq
+
+    def team_member(self, index):
+        return TeamMember(
+            name=f"Member {index}",
+            designation="Coordinator",
+            role="staff",
+            bio="Works on water projects " * 5,
+            image=f"team_members/member-{index}.jpg",
+            email=f"member{index}@bench.invalid",
+            order=index,
+        )
+
+    def testimonial(self, index):
+        return Testimonial(
+            name=f"Partner {index}",
+            designation="Director",
+            company="Bench",
+            message="A great partner to work with " * 5,
+            image=f"testimonials/partner-{index}.jpg",
+            is_featured=True,
+            rating=5,
+        )
+
+    def faq(self, index):
+        return ContactFAQ(
+            question=f"Question {index}?",
+            answer="An answer " * 20,
+            category="general",
+            order=index,
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["rows"].split(",")]
+        # Absolute media URLs, as served to API clients
+        self.request = Request(APIRequestFactory().get("/api/", HTTP_HOST="localhost"))
+        self.stdout.write(
+            f"{'case':<16}{'rows':>8}{'serializer':>14}{'values':>14}"
+            f"{'speedup':>9}  output"
+        )
+        for label, serializer_class, values_class, make in self.cases():
+            for size in sizes:
+                try:
+                    with transaction.atomic():
+                        self.compare(
+                            label, serializer_class, values_class, make, size, options
+                        )
+                        raise Rollback
+                except Rollback:
+                    pass
+
+    def compare(self, label, serializer_class, values_class, make, size, options):
+        model = serializer_class.Meta.model
+        self.seed(model, make, size)
+        queryset = self.get_queryset(model)
+        context = {"request": self.request}
+
+        def regular():
+            return serializer_class(queryset.all(), many=True, context=context).data
+
+        def fast():
+            values_serializer = values_class(serializer_class(context=context))
+            rows = queryset.values(*values_serializer.columns)
+            return values_serializer.render(rows)
+
+        regular_time, regular_data = self.best(regular, options["repeat"])
+        fast_time, fast_data = self.best(fast, options["repeat"])
+        renderer = JSONRenderer()
+        identical = renderer.render(regular_data) == renderer.render(fast_data)
+        self.stdout.write(
+            f"{label:<16}{size:>8}{size / regular_time:>12.0f}/s"
+            f"{size / fast_time:>12.0f}/s{regular_time / fast_time:>8.1f}x"
+            f"  {'identical' if identical else 'DIFFERENT'}"
+        )
+
+    def seed(self, model, make, size):
+        return model._default_manager.bulk_create(
+            [make(index) for index in range(size)], batch_size=1000
+        )
+
+    def get_queryset(self, model):
+        return model._default_manager.all()
+
+    def best(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = function()
+            timings.append(time.perf_counter() - started)
+        return min(timings), data
@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import search
+from api.models import ContactFAQ
+from api.views import ContactFAQViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full-text search index with DRF's SearchFilter on a "
+        "synthetic FAQ table. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--backend", choices=sorted(search.BACKENDS), default=None
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        backend = options["backend"] or search.get_backend().name
+        with override_settings(API_SEARCH_BACKEND=backend):
+            try:
+                with transaction.atomic():
+                    self.run(options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self, options):
+        rng = random.Random(options["seed"])
+        # Zipf-like vocabulary: a few very common words and a long tail
+        vocabulary = [f"word{index}" for index in range(5000)]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+        def sentence(length):
+            return " ".join(rng.choices(vocabulary, weights, k=length))
+
+        self.stdout.write(f"Seeding {options['rows']} FAQs...")
+        ContactFAQ.objects.bulk_create(
+            (
+                ContactFAQ(
+                    question=sentence(8),
+                    answer=sentence(40),
+                    category=rng.choice(["general", "membership", "donation"]),
+                )
+                for _ in range(options["rows"])
+            ),
+            batch_size=2000,
+        )
+        started = time.perf_counter()
+        search.rebuild(ContactFAQ)
+        self.stdout.write(
+            f"Indexed with {search.get_backend().name} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+        queries = ["word3", "word250", "word4200", "word12 word40", "word19"]
+        factory = APIRequestFactory()
+        view = ContactFAQViewSet()
+        self.stdout.write(f"{'query':<16}{'SearchFilter':>16}{'index':>12}{'rows':>8}")
+        for query in queries:
+            request = Request(factory.get("/", {"search": query}))
+            timings = []
+            for backend in (SearchFilter(), search.FullTextSearchFilter()):
+                samples = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    queryset = backend.filter_queryset(
+                        request, ContactFAQ.objects.all(), view
+                    )
+                    count = queryset.count()
+                    list(queryset[:10])
+                    samples.append(time.perf_counter() - started)
+                timings.append(statistics.median(samples) * 1000)
+            self.stdout.write(
+                f"{query:<16}{timings[0]:>14.2f}ms{timings[1]:>10.2f}ms{count:>8}"
+            )
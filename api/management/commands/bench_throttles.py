@@ -0,0 +1,120 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework import throttling
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import throttling as fixed_window
+
+
+def make_request(ident):
+    request = Request(APIRequestFactory().get("/", REMOTE_ADDR=ident))
+    request.user = AnonymousUser()
+    return request
+
+
+def hammer(throttle_class, ident, count, results=None):
+    allowed = 0
+    request = make_request(ident)
+    for _ in range(count):
+        allowed += throttle_class().allow_request(request, None)
+    if results is not None:
+        results.put(allowed)
+    return allowed
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-request cost of DRF's timestamp history throttle and "
+        "of the fixed window throttles, and check that the SQLite store counts "
+        "exactly across processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rate", default="1000/day")
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Requests made by each client; past the rate they are refused.",
+        )
+        parser.add_argument("--clients", type=int, default=5)
+        parser.add_argument("--processes", type=int, default=4)
+
+    def handle(self, *args, **options):
+        rate = options["rate"]
+        history = type("Throttle", (throttling.AnonRateThrottle,), {"rate": rate})
+        counter = type("Throttle", (fixed_window.AnonRateThrottle,), {"rate": rate})
+        cases = [
+            ("history (drf)", "cache", history),
+            ("fixed window", "cache", counter),
+            ("fixed window", "sqlite", counter),
+        ]
+        directory = tempfile.mkdtemp()
+        path = Path(directory) / "throttle.sqlite3"
+
+        self.stdout.write(
+            f"{'throttle':<16}{'store':<8}{'us/request':>12}{'allowed':>9}"
+        )
+        try:
+            for label, store, throttle_class in cases:
+                with override_settings(
+                    API_THROTTLE_STORE=store, API_THROTTLE_SQLITE_PATH=path
+                ):
+                    self.measure(label, store, throttle_class, options)
+            with override_settings(
+                API_THROTTLE_STORE="sqlite", API_THROTTLE_SQLITE_PATH=path
+            ):
+                self.check_processes(counter, options)
+        finally:
+            cache.clear()
+            shutil.rmtree(directory)
+
+    def measure(self, label, store, throttle_class, options):
+        cache.clear()
+        if store == "sqlite":
+            fixed_window.get_store().clear()
+        started = time.perf_counter()
+        allowed = sum(
+            hammer(throttle_class, f"10.0.0.{client}", options["requests"])
+            for client in range(options["clients"])
+        )
+        elapsed = time.perf_counter() - started
+        total = options["requests"] * options["clients"]
+        self.stdout.write(
+            f"{label:<16}{store:<8}{elapsed / total * 1e6:>12.1f}{allowed:>9}"
+        )
+
+    def check_processes(self, throttle_class, options):
+        fixed_window.get_store().clear()
+        processes = options["processes"]
+        # Forked, so that the workers inherit the settings and throttle class
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=hammer,
+                args=(throttle_class, "10.0.1.1", options["requests"], results),
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        allowed = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        num_requests = throttle_class().num_requests
+        expected = min(num_requests, processes * options["requests"])
+        status = "exact" if sum(allowed) == expected else "WRONG"
+        self.stdout.write(
+            f"{processes} processes sharing one client: {sum(allowed)} allowed, "
+            f"{expected} expected ({status})"
+        )
@@ -0,0 +1,112 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import URLResolver, get_resolver
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+# Plan lines naming the index a table is read through (SQLite, PostgreSQL)
+INDEX_RE = re.compile(
+    r"USING (?:COVERING )?INDEX (\w+)|Index (?:Only )?Scan (?:Backward )?using (\w+)"
+)
+PRIMARY_KEY_RE = re.compile(r"USING INTEGER PRIMARY KEY")
+# Plan lines reading a whole table
+FULL_SCAN_RE = re.compile(r"\bSCAN (\w+)\s*$|Seq Scan on (\w+)")
+SORT_RE = re.compile(r"TEMP B-TREE FOR ORDER BY|\bSort\b")
+
+
+def list_viewsets(patterns=None):
+    """Yield ``(viewset class, initkwargs)`` for every routed list endpoint."""
+    seen = set()
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            for viewset, initkwargs in list_viewsets(pattern.url_patterns):
+                if viewset not in seen:
+                    seen.add(viewset)
+                    yield viewset, initkwargs
+            continue
+        callback = pattern.callback
+        actions = getattr(callback, "actions", None) or {}
+        if actions.get("get") == "list" and callback.cls not in seen:
+            seen.add(callback.cls)
+            yield callback.cls, callback.initkwargs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the first page query of every routed list endpoint and "
+        "report whether it reads its table through an index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--staff",
+            action="store_true",
+            help="Explain the querysets served to staff users.",
+        )
+        parser.add_argument(
+            "--query",
+            action="append",
+            default=[],
+            metavar="PARAM=VALUE",
+            help="Query parameter added to every request, e.g. category=Health.",
+        )
+        parser.add_argument(
+            "--fail-on-scan",
+            action="store_true",
+            help="Exit with an error when a query reads a whole table.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            params = dict(param.split("=", 1) for param in options["query"])
+        except ValueError:
+            raise CommandError("--query values must look like PARAM=VALUE")
+        user = get_user_model()(is_staff=True) if options["staff"] else AnonymousUser()
+
+        scanning = []
+        self.stdout.write(f"{'viewset':<28}{'access':<10}{'sort':<6}indexes")
+        for viewset, initkwargs in sorted(
+            list_viewsets(), key=lambda item: item[0].__name__
+        ):
+            plan = self.explain(viewset, initkwargs, params, user)
+            indexes = sorted(
+                {name for match in INDEX_RE.findall(plan) for name in match if name}
+            )
+            if PRIMARY_KEY_RE.search(plan):
+                indexes.append("<primary key>")
+            if any(FULL_SCAN_RE.search(line) for line in plan.splitlines()):
+                access = "partial" if indexes else "scan"
+                scanning.append(viewset.__name__)
+            else:
+                access = "index"
+            sort = "yes" if SORT_RE.search(plan) else "no"
+            self.stdout.write(
+                f"{viewset.__name__:<28}{access:<10}{sort:<6}"
+                f"{', '.join(indexes) or '-'}"
+            )
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {plan}".replace("\n", "\n  "))
+
+        if scanning and options["fail_on_scan"]:
+            raise CommandError(f"Full table scans in: {', '.join(scanning)}")
+
+    def explain(self, viewset, initkwargs, params, user):
+        view = viewset(**initkwargs)
+        view.action_map = {"get": "list"}
+        view.action = "list"
+        view.args, view.kwargs, view.format_kwarg = (), {}, None
+        request = APIRequestFactory().get("/", params)
+        view.request = view.initialize_request(request)
+        view.request.user = user
+
+        queryset = view.filter_queryset(view.get_queryset())
+        page_size = getattr(view.paginator, "page_size", None) or api_settings.PAGE_SIZE
+        if page_size:
+            queryset = queryset[:page_size]
+        if connection.vendor == "postgresql":
+            return queryset.explain(format="text")
+        return queryset.explain()
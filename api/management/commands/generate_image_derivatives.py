@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the responsive derivatives of stored images that do not have "
+        "them yet, in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            help="Only process these models, as app_label.ModelName.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Threads generating derivatives, 0 to generate them inline.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate derivatives that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        registered = images.registered_models()
+        if options["models"]:
+            try:
+                models = [apps.get_model(label) for label in options["models"]]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(exc)
+            unknown = [model for model in models if model not in registered]
+            if unknown:
+                raise CommandError(f"No derivatives registered for: {unknown}")
+        else:
+            models = list(registered)
+
+        failed = 0
+        for model in models:
+            pending = self.pending(model, registered[model], options["force"])
+            for name, error in self.run(model, pending, options["workers"]):
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+            self.stdout.write(
+                f"Processed {len(pending)} {model._meta.verbose_name_plural}."
+            )
+        if failed:
+            raise CommandError(f"{failed} images could not be processed.")
+        self.stdout.write(self.style.SUCCESS("Image derivatives generated."))
+
+    def pending(self, model, field_name, force):
+        rows = (
+            model._default_manager.exclude(**{field_name: ""})
+            .exclude(**{f"{field_name}__isnull": True})
+            .values_list("pk", field_name, images.metadata_field(field_name))
+        )
+        return [
+            (pk, name)
+            for pk, name, metadata in rows.iterator()
+            if force or (metadata or {}).get("name") != name
+        ]
+
+    def run(self, model, pending, workers):
+        """Yield ``(name, error)`` for each processed image."""
+        if not workers:
+            for pk, name in pending:
+                yield name, self.generate(model, pk, name)
+            return
+        with ThreadPoolExecutor(workers) as pool:
+            futures = {
+                pool.submit(self.generate_in_thread, model, pk, name): name
+                for pk, name in pending
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def generate(self, model, pk, name):
+        try:
+            images.generate(model, pk, name)
+        except Exception as exc:
+            return exc
+
+    def generate_in_thread(self, model, pk, name):
+        try:
+            return self.generate(model, pk, name)
+        finally:
+            connections.close_all()
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.ingest import ContactQueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Store contact submissions spooled by the contact endpoint when "
+        "CONTACT_INGEST_MODE is 'queue'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Flush the queue once and exit instead of polling.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        queue = ContactQueue()
+        while True:
+            processed = queue.flush(options["batch_size"])
+            if processed:
+                self.stdout.write(f"Stored {processed} contact submissions.")
+            if options["once"]:
+                return
+            if not processed:
+                close_old_connections()
+                try:
+                    time.sleep(options["interval"])
+                except KeyboardInterrupt:
+                    return
@@ -0,0 +1,40 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from api import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the registered models."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models",
+            nargs="*",
+            help="Only rebuild these models, as app_label.ModelName.",
+        )
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if backend is None:
+            raise CommandError("The search index is disabled (API_SEARCH_BACKEND).")
+
+        registered = search.registered_models()
+        if options["models"]:
+            try:
+                models = [apps.get_model(label) for label in options["models"]]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(exc)
+            unknown = [model for model in models if model not in registered]
+            if unknown:
+                raise CommandError(f"Not registered for search: {unknown}")
+        else:
+            models = list(registered)
+
+        for model in models:
+            search.rebuild(model)
+            self.stdout.write(
+                f"Indexed {model._default_manager.count()} "
+                f"{model._meta.verbose_name_plural} ({backend.name})."
+            )
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
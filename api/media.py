@@ -0,0 +1,137 @@
+"""
+Media file serving with HTTP caching, range requests and sendfile offloading.
+
+Files stored under content-hashed names (see api.storage) never change, so
+they are served with a far-future ``immutable`` Cache-Control. Other files
+are revalidated after ``MEDIA_CACHE_MAX_AGE`` seconds. Responses carry an
+ETag and Last-Modified derived from the file's size and mtime, and a single
+``Range`` is answered with ``206 Partial Content``.
+
+Full responses are ``FileResponse`` objects, which WSGI servers providing
+``wsgi.file_wrapper`` send with ``sendfile()``. When ``MEDIA_SENDFILE_HEADER``
+is set (``X-Accel-Redirect`` for nginx, ``X-Sendfile`` for Apache) the body
+is left out entirely and the front-end server sends the file from
+``MEDIA_SENDFILE_PREFIX`` + path instead.
+"""
+
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .storage import is_hashed_name
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Return the ``(start, end)`` byte positions, end inclusive, requested by a
+    single-range ``Range`` header, None to serve the whole file, or False
+    when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(" ", "")) if header else None
+    if not match or match.groups() == ("", ""):
+        # Absent, malformed and multi-range headers get the whole file
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, posixpath.normpath(path)))
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path")
+    if not fullpath.is_file():
+        raise Http404("File not found")
+
+    stat = fullpath.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    if is_hashed_name(path):
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        max_age = getattr(settings, "MEDIA_CACHE_MAX_AGE", 3600)
+        cache_control = f"public, max-age={max_age}"
+
+    def finalize(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        response["Cache-Control"] = cache_control
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if not_modified is not None:
+        return finalize(not_modified)
+
+    content_type, encoding = mimetypes.guess_type(fullpath.name)
+    content_type = content_type or "application/octet-stream"
+    byte_range = parse_range(request.headers.get("Range"), stat.st_size)
+    # A Range conditioned on another version of the file gets the whole file
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return finalize(response)
+
+    sendfile_header = getattr(settings, "MEDIA_SENDFILE_HEADER", None)
+    if sendfile_header:
+        # The front-end server sends the file, and handles ranges itself
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, "MEDIA_SENDFILE_PREFIX", "/protected-media/")
+        if sendfile_header.lower() == "x-sendfile":
+            response[sendfile_header] = str(fullpath)
+        else:
+            response[sendfile_header] = prefix + quote(path)
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(fullpath, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        response = FileResponse(fullpath.open("rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return finalize(response)
@@ -0,0 +1,309 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from .cache import aget_versions, get_versions
+from .instrumentation import serializing
+
+
+def not_modified_response(request, etag, timestamp):
+    """
+    Return a ``304 Not Modified`` response carrying the validators when the
+    request's conditional headers match them, otherwise None.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, timestamp)
+    return response
+
+
+def set_validators(response, etag, timestamp):
+    if etag:
+        response["ETag"] = etag
+    if timestamp is not None:
+        response["Last-Modified"] = http_date(timestamp)
+
+
+def is_conditional(request):
+    return (
+        "HTTP_IF_NONE_MATCH" in request.META or "HTTP_IF_MODIFIED_SINCE" in request.META
+    )
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin answering list and retrieve requests with ETag and
+    Last-Modified validators.
+
+    The validators come from a cheap fingerprint of the rows the response is
+    built from (latest ``updated_at`` plus row count for lists, primary keys
+    and ``updated_at`` for details), computed before the main query runs so
+    that matching conditional requests get a ``304 Not Modified`` without
+    fetching or serializing anything.
+    """
+
+    conditional_timestamp_field = "updated_at"
+
+    def get_list_fingerprint_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_detail_fingerprint_queryset(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+
+    def get_list_validators(self):
+        stats = self.get_list_fingerprint_queryset().aggregate(
+            last_modified=Max(self.conditional_timestamp_field),
+            count=Count("pk"),
+        )
+        return self.build_validators(
+            stats["last_modified"], stats["count"], stats["last_modified"]
+        )
+
+    def get_detail_validators(self):
+        rows = sorted(
+            self.get_detail_fingerprint_queryset()
+            .order_by()
+            .values_list("pk", self.conditional_timestamp_field)
+        )
+        if not rows:
+            # Let the regular lookup answer with a 404
+            return None
+        return self.build_validators(max(row[1] for row in rows), rows)
+
+    async def aget_detail_validators(self):
+        rows = (
+            self.get_detail_fingerprint_queryset()
+            .order_by()
+            .values_list("pk", self.conditional_timestamp_field)
+        )
+        rows = sorted([row async for row in rows])
+        if not rows:
+            return None
+        return self.build_validators(max(row[1] for row in rows), rows)
+
+    def build_validators(self, last_modified, *fingerprint):
+        """Return an ``(etag, last_modified)`` pair for this request."""
+        request = self.request
+        parts = [
+            request.get_full_path(),
+            request.user.is_staff,
+            request.accepted_renderer.format,
+            *fingerprint,
+        ]
+        digest = hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+        return f'"{digest}"', last_modified
+
+    def conditional_response(self, validators, handler, request, *args, **kwargs):
+        if validators is None:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+        response = not_modified_response(request, etag, timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                set_validators(response, etag, timestamp)
+        return response
+
+    async def anot_modified_detail(self, request):
+        """
+        Return a ``304 Not Modified`` response for conditional retrieve
+        requests matching the detail's validators, fingerprinted with the
+        async ORM, otherwise None.
+        """
+        if not is_conditional(request):
+            return None
+        validators = await self.aget_detail_validators()
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+        return not_modified_response(request, etag, timestamp)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validators(), super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_validators(), super().retrieve, request, *args, **kwargs
+        )
+
+
+class CachedResponseMixin:
+    """
+    Viewset mixin caching list responses, and detail responses when
+    ``cache_retrieve`` is set.
+
+    Entries are keyed by the URL arguments and query parameters, the staff
+    visibility of the request and the version of every model in
+    ``cache_dependencies`` (see api.cache), so a change to any of them is
+    never served stale. Details are only cached for viewsets whose detail is
+    built from these models alone.
+    Validators set by ``ConditionalGetMixin`` are cached along with the data,
+    letting cache hits answer conditional requests without touching the
+    database.
+    """
+
+    cache_dependencies = ()
+    cache_timeout = None
+    cache_retrieve = False
+
+    def get_cache_dependencies(self):
+        if self.cache_dependencies:
+            return self.cache_dependencies
+        queryset = self.queryset if self.queryset is not None else self.get_queryset()
+        return (queryset.model,)
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return getattr(settings, "API_RESPONSE_CACHE_TIMEOUT", 300)
+
+    def get_response_cache_key(self, request, name, dependencies=None):
+        if dependencies is None:
+            dependencies = self.get_cache_dependencies()
+        return self.build_response_cache_key(request, name, get_versions(dependencies))
+
+    def build_response_cache_key(self, request, name, versions):
+        parts = [
+            type(self).__module__,
+            type(self).__name__,
+            name,
+            request.scheme,
+            request.get_host(),
+            request.user.is_staff,
+            request.accepted_renderer.format,
+            sorted(self.kwargs.items()),
+            sorted(request.query_params.lists()),
+            versions,
+        ]
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+        return f"api:response:{digest}"
+
+    def cached_response(self, request, name, builder, dependencies=None):
+        """
+        Serve ``name`` from the cache, calling ``builder`` to produce and
+        store the response on a miss. Responses built without an ETag get
+        one derived from the cache key.
+        """
+        key = self.get_response_cache_key(request, name, dependencies)
+        entry = cache.get(key)
+        if entry is None:
+            response = builder()
+            if isinstance(response, Response) and response.status_code == 200:
+                if not response.has_header("ETag"):
+                    # The key already identifies the data and its versions
+                    response["ETag"] = f'"{key.rsplit(":", 1)[-1]}"'
+                entry = {
+                    "data": response.data,
+                    "etag": response.get("ETag"),
+                    "timestamp": parse_http_date_safe(response.get("Last-Modified")),
+                }
+                cache.set(key, entry, self.get_cache_timeout())
+            return response
+
+        return self.entry_response(request, entry)
+
+    async def acached_response(self, request, name):
+        """
+        Serve ``name`` from the cache without any query, for async views.
+        Return None on a miss, left to the sync ``cached_response``.
+        """
+        versions = await aget_versions(self.get_cache_dependencies())
+        key = self.build_response_cache_key(request, name, versions)
+        entry = await cache.aget(key)
+        if entry is None:
+            return None
+        return self.entry_response(request, entry)
+
+    def entry_response(self, request, entry):
+        response = not_modified_response(request, entry["etag"], entry["timestamp"])
+        if response is None:
+            response = Response(entry["data"])
+            set_validators(response, entry["etag"], entry["timestamp"])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        def build():
+            return super(CachedResponseMixin, self).list(request, *args, **kwargs)
+
+        return self.cached_response(request, "list", build)
+
+    def retrieve(self, request, *args, **kwargs):
+        def build():
+            return super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+
+        if not self.cache_retrieve:
+            return build()
+        return self.cached_response(request, "retrieve", build)
+
+
+class ValuesListMixin:
+    """
+    Viewset mixin rendering list pages with ``values_serializer_class`` (see
+    api.fastpath) from ``.values()`` rows, when it supports every field of
+    the list serializer. Responses are the same as the regular path's.
+    """
+
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        if self.values_serializer_class is None or self.request.method != "GET":
+            return None
+        values_serializer = self.values_serializer_class(self.get_serializer())
+        return values_serializer if values_serializer.supported else None
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = self.get_values_serializer()
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        # Keyset cursors are built from the ordering columns of the last row
+        columns = values_serializer.columns + [
+            field.lstrip("-")
+            for field in getattr(self, "keyset_ordering", ())
+            if field.lstrip("-") not in values_serializer.columns
+        ]
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.prefetch_related(None).values(*columns)
+        page = self.paginate_queryset(rows)
+        with serializing():
+            data = values_serializer.render(rows if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class SerializerTimingMixin:
+    """
+    Viewset mixin counting the serialization of list and retrieve responses
+    as serializer time of the request (see api.instrumentation). Goes right
+    before the DRF viewset class.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(queryset if page is None else page, many=True)
+        with serializing():
+            data = serializer.data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        with serializing():
+            return Response(serializer.data)
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 
@@ -21,6 +22,7 @@ class TeamMember(TimeStampedModel):
     role = models.CharField(_("Role"), max_length=40)
     bio = models.TextField(_("Biography"), blank=True)
     image = models.ImageField(_("Profile Image"), upload_to="team_members/")
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     email = models.EmailField(_("Email Address"), blank=True)
     linkedin_profile = models.URLField(_("LinkedIn Profile"), blank=True)
     order = models.PositiveIntegerField(
@@ -32,11 +34,31 @@ class TeamMember(TimeStampedModel):
         verbose_name = _("Team Member")
         verbose_name_plural = _("Team Members")
         ordering = ["order", "name"]
+        indexes = [
+            models.Index(fields=["order", "name", "id"], name="api_team_order_name_id"),
+            models.Index(
+                fields=["order", "name"],
+                name="api_team_active_order",
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ContactQuerySet(models.QuerySet):
+    def mark_responded(self, response_notes=None):
+        """
+        Mark every contact in the queryset as responded with a single UPDATE,
+        replacing the response notes when given. Returns the number of rows.
+        """
+        changes = {"responded": True, "updated_at": timezone.now()}
+        if response_notes is not None:
+            changes["response_notes"] = response_notes
+        return self.update(**changes)
+
+
 class Contact(TimeStampedModel):
     """Model for contact form submissions."""
 
@@ -68,11 +90,27 @@ class Contact(TimeStampedModel):
     message = models.TextField(_("Message"))
     responded = models.BooleanField(_("Responded"), default=False)
     response_notes = models.TextField(_("Response Notes"), blank=True)
+    submission_id = models.UUIDField(
+        _("Submission ID"), null=True, blank=True, unique=True, editable=False
+    )
+
+    objects = ContactQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Contact Submission")
         verbose_name_plural = _("Contact Submissions")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="api_contact_created_id"),
+            models.Index(
+                fields=["inquiry_type", "created_at"], name="api_contact_inquiry"
+            ),
+            models.Index(
+                fields=["created_at"],
+                name="api_contact_unresponded",
+                condition=models.Q(responded=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -91,6 +129,7 @@ class Testimonial(TimeStampedModel):
     image = models.ImageField(
         _("Profile Image"), upload_to="testimonials/", null=True, blank=True
     )
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     is_featured = models.BooleanField(_("Featured"), default=False)
     rating = models.PositiveSmallIntegerField(
         _("Rating"),
@@ -103,6 +142,12 @@ class Testimonial(TimeStampedModel):
         verbose_name = _("Testimonial")
         verbose_name_plural = _("Testimonials")
         ordering = ["-is_featured", "-created_at"]
+        indexes = [
+            models.Index(
+                fields=["-is_featured", "-created_at"], name="api_testimonial_featured"
+            ),
+            models.Index(fields=["rating"], name="api_testimonial_rating"),
+        ]
 
     def __str__(self):
         return f"{self.name}, {self.designation}"
@@ -121,6 +166,14 @@ class ContactFAQ(TimeStampedModel):
         verbose_name = _("Contact FAQ")
         verbose_name_plural = _("Contact FAQs")
         ordering = ["order", "question"]
+        indexes = [
+            models.Index(
+                fields=["order", "question"],
+                name="api_contactfaq_published",
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(fields=["category"], name="api_contactfaq_category"),
+        ]
 
     def __str__(self):
         return self.question
@@ -139,6 +192,34 @@ class MembershipFAQ(TimeStampedModel):
         verbose_name = _("Membership FAQ")
         verbose_name_plural = _("Membership FAQs")
         ordering = ["order", "question"]
+        indexes = [
+            models.Index(
+                fields=["order", "question"],
+                name="api_membershipfaq_published",
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(fields=["category"], name="api_membershipfaq_category"),
+        ]
 
     def __str__(self):
         return self.question
+
+
+class SearchToken(models.Model):
+    """Inverted index entry used by the token table search backend."""
+
+    label = models.CharField(_("Model"), max_length=100)
+    object_id = models.PositiveBigIntegerField(_("Object ID"))
+    token = models.CharField(_("Token"), max_length=64)
+    weight = models.PositiveIntegerField(_("Weight"), default=1)
+
+    class Meta:
+        verbose_name = _("Search Token")
+        verbose_name_plural = _("Search Tokens")
+        indexes = [
+            models.Index(fields=["label", "token"], name="api_searchtoken_lookup"),
+            models.Index(fields=["label", "object_id"], name="api_searchtoken_object"),
+        ]
+
+    def __str__(self):
+        return f"{self.token} ({self.label} {self.object_id})"
@@ -0,0 +1,117 @@
+"""
+Page bundles: every section a page of the site renders, in one response.
+
+Sections are registered by the apps owning them (see the ``registry`` modules)
+with the queryset and serializer of their public listing, and ``API_PAGES``
+maps page names to section names. Each section is cached on its own, keyed by
+the version of every model it is built from (see api.cache), so a change to
+testimonials only rebuilds the testimonials of every page. The bundle's ETag
+is derived from the section keys, which lets conditional requests be answered
+from the version counters alone.
+
+Sections missing from the cache are built inline, or by a pool of
+``API_PAGE_WORKERS`` threads on databases that serve concurrent connections.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .cache import get_versions
+from .instrumentation import serializing
+
+_sections = {}
+_executor = None
+
+
+class Section:
+    def __init__(self, name, queryset, serializer_class, dependencies=(), limit=None):
+        self.name = name
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self.dependencies = tuple(dependencies) or (queryset.model,)
+        self.limit = limit
+
+    def cache_key(self, request, versions):
+        parts = [self.name, request.scheme, request.get_host(), versions]
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+        return f"api:page-section:{digest}"
+
+    def build(self, request):
+        queryset = self.queryset.all()
+        if self.limit is not None:
+            queryset = queryset[: self.limit]
+        serializer = self.serializer_class(
+            queryset,
+            many=True,
+            # Sections are shared by every page, whatever its query string
+            context={"request": request, "sparse_fieldsets": False},
+        )
+        with serializing():
+            return list(serializer.data)
+
+
+def register(name, queryset, serializer_class, dependencies=(), limit=None):
+    """
+    Make ``queryset`` rendered by ``serializer_class`` available to pages as
+    section ``name``. ``dependencies`` are the models whose changes expire
+    the section, by default the queryset's model.
+    """
+    _sections[name] = Section(name, queryset, serializer_class, dependencies, limit)
+
+
+def get_page(name):
+    """Return the sections of page ``name``, or None for unknown pages."""
+    pages = getattr(settings, "API_PAGES", {})
+    if name not in pages:
+        return None
+    return [_sections[section] for section in pages[name]]
+
+
+def section_keys(sections, request):
+    """Return the cache key of each section, from one read of the versions."""
+    models = list(
+        dict.fromkeys(model for section in sections for model in section.dependencies)
+    )
+    versions = dict(zip(models, get_versions(models)))
+    return [
+        section.cache_key(request, [versions[model] for model in section.dependencies])
+        for section in sections
+    ]
+
+
+def build_sections(sections, request):
+    global _executor
+    workers = getattr(settings, "API_PAGE_WORKERS", 0)
+    if not workers or len(sections) < 2:
+        return [section.build(request) for section in sections]
+    if _executor is None:
+        _executor = ThreadPoolExecutor(workers, thread_name_prefix="page-sections")
+    futures = [
+        _executor.submit(_build_in_thread, section, request) for section in sections
+    ]
+    return [future.result() for future in futures]
+
+
+def _build_in_thread(section, request):
+    try:
+        return section.build(request)
+    finally:
+        connections.close_all()
+
+
+def render_page(sections, keys, request):
+    """Return ``{section: data}``, building and caching missing sections."""
+    entries = cache.get_many(keys)
+    missing = [
+        (section, key) for section, key in zip(sections, keys) if key not in entries
+    ]
+    if missing:
+        built = build_sections([section for section, _ in missing], request)
+        fresh = {key: data for (_, key), data in zip(missing, built)}
+        cache.set_many(fresh, getattr(settings, "API_RESPONSE_CACHE_TIMEOUT", 300))
+        entries.update(fresh)
+    return {section.name: entries[key] for section, key in zip(sections, keys)}
@@ -0,0 +1,236 @@
+"""
+Pagination classes for the API.
+
+``PageNumberPagination`` is the default. It behaves like DRF's, except that
+clients can pass ``?count=false`` to skip the ``COUNT(*)`` behind the
+``count`` field.
+
+``KeysetPagination`` lets large collections opt into keyset pagination.
+Viewsets using it keep answering ``?page=N``. A ``cursor`` parameter, left
+empty for the first page, switches to keyset pages. Those filter on the last
+row already seen instead of skipping rows with ``OFFSET``, so deep pages
+cost the same as the first one.
+"""
+
+import base64
+import json
+from types import SimpleNamespace
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+FALSE_VALUES = {"0", "false", "no", "off"}
+
+
+def reverse_ordering(ordering):
+    return [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    """Page number pagination whose total count clients can opt out of."""
+
+    count_query_param = "count"
+
+    def count_requested(self, request):
+        value = request.query_params.get(self.count_query_param, "")
+        return value.lower() not in FALSE_VALUES
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if self.count_requested(request):
+            rows = super().paginate_queryset(queryset, request, view)
+            if rows is not None:
+                self.count = self.page.paginator.count
+            return rows
+
+        self.request = request
+        self.page = None
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            self.page_number = int(page_number)
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=_("Invalid page number")
+                )
+            )
+
+        # One extra row tells whether a next page exists
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset : offset + page_size + 1])
+        if not rows and self.page_number > 1:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=_("That page contains no results")
+                )
+            )
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.page is not None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page is not None:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        payload = {} if self.count is None else {"count": self.count}
+        payload.update(
+            next=self.get_next_link(),
+            previous=self.get_previous_link(),
+            results=data,
+        )
+        return Response(payload)
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Keyset pagination over the view's ``keyset_ordering``, which must end
+    with a unique field and should be backed by a composite index.
+
+    Cursors encode the ordering values of the row at the edge of a page and
+    the direction to read in. An ``OrderingFilter`` request that reverses the
+    first field reverses the whole keyset; other ``?ordering=`` values than a
+    prefix of the keyset or of its reverse are refused with a 400, since the
+    cursor could not follow them.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = _("Invalid cursor")
+    invalid_ordering_message = _(
+        "Cursor pages can only be ordered by {ordering} or its reverse."
+    )
+
+    def get_keyset_ordering(self, queryset, view):
+        ordering = list(view.keyset_ordering)
+        # Expressions, such as the search ranking, are not requested orderings
+        requested = [
+            field for field in queryset.query.order_by if isinstance(field, str)
+        ]
+        for candidate in (ordering, reverse_ordering(ordering)):
+            if candidate[: len(requested)] == requested:
+                return candidate
+        message = self.invalid_ordering_message.format(ordering=",".join(ordering))
+        raise exceptions.ValidationError({api_settings.ORDERING_PARAM: [message]})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.ordering = self.get_keyset_ordering(queryset, view)
+        self.fields = [
+            queryset.model._meta.get_field(field.lstrip("-"))
+            for field in self.ordering
+        ]
+        position, backwards = self.decode_cursor(request)
+        self.count = queryset.count() if self.count_requested(request) else None
+
+        ordering = reverse_ordering(self.ordering) if backwards else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self.position_of(rows[-1]) if rows and has_next else None
+        self.previous_position = (
+            self.position_of(rows[0]) if rows and has_previous else None
+        )
+        return rows
+
+    def keyset_filter(self, ordering, position):
+        """Match rows strictly after ``position`` in ``ordering``."""
+        after = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            after |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        # A range on the leading column lets the composite index bound the scan
+        first = ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": position[0]}) & after
+
+    def position_of(self, row):
+        if isinstance(row, dict):
+            # A .values() row (see api.mixins.ValuesListMixin)
+            row = SimpleNamespace(**row)
+        return [field.value_to_string(row) for field in self.fields]
+
+    def encode_cursor(self, position, backwards=False):
+        data = {"p": position}
+        if backwards:
+            data["r"] = 1
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    def decode_cursor(self, request):
+        """Return the ``(position, backwards)`` pair of the request's cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = data["p"]
+            if len(position) != len(self.fields):
+                raise ValueError
+            position = [
+                field.to_python(value) for field, value in zip(self.fields, position)
+            ]
+            return position, bool(data.get("r"))
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def cursor_link(self, position, backwards=False):
+        if position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(position, backwards)
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        return self.cursor_link(self.next_position)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return self.cursor_link(self.previous_position, backwards=True)
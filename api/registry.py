@@ -0,0 +1,36 @@
+"""
+Registration of the api models with the image derivatives, search index and
+page bundles, imported by ApiConfig.ready.
+"""
+
+from . import images, pages, search
+from .models import ContactFAQ, MembershipFAQ, TeamMember, Testimonial
+from .serializers import (
+    ContactFAQSerializer,
+    MembershipFAQSerializer,
+    TeamMemberSerializer,
+    TestimonialSerializer,
+)
+from .views import ContactFAQViewSet, TeamMemberViewSet, TestimonialViewSet
+
+images.register(TeamMember)
+images.register(Testimonial)
+
+search.register(TeamMember, TeamMemberViewSet.search_fields)
+search.register(Testimonial, TestimonialViewSet.search_fields)
+search.register(ContactFAQ, ContactFAQViewSet.search_fields)
+
+pages.register(
+    "team_members", TeamMember.objects.filter(is_active=True), TeamMemberSerializer
+)
+pages.register(
+    "testimonials", Testimonial.objects.filter(is_featured=True), TestimonialSerializer
+)
+pages.register(
+    "contact_faqs", ContactFAQ.objects.filter(is_published=True), ContactFAQSerializer
+)
+pages.register(
+    "membership_faqs",
+    MembershipFAQ.objects.filter(is_published=True),
+    MembershipFAQSerializer,
+)
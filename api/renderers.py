@@ -0,0 +1,64 @@
+"""
+Renderers for the streamed exports.
+
+Besides ``render()``, used for error responses, each renderer has a
+``stream(fields, rows)`` generator turning an iterator of value tuples into
+chunks of the response body, so exports never hold the whole table.
+"""
+
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Cells starting with these are evaluated as formulas by spreadsheet software
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Echo:
+    """File-like object handing written lines back to the csv writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_cell(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return JSONEncoder().default(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict):
+            data = {"detail": data}
+        return "".join(self.stream(list(data), [list(data.values())])).encode()
+
+    def stream(self, fields, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([csv_cell(value) for value in row])
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=JSONEncoder).encode() + b"\n"
+
+    def stream(self, fields, rows):
+        encoder = JSONEncoder()
+        for row in rows:
+            yield encoder.encode(dict(zip(fields, row))) + "\n"
@@ -0,0 +1,327 @@
+"""
+Full-text search index for API viewsets.
+
+Models are registered with the text fields they are searched on, and their
+rows are indexed on save and removed on delete. ``FullTextSearchFilter`` is a
+drop-in replacement for DRF's ``SearchFilter`` that answers ``?search=`` from
+the index instead of ``LIKE '%term%'`` scans and orders narrow result sets by
+relevance.
+
+Two backends are available, selected with the ``API_SEARCH_BACKEND`` setting:
+
+* ``"fts5"`` keeps one SQLite FTS5 virtual table per model,
+* ``"tokens"`` keeps a tokenized inverted index in the ``SearchToken`` table
+  and works on any database.
+
+The default, ``"auto"``, uses FTS5 when the database supports it. Terms match
+words by prefix, every term must match, like with ``SearchFilter``. Rows that
+existed before a model was registered are indexed by the
+``rebuild_search_index`` command.
+"""
+
+import logging
+import re
+from collections import Counter
+from functools import cache
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, Count, IntegerField, Q, Sum, When
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from rest_framework.filters import SearchFilter
+
+from .cache import bump_version_on_commit
+from .models import SearchToken
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Longest token stored by the token table backend
+MAX_TOKEN_LENGTH = SearchToken._meta.get_field("token").max_length
+
+_registry = {}
+
+
+@cache
+def _sqlite_has_fts5():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return "ENABLE_FTS5" in {row[0] for row in cursor.fetchall()}
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(str(text).casefold())
+    ]
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+class FTS5Backend:
+    """Index rows in a per-model SQLite FTS5 table whose rowid is the pk."""
+
+    name = "fts5"
+
+    @staticmethod
+    def is_available():
+        return connection.vendor == "sqlite" and _sqlite_has_fts5()
+
+    def table_name(self, model):
+        return connection.ops.quote_name(f"{model._meta.db_table}_fts")
+
+    def ensure_table(self, model, fields):
+        columns = ", ".join(connection.ops.quote_name(field) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table_name(model)} "
+                f"USING fts5({columns})"
+            )
+
+    def index(self, instance, fields):
+        table = self.table_name(type(instance))
+        columns = ", ".join(connection.ops.quote_name(field) for field in fields)
+        placeholders = ", ".join(["%s"] * (len(fields) + 1))
+        values = [str(getattr(instance, field) or "") for field in fields]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [instance.pk])
+            cursor.execute(
+                f"INSERT INTO {table} (rowid, {columns}) VALUES ({placeholders})",
+                [instance.pk, *values],
+            )
+
+    def remove(self, model, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table_name(model)} WHERE rowid = %s", [pk]
+            )
+
+    def rebuild(self, model, fields):
+        self.ensure_table(model, fields)
+        table = self.table_name(model)
+        quoted = [connection.ops.quote_name(field) for field in fields]
+        columns = ", ".join(quoted)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"INSERT INTO {table} (rowid, {columns}) "
+                f"SELECT {connection.ops.quote_name(model._meta.pk.column)}, "
+                + ", ".join(f"COALESCE({column}, '')" for column in quoted)
+                + f" FROM {connection.ops.quote_name(model._meta.db_table)}"
+            )
+
+    def match_query(self, tokens):
+        return " AND ".join(f'"{token}"*' for token in tokens)
+
+    def matching(self, model, tokens):
+        table = self.table_name(model)
+        return RawSQL(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s",
+            [self.match_query(tokens)],
+        )
+
+    def first_matches(self, model, tokens, limit):
+        return self._select(model, tokens, "", limit)
+
+    def search(self, model, tokens, limit):
+        return self._select(model, tokens, "ORDER BY rank", limit)
+
+    def _select(self, model, tokens, order_by, limit):
+        table = self.table_name(model)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s "
+                f"{order_by} LIMIT %s",
+                [self.match_query(tokens), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TokenTableBackend:
+    """Index rows as weighted tokens in the ``SearchToken`` table."""
+
+    name = "tokens"
+
+    @staticmethod
+    def is_available():
+        return True
+
+    def ensure_table(self, model, fields):
+        pass
+
+    def tokens_for(self, label, pk, values):
+        counts = Counter(token for value in values for token in tokenize(value))
+        return [
+            SearchToken(label=label, object_id=pk, token=token, weight=weight)
+            for token, weight in counts.items()
+        ]
+
+    def index(self, instance, fields):
+        label = model_label(type(instance))
+        SearchToken.objects.filter(label=label, object_id=instance.pk).delete()
+        SearchToken.objects.bulk_create(
+            self.tokens_for(
+                label, instance.pk, [getattr(instance, field) for field in fields]
+            )
+        )
+
+    def remove(self, model, pk):
+        SearchToken.objects.filter(label=model_label(model), object_id=pk).delete()
+
+    def rebuild(self, model, fields, chunk_size=2000):
+        label = model_label(model)
+        SearchToken.objects.filter(label=label).delete()
+        batch = []
+        rows = model._default_manager.values_list("pk", *fields)
+        for pk, *values in rows.iterator(chunk_size=chunk_size):
+            batch.extend(self.tokens_for(label, pk, values))
+            if len(batch) >= chunk_size:
+                SearchToken.objects.bulk_create(batch)
+                batch = []
+        SearchToken.objects.bulk_create(batch)
+
+    def scored(self, model, tokens):
+        # Every token must match a word prefix; rows are scored by the summed
+        # weight of their matching words
+        matches = [Q(token__gte=token, token__lt=token + "\uffff") for token in tokens]
+        any_match = Q()
+        for match in matches:
+            any_match |= match
+        per_token = {
+            f"token_{index}": Count("pk", filter=match)
+            for index, match in enumerate(matches)
+        }
+        return (
+            SearchToken.objects.filter(any_match, label=model_label(model))
+            .values("object_id")
+            .annotate(score=Sum("weight"), **per_token)
+            .filter(**{f"{name}__gt": 0 for name in per_token})
+        )
+
+    def matching(self, model, tokens):
+        return self.scored(model, tokens).values("object_id")
+
+    def first_matches(self, model, tokens, limit):
+        return list(
+            self.scored(model, tokens).values_list("object_id", flat=True)[:limit]
+        )
+
+    def search(self, model, tokens, limit):
+        rows = self.scored(model, tokens).order_by("-score", "object_id")
+        return list(rows.values_list("object_id", flat=True)[:limit])
+
+
+BACKENDS = {backend.name: backend for backend in (FTS5Backend, TokenTableBackend)}
+
+
+def get_backend():
+    """Return the configured search backend, or None when search is disabled."""
+    name = getattr(settings, "API_SEARCH_BACKEND", "auto")
+    if not name:
+        return None
+    if name == "auto":
+        name = "fts5" if FTS5Backend.is_available() else "tokens"
+    return BACKENDS[name]()
+
+
+def register(model, fields):
+    """
+    Keep ``fields`` of ``model`` in the search index, the ``search_fields`` of
+    the viewset searching it.
+
+    Rows are indexed on ``post_save`` and ``post_delete``, which
+    ``bulk_create()``, ``update()`` and raw SQL do not send: code writing a
+    registered model that way must ``rebuild()`` its index afterwards. Contacts,
+    stored in batches by api.ingest and updated by
+    ``ContactQuerySet.mark_responded``, are searched without the index.
+    """
+    # Without SearchFilter's lookup prefixes, meaningless to the index
+    _registry[model] = [field.lstrip("^=@$") for field in fields]
+    uid = f"api.search:{model_label(model)}"
+    post_save.connect(_index_instance, sender=model, dispatch_uid=uid)
+    post_delete.connect(_remove_instance, sender=model, dispatch_uid=uid)
+
+
+def registered_models():
+    return dict(_registry)
+
+
+def ensure_tables(**kwargs):
+    backend = get_backend()
+    if backend is not None:
+        for model, fields in _registry.items():
+            backend.ensure_table(model, fields)
+
+
+def rebuild(model):
+    backend = get_backend()
+    if backend is not None:
+        with transaction.atomic():
+            backend.rebuild(model, _registry[model])
+        # Search results may have changed without any row being saved
+        bump_version_on_commit(model)
+
+
+def _update_index(method, *args):
+    backend = get_backend()
+    if backend is None:
+        return
+    # A failing index write must not fail the save that triggered it
+    try:
+        with transaction.atomic():
+            getattr(backend, method)(*args)
+    except DatabaseError:
+        logger.exception("Could not update the search index")
+
+
+def _index_instance(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _update_index("index", instance, _registry[sender])
+
+
+def _remove_instance(sender, instance, **kwargs):
+    _update_index("remove", sender, instance.pk)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ``SearchFilter`` answering from the search index for registered models.
+
+    When at most ``API_SEARCH_MAX_RANKED`` rows match they are returned by
+    relevance. Broader searches, where ranking every match would cost more
+    than it is worth, keep the queryset's own ordering. Unregistered models,
+    and databases where the index cannot be queried, fall back to the regular
+    ``SearchFilter``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_backend()
+        tokens = [
+            token for term in self.get_search_terms(request) for token in tokenize(term)
+        ]
+        if backend is None or not tokens or queryset.model not in _registry:
+            return super().filter_queryset(request, queryset, view)
+
+        model = queryset.model
+        limit = getattr(settings, "API_SEARCH_MAX_RANKED", 200)
+        try:
+            with transaction.atomic():
+                matches = backend.first_matches(model, tokens, limit + 1)
+                if len(matches) > limit:
+                    return queryset.filter(pk__in=backend.matching(model, tokens))
+                if len(matches) > 1:
+                    matches = backend.search(model, tokens, limit)
+        except DatabaseError:
+            logger.exception("Could not query the search index")
+            return super().filter_queryset(request, queryset, view)
+
+        if not matches:
+            return queryset.none()
+        ranking = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(matches)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=matches).order_by(ranking)
@@ -1,10 +1,143 @@
+from django.db import models
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from .images import build_srcset, metadata_field
 from .models import TeamMember, Contact, Testimonial, ContactFAQ, MembershipFAQ
+from .storage import MediaURLBuilder
 
 
-class TeamMemberSerializer(serializers.ModelSerializer):
+def media_urls(serializer, storage=None):
+    """Return the request's ``MediaURLBuilder`` from a serializer's context."""
+    return MediaURLBuilder.for_request(serializer.context.get("request"), storage)
+
+
+def sparse_fieldset(request):
+    """
+    Return the ``(fields, expand)`` name sets of ``?fields=`` and ``?expand=``,
+    None when a parameter is absent. Only read requests are sparse.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    names = []
+    for param in ("fields", "expand"):
+        value = request.query_params.get(param)
+        if value is not None:
+            value = {name.strip() for name in value.split(",")} - {""}
+        names.append(value)
+    return tuple(names)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for sparse fieldsets.
+
+    ``?fields=`` keeps only the named fields, and the fields listed in
+    ``Meta.expandable_fields`` are left out unless named by ``?expand=``. Views
+    can prefetch just what gets rendered with ``get_prefetches()``, from
+    ``Meta.field_prefetches``, a mapping of field names to lookups. Nested
+    serializers and write payloads keep all their fields, and a false
+    ``sparse_fieldsets`` context ignores the query string.
+    """
+
+    @classmethod
+    def is_rendered(cls, name, fields, expand):
+        if name in getattr(cls.Meta, "expandable_fields", ()):
+            if name not in (expand or ()):
+                return False
+        return fields is None or name in fields
+
+    @classmethod
+    def renders_field(cls, name, request):
+        return cls.is_rendered(name, *sparse_fieldset(request))
+
+    @classmethod
+    def get_prefetches(cls, request):
+        """Return the ``Meta.field_prefetches`` lookups of rendered fields."""
+        return [
+            lookup
+            for name, lookups in getattr(cls.Meta, "field_prefetches", {}).items()
+            if cls.renders_field(name, request)
+            for lookup in lookups
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        root = self.root
+        if not (
+            self is root
+            or isinstance(root, serializers.ListSerializer)
+            and self is root.child
+        ):
+            return fields
+
+        requested, expand = None, None
+        if self.context.get("sparse_fieldsets", True):
+            requested, expand = sparse_fieldset(self.context.get("request"))
+        expandable = set(getattr(self.Meta, "expandable_fields", ()))
+        unknown = {
+            "fields": (requested or set()) - set(fields),
+            "expand": (expand or set()) - expandable,
+        }
+        errors = {
+            param: f"Unknown fields: {', '.join(sorted(names))}."
+            for param, names in unknown.items()
+            if names
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return {
+            name: field
+            for name, field in fields.items()
+            if self.is_rendered(name, requested, expand)
+        }
+
+
+class MediaImageField(serializers.ImageField):
+    """Image field whose URL comes from the request's ``MediaURLBuilder``."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not getattr(self, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+            return value.name
+        return media_urls(self, value.storage).url(value.name)
+
+
+class MediaModelSerializer(serializers.ModelSerializer):
+    """Model serializer rendering image fields with ``MediaImageField``."""
+
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaImageField,
+    }
+
+
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """
+    ``{format: srcset}`` of the derivatives of an image field, empty until
+    they are generated (see api.images).
+    """
+
+    def __init__(self, image_field="image", **kwargs):
+        self.image_field = image_field
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        return build_srcset(
+            image.name,
+            getattr(instance, metadata_field(self.image_field)),
+            media_urls(self, image.storage),
+        )
+
+
+class TeamMemberSerializer(SparseFieldsetMixin, MediaModelSerializer):
     """Serializer for the TeamMember model."""
 
+    image_srcset = ImageSrcsetField()
+
     class Meta:
         model = TeamMember
         fields = [
@@ -14,6 +147,7 @@ class TeamMemberSerializer(serializers.ModelSerializer):
             "role",
             "bio",
             "image",
+            "image_srcset",
             "email",
             "linkedin_profile",
             "order",
@@ -23,7 +157,7 @@ class TeamMemberSerializer(serializers.ModelSerializer):
         ]
 
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for the Contact model."""
 
     full_name = serializers.ReadOnlyField()
@@ -47,9 +181,47 @@ class ContactSerializer(serializers.ModelSerializer):
         read_only_fields = ["responded", "response_notes"]
 
 
-class TestimonialSerializer(serializers.ModelSerializer):
+class ContactBulkRespondSerializer(serializers.Serializer):
+    """Selects the contacts to mark as responded in one request."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=False,
+        max_length=1000,
+    )
+    inquiry_type = serializers.ChoiceField(
+        choices=Contact.INQUIRY_CHOICES, required=False
+    )
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    response_notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        if not {"ids", "inquiry_type", "created_after", "created_before"} & set(attrs):
+            raise serializers.ValidationError(
+                "Select contacts with ids, inquiry_type or a created date range."
+            )
+        return attrs
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        lookups = {
+            "pk__in": data.get("ids"),
+            "inquiry_type": data.get("inquiry_type"),
+            "created_at__gte": data.get("created_after"),
+            "created_at__lt": data.get("created_before"),
+        }
+        return queryset.filter(
+            **{lookup: value for lookup, value in lookups.items() if value is not None}
+        )
+
+
+class TestimonialSerializer(SparseFieldsetMixin, MediaModelSerializer):
     """Serializer for the Testimonial model."""
 
+    image_srcset = ImageSrcsetField()
+
     class Meta:
         model = Testimonial
         fields = [
@@ -59,6 +231,7 @@ class TestimonialSerializer(serializers.ModelSerializer):
             "company",
             "message",
             "image",
+            "image_srcset",
             "is_featured",
             "rating",
             "created_at",
@@ -66,7 +239,7 @@ class TestimonialSerializer(serializers.ModelSerializer):
         ]
 
 
-class ContactFAQSerializer(serializers.ModelSerializer):
+class ContactFAQSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for the ContactFAQ model."""
 
     class Meta:
@@ -83,7 +256,7 @@ class ContactFAQSerializer(serializers.ModelSerializer):
         ]
 
 
-class MembershipFAQSerializer(serializers.ModelSerializer):
+class MembershipFAQSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for the MembershipFAQ model."""
 
     class Meta:
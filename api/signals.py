@@ -0,0 +1,9 @@
+from django.db.models.signals import post_migrate
+
+from . import search
+from .cache import track_versions
+from .models import ContactFAQ, MembershipFAQ, TeamMember, Testimonial
+
+track_versions(TeamMember, Testimonial, ContactFAQ, MembershipFAQ)
+
+post_migrate.connect(search.ensure_tables, dispatch_uid="api.search.ensure_tables")
@@ -0,0 +1,111 @@
+import hashlib
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+
+HASH_LENGTH = 16
+
+# Names produced by HashedFileSystemStorage, e.g. "photo.0123456789abcdef.jpg"
+HASHED_NAME_RE = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}(\.[^./]+)?$")
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """
+    File system storage naming files after a hash of their content.
+
+    A file's URL changes whenever its content does, so media can be served
+    with far-future immutable caching (see api.media). Saving content that
+    is already stored under the same name reuses the existing file.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        root, ext = posixpath.splitext(name)
+        suffix = f".{digest.hexdigest()[:HASH_LENGTH]}{ext}"
+        if max_length is not None and len(root) + len(suffix) > max_length:
+            # Shorten the file name rather than let get_available_name()
+            # truncate the hash away
+            directory, stem = posixpath.split(root)
+            keep = max_length - len(suffix) - (len(root) - len(stem))
+            if keep < 1:
+                raise SuspiciousFileOperation(
+                    f'Storage can not find an available filename for "{name}".'
+                )
+            root = posixpath.join(directory, stem[:keep])
+        name = root + suffix
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+class MediaURLBuilder:
+    """
+    Build the URLs of stored files for one request.
+
+    The URL prefix is resolved once, from ``API_MEDIA_URLS``:
+
+    * ``"absolute"`` prefixes the storage URL with the request's scheme and
+      host, like ``request.build_absolute_uri(file.url)``,
+    * ``"relative"`` keeps the storage URL as is,
+    * ``"cdn"`` uses ``API_MEDIA_CDN_URL`` instead of the storage URL.
+
+    File system storages then only need ``filepath_to_uri()`` per file. Other
+    storages, whose URLs may be signed per file, still go through ``url()``.
+    """
+
+    def __init__(self, request=None, storage=None, mode=None):
+        self.request = request
+        self.storage = storage or default_storage
+        self.mode = mode or getattr(settings, "API_MEDIA_URLS", "absolute")
+        if self.mode == "cdn":
+            base = getattr(settings, "API_MEDIA_CDN_URL", None)
+            if not base:
+                raise ImproperlyConfigured(
+                    "API_MEDIA_URLS = 'cdn' requires API_MEDIA_CDN_URL."
+                )
+            self.prefix = base.rstrip("/") + "/"
+        elif isinstance(self.storage, FileSystemStorage):
+            self.prefix = self.absolute(self.storage.base_url)
+        else:
+            self.prefix = None
+
+    def absolute(self, url):
+        if self.mode == "absolute" and self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def url(self, name):
+        if not name:
+            return None
+        if self.prefix is None:
+            return self.absolute(self.storage.url(name))
+        return self.prefix + filepath_to_uri(name).lstrip("/")
+
+    @classmethod
+    def for_request(cls, request, storage=None):
+        """Return the builder of ``storage`` for ``request``, made once."""
+        storage = storage or default_storage
+        if request is None:
+            return cls(None, storage)
+        builders = request.__dict__.setdefault("_media_url_builders", {})
+        if storage not in builders:
+            builders[storage] = cls(request, storage)
+        return builders[storage]
@@ -1,3 +1,1086 @@
-from django.test import TestCase
+import asyncio
+import shutil
+import tempfile
+import csv
+import json
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APITestCase
+
+from . import pages, search
+from .checks import check_response_cache, check_throttle_store
+from .fastpath import ValuesSerializer
+from .instrumentation import InstrumentationMiddleware, QueryBudgetExceeded, stats
+from .middleware import WhiteNoiseMiddleware
+from .ingest import ContactQueue
+from .throttling import AnonRateThrottle, get_store
+from .mixins import ValuesListMixin
+from .views import TeamMemberViewSet
+from .serializers import ContactSerializer, TeamMemberSerializer
+from .models import Contact, ContactFAQ, SearchToken, TeamMember, Testimonial
+
+
+def make_team_member(name, **kwargs):
+    defaults = {
+        "designation": "Coordinator",
+        "role": "staff",
+        "image": "team_members/member.jpg",
+    }
+    defaults.update(kwargs)
+    return TeamMember.objects.create(name=name, **defaults)
+
+
+def make_staff_user():
+    return get_user_model().objects.create_user(
+        "staff@example.com", "staff", password="password", is_staff=True
+    )
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = make_team_member("Asha")
+        make_team_member("Bikash", is_active=False)
+
+    def test_list_answers_not_modified_until_data_changes(self):
+        response = self.client.get("/api/team-members/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        # Without a cached response only the fingerprint query runs
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/team-members/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.member.designation = "Director"
+        self.member.save()
+        response = self.client.get("/api/team-members/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_validators_depend_on_query_and_visibility(self):
+        etag = self.client.get("/api/team-members/")["ETag"]
+        self.assertNotEqual(
+            self.client.get("/api/team-members/", {"role": "staff"})["ETag"], etag
+        )
+        self.client.force_authenticate(make_staff_user())
+        response = self.client.get("/api/team-members/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_detail_answers_not_modified(self):
+        url = f"/api/team-members/{self.member.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Testimonial.objects.create(name="Sita", designation="Donor", message="Great")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.member.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_detail_is_not_found(self):
+        self.assertEqual(self.client.get("/api/team-members/999/").status_code, 404)
+
+    def test_deleting_a_row_changes_the_list_validators(self):
+        faq = ContactFAQ.objects.create(question="Why?", answer="Because.")
+        ContactFAQ.objects.create(question="How?", answer="Like this.")
+        etag = self.client.get("/api/contact-faqs/")["ETag"]
+        faq.delete()
+        response = self.client.get("/api/contact-faqs/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(make_staff_user())
+        self.contacts = [
+            Contact.objects.create(
+                first_name=f"Person{index}",
+                last_name="Doe",
+                email=f"person{index}@example.com",
+                message="Hello",
+            )
+            for index in range(25)
+        ]
+        # Ties on created_at are broken by id
+        Contact.objects.filter(pk__in=[c.pk for c in self.contacts[5:15]]).update(
+            created_at=self.contacts[5].created_at
+        )
+
+    def walk(self, url, params=None, key="next"):
+        names = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            names.extend(item["first_name"] for item in response.data["results"])
+            url, params = response.data[key], None
+        return names
+
+    def expected(self, *ordering):
+        return list(
+            Contact.objects.order_by(*ordering).values_list("first_name", flat=True)
+        )
+
+    def test_cursor_pages_walk_the_whole_collection_once(self):
+        response = self.client.get("/api/contact/", {"cursor": ""})
+        self.assertEqual(response.data["count"], 25)
+        self.assertIsNone(response.data["previous"])
+        self.assertEqual(
+            self.walk("/api/contact/", {"cursor": ""}),
+            self.expected("-created_at", "-id"),
+        )
+        self.assertEqual(
+            self.walk("/api/contact/", {"cursor": "", "ordering": "created_at"}),
+            self.expected("created_at", "id"),
+        )
+
+    def test_previous_links_walk_back(self):
+        first = self.client.get("/api/contact/", {"cursor": ""}).data
+        second = self.client.get(first["next"]).data
+        last = self.client.get(second["next"]).data
+        self.assertIsNone(last["next"])
+        back = self.client.get(last["previous"]).data
+        self.assertEqual(back["results"], second["results"])
+        back = self.client.get(back["previous"]).data
+        self.assertEqual(back["results"], first["results"])
+
+    def test_deep_pages_do_not_use_offset_or_count(self):
+        first = self.client.get("/api/contact/", {"cursor": "", "count": "false"})
+        self.assertNotIn("count", first.data)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data["next"])
+        selects = [q["sql"] for q in queries if "api_contact" in q["sql"]]
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn("OFFSET", selects[0])
+        self.assertNotIn("COUNT", selects[0])
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ["garbage", "eyJwIjogWzFdfQ=="]:
+            response = self.client.get("/api/contact/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_team_members_use_order_and_name(self):
+        TeamMember.objects.bulk_create(
+            [
+                TeamMember(name=name, designation="Staff", role="staff", order=order)
+                for order, name in [(2, "Abe"), (1, "Zed"), (1, "Amy"), (0, "Kim")] * 4
+            ]
+        )
+        response = self.client.get("/api/team-members/", {"cursor": ""})
+        names = [item["name"] for item in response.data["results"]]
+        self.assertEqual(names[:5], ["Kim"] * 4 + ["Amy"])
+        next_page = self.client.get(response.data["next"]).data["results"]
+        ids = [item["id"] for item in response.data["results"] + next_page]
+        self.assertEqual(len(set(ids)), 16)
+
+    def test_cursor_pages_refuse_orderings_they_cannot_follow(self):
+        for ordering in ["-order", "order,name"]:
+            response = self.client.get(
+                "/api/team-members/", {"cursor": "", "ordering": ordering}
+            )
+            self.assertEqual(response.status_code, 200)
+        for ordering in ["name", "-order,name"]:
+            response = self.client.get(
+                "/api/team-members/", {"cursor": "", "ordering": ordering}
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("ordering", response.data)
+        # Page numbers follow any ordering
+        response = self.client.get("/api/team-members/", {"ordering": "name"})
+        self.assertEqual(response.status_code, 200)
+
+
+class PageNumberCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for index in range(12):
+            make_team_member(f"Member{index:02}")
+
+    def test_count_can_be_skipped(self):
+        response = self.client.get("/api/team-members/")
+        self.assertEqual(response.data["count"], 12)
+
+        response = self.client.get("/api/team-members/", {"count": "false"})
+        self.assertNotIn("count", response.data)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertIsNone(response.data["previous"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+
+        response = self.client.get("/api/team-members/", {"count": "0", "page": 3})
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        make_team_member("Asha")
+
+    def test_fields_prune_read_responses(self):
+        response = self.client.get("/api/team-members/", {"fields": "id, name"})
+        self.assertEqual(list(response.data["results"][0]), ["id", "name"])
+
+        response = self.client.get("/api/team-members/", {"fields": "name,salary"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("salary", str(response.data["fields"]))
+        response = self.client.get("/api/team-members/", {"expand": "image"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_writes_keep_every_field(self):
+        response = self.client.post(
+            "/api/contact/?fields=id",
+            {
+                "first_name": "Mina",
+                "last_name": "Rai",
+                "email": "mina@example.com",
+                "inquiry_type": "other",
+                "message": "Hello",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["email"], "mina@example.com")
+
+
+class PageBundleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        make_team_member("Asha")
+        make_team_member("Bikash", is_active=False)
+        self.faq = ContactFAQ.objects.create(
+            question="How do I volunteer?", answer="Write to us.", category="general"
+        )
+
+    def test_bundle_matches_the_listings(self):
+        response = self.client.get("/api/pages/contact/")
+        self.assertEqual(list(response.data), ["contact_faqs", "membership_faqs"])
+        listing = self.client.get("/api/contact-faqs/").data["results"]
+        self.assertEqual(response.data["contact_faqs"], listing)
+        self.assertEqual(response.data["membership_faqs"], [])
+
+        team = self.client.get("/api/pages/home/").data["team_members"]
+        self.assertEqual([member["name"] for member in team], ["Asha"])
+        self.assertEqual(self.client.get("/api/pages/nope/").status_code, 404)
+
+    def test_sections_are_cached_under_a_combined_etag(self):
+        etag = self.client.get("/api/pages/contact/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/pages/contact/")
+            self.assertEqual(response["ETag"], etag)
+            response = self.client.get("/api/pages/contact/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+        # Only the changed section is rebuilt, in a single query
+        self.faq.answer = "Fill in the form."
+        self.faq.save()
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/pages/contact/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        faq = response.data["contact_faqs"][0]
+        self.assertEqual(faq["answer"], "Fill in the form.")
+
+    def test_sections_are_keyed_by_scheme(self):
+        sections = pages.get_page("contact")
+        http = pages.section_keys(sections, RequestFactory().get("/"))
+        https = pages.section_keys(sections, RequestFactory().get("/", secure=True))
+        self.assertTrue(set(http).isdisjoint(https))
+
+    def test_query_parameters_do_not_prune_sections(self):
+        response = self.client.get("/api/pages/contact/", {"fields": "id"})
+        self.assertIn("answer", response.data["contact_faqs"][0])
+
+
+class ValuesListTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        for index in range(12):
+            make_team_member(
+                f"Member{index:02}",
+                order=index % 3,
+                bio="Bío with ünicode" if index % 2 else "",
+                image="" if index == 5 else f"team_members/m {index}.jpg",
+            )
+        TeamMember.objects.filter(name="Member01").update(
+            image_derivatives={
+                "name": "team_members/m 1.jpg",
+                "widths": [320],
+                "files": {"webp": ["team_members/derivatives/m 1-320w.webp"]},
+            }
+        )
+        Testimonial.objects.create(
+            name="Rita", message="Great", rating=4, is_featured=True
+        )
+        ContactFAQ.objects.create(question="Why?", answer="Because.", category="x")
+
+    def assertSameAsSerializer(self, url, params=None):
+        fast = self.client.get(url, params)
+        cache.clear()
+        with mock.patch.object(
+            ValuesListMixin, "get_values_serializer", return_value=None
+        ):
+            regular = self.client.get(url, params)
+        cache.clear()
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, regular.content)
+        return json.loads(fast.content)
+
+    def test_lists_are_identical_to_the_serializers(self):
+        self.assertSameAsSerializer("/api/team-members/")
+        self.assertSameAsSerializer("/api/team-members/", {"ordering": "-name"})
+        self.assertSameAsSerializer("/api/team-members/", {"fields": "name,image"})
+        self.assertSameAsSerializer("/api/testimonials/")
+        self.assertSameAsSerializer("/api/contact-faqs/")
+
+        page = self.assertSameAsSerializer("/api/team-members/", {"cursor": ""})
+        cursor = parse_qs(urlsplit(page["next"]).query)["cursor"][0]
+        page = self.assertSameAsSerializer("/api/team-members/", {"cursor": cursor})
+        self.assertEqual(len(page["results"]), 2)
+
+    def test_fields_without_a_column_are_unsupported(self):
+        context = {"request": None}
+        supported = ValuesSerializer(TeamMemberSerializer(context=context))
+        self.assertTrue(supported.supported)
+        # Contact.full_name is a property
+        unsupported = ValuesSerializer(ContactSerializer(context=context))
+        self.assertFalse(unsupported.supported)
+
+
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        make_team_member("Asha")
+
+    def test_responses_carry_server_timing(self):
+        response = self.client.get("/api/team-members/")
+        timing = response["Server-Timing"]
+        self.assertIn('desc="3 queries"', timing)
+        self.assertIn("serializer;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    def test_server_timing_can_be_restricted_to_staff(self):
+        with override_settings(API_SERVER_TIMING="staff"):
+            response = self.client.get("/api/team-members/")
+            self.assertNotIn("Server-Timing", response)
+            self.client.force_authenticate(make_staff_user())
+            response = self.client.get("/api/team-members/")
+            self.assertIn("Server-Timing", response)
+            self.client.force_authenticate(None)
+        with override_settings(API_SERVER_TIMING=False):
+            self.assertNotIn("Server-Timing", self.client.get("/api/team-members/"))
+
+    def test_views_time_their_serializers(self):
+        member = TeamMember.objects.get()
+        self.client.get(f"/api/team-members/{member.pk}/")
+        endpoint = stats.snapshot()["TeamMemberViewSet.retrieve"]
+        self.assertGreater(endpoint["serializer_ms"], 0)
+        # Serializers outside the views are left alone
+        self.assertEqual(BaseSerializer.data.fget.__module__, BaseSerializer.__module__)
+
+    def test_stats_are_aggregated_per_endpoint_for_staff(self):
+        size = len(self.client.get("/api/team-members/").content)
+        self.client.get("/api/team-members/")
+        self.assertEqual(self.client.get("/api/stats/endpoints/").status_code, 403)
+
+        self.client.force_authenticate(make_staff_user())
+        endpoints = self.client.get("/api/stats/endpoints/").data
+        team = endpoints["TeamMemberViewSet.list"]
+        self.assertEqual(team["requests"], 2)
+        self.assertEqual(team["max_queries"], 3)
+        self.assertEqual(team["bytes"], size * 2)
+        self.assertEqual(team["over_budget"], 0)
+
+        self.client.delete("/api/stats/endpoints/")
+        endpoints = self.client.get("/api/stats/endpoints/").data
+        self.assertNotIn("TeamMemberViewSet.list", endpoints)
+
+    def test_query_budgets_fail_in_tests(self):
+        with mock.patch.object(TeamMemberViewSet, "query_budget", {"list": 2}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/api/team-members/")
+            with override_settings(API_QUERY_BUDGETS="warn"):
+                with self.assertLogs("api.instrumentation", "WARNING"):
+                    response = self.client.get("/api/team-members/?page=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stats.snapshot()["TeamMemberViewSet.list"]["over_budget"], 2)
+
+
+class CachedResponseTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.testimonial = Testimonial.objects.create(
+            name="Sita", designation="Donor", message="Great work", is_featured=True
+        )
+        Testimonial.objects.create(name="Ram", designation="Volunteer", message="Kind")
+
+    def test_cache_hit_runs_no_queries(self):
+        first = self.client.get("/api/testimonials/")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/testimonials/")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second["Last-Modified"], first["Last-Modified"])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/testimonials/", HTTP_IF_NONE_MATCH=first["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_saves_and_deletes_invalidate_entries(self):
+        self.client.get("/api/testimonials/")
+        self.testimonial.message = "Amazing work"
+        self.testimonial.save()
+        response = self.client.get("/api/testimonials/")
+        self.assertEqual(response.data["results"][0]["message"], "Amazing work")
+
+        self.testimonial.delete()
+        self.assertEqual(self.client.get("/api/testimonials/").data["count"], 0)
+
+    def test_entries_cached_before_a_commit_are_expired_by_it(self):
+        self.client.get("/api/testimonials/")
+        pk = self.testimonial.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.testimonial.message = "Amazing work"
+                self.testimonial.save()
+                # A concurrent request still reads the committed row, and
+                # caches it under the version bumped by the save
+                Testimonial.objects.filter(pk=pk).update(message="Great work")
+                response = self.client.get("/api/testimonials/")
+                self.assertEqual(response.data["results"][0]["message"], "Great work")
+                Testimonial.objects.filter(pk=pk).update(message="Amazing work")
+        response = self.client.get("/api/testimonials/")
+        self.assertEqual(response.data["results"][0]["message"], "Amazing work")
+
+    def test_deploy_check_warns_about_per_process_caches(self):
+        self.assertEqual([w.id for w in check_response_cache(None)], ["api.W001"])
+        dummy = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+        with override_settings(CACHES=dummy):
+            self.assertEqual(check_response_cache(None), [])
+
+    def test_entries_are_keyed_by_params_and_visibility(self):
+        self.assertEqual(self.client.get("/api/testimonials/").data["count"], 1)
+        response = self.client.get("/api/testimonials/", {"rating": 4})
+        self.assertEqual(response.data["count"], 0)
+        self.client.force_authenticate(make_staff_user())
+        self.assertEqual(self.client.get("/api/testimonials/").data["count"], 2)
+
+    def test_entries_are_keyed_by_scheme(self):
+        Testimonial.objects.bulk_create(
+            Testimonial(name=f"Donor {n}", message="Thanks", is_featured=True)
+            for n in range(10)
+        )
+        response = self.client.get("/api/testimonials/")
+        self.assertTrue(response.data["next"].startswith("http://"))
+        response = self.client.get("/api/testimonials/", secure=True)
+        self.assertTrue(response.data["next"].startswith("https://"))
+
+
+class AsyncReadTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = make_team_member("Sita")
+        self.list_view = TeamMemberViewSet.as_async_view(
+            TeamMemberViewSet.as_view({"get": "list"})
+        )
+        self.detail_view = TeamMemberViewSet.as_async_view(
+            TeamMemberViewSet.as_view({"get": "retrieve"})
+        )
+        self.factory = AsyncRequestFactory()
+
+    async def test_cached_responses_are_served_without_the_sync_view(self):
+        expected = await sync_to_async(self.client.get)("/api/team-members/")
+        with mock.patch.object(TeamMemberViewSet, "list", side_effect=AssertionError):
+            response = await self.list_view(self.factory.get("/api/team-members/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["ETag"], expected["ETag"])
+
+    async def test_misses_fall_back_to_the_sync_view(self):
+        response = await self.list_view(self.factory.get("/api/team-members/"))
+        self.assertEqual(response.data["results"][0]["name"], "Sita")
+
+        url = f"/api/team-members/{self.member.pk}/"
+        response = await self.detail_view(self.factory.get(url), pk=str(self.member.pk))
+        self.assertEqual(response.data["name"], "Sita")
+        missing = await self.detail_view(self.factory.get(url), pk="999")
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_conditional_retrieve_is_answered_on_the_loop(self):
+        url = f"/api/team-members/{self.member.pk}/"
+        etag = (await sync_to_async(self.client.get)(url))["ETag"]
+        await sync_to_async(cache.clear)()
+        with mock.patch.object(
+            TeamMemberViewSet, "retrieve", side_effect=AssertionError
+        ):
+            response = await self.detail_view(
+                self.factory.get(url, headers={"If-None-Match": etag}),
+                pk=str(self.member.pk),
+            )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_requests_are_throttled_once(self):
+        rates = {"anon": "2/minute"}
+        with mock.patch.object(AnonRateThrottle, "THROTTLE_RATES", rates):
+            for status in (200, 200, 429):
+                response = await self.list_view(self.factory.get("/api/team-members/"))
+                self.assertEqual(response.status_code, status)
+
+    async def test_throttles_run_off_the_event_loop(self):
+        def allow_request(throttle, request, view):
+            with self.assertRaises(RuntimeError):
+                asyncio.get_running_loop()
+            return True
+
+        with mock.patch.object(AnonRateThrottle, "allow_request", allow_request):
+            response = await self.list_view(self.factory.get("/api/team-members/"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_middleware_supports_async_chains(self):
+        async def get_response(request):
+            pass
+
+        for middleware in (InstrumentationMiddleware, WhiteNoiseMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware(get_response)))
+            self.assertFalse(iscoroutinefunction(middleware(lambda request: None)))
+
+
+class FullTextSearchTests(APITestCase):
+    backend = "fts5"
+
+    def setUp(self):
+        cache.clear()
+        override = override_settings(API_SEARCH_BACKEND=self.backend)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.volunteer = ContactFAQ.objects.create(
+            question="How do I volunteer?",
+            answer="Volunteers sign up online. Volunteering takes an afternoon.",
+        )
+        self.donate = ContactFAQ.objects.create(
+            question="How can I donate?", answer="Donations are accepted online."
+        )
+        ContactFAQ.objects.create(
+            question="Can I volunteer abroad?",
+            answer="Not yet.",
+            is_published=False,
+        )
+
+    def search(self, query, **params):
+        response = self.client.get("/api/contact-faqs/", {"search": query, **params})
+        return [item["question"] for item in response.data["results"]]
+
+    def test_indexed_fields_are_the_viewset_search_fields(self):
+        registered = search.registered_models()
+        self.assertEqual(registered[TeamMember], TeamMemberViewSet.search_fields)
+
+    def test_terms_match_word_prefixes_of_every_field(self):
+        self.assertEqual(self.search("volunt"), ["How do I volunteer?"])
+        self.assertCountEqual(
+            self.search("online"), ["How do I volunteer?", "How can I donate?"]
+        )
+        self.assertEqual(self.search("online donat"), ["How can I donate?"])
+        self.assertEqual(self.search("nothing"), [])
+
+    def test_results_are_ranked_by_relevance(self):
+        ContactFAQ.objects.create(question="Donate", answer="Donate, donate, donate.")
+        self.assertEqual(self.search("donate")[0], "Donate")
+
+    @override_settings(API_SEARCH_MAX_RANKED=1)
+    def test_broad_searches_keep_the_default_ordering(self):
+        ContactFAQ.objects.create(question="A donation question", answer="Online")
+        self.assertEqual(
+            self.search("online"),
+            ["A donation question", "How can I donate?", "How do I volunteer?"],
+        )
+
+    def test_index_follows_saves_and_deletes(self):
+        self.donate.answer = "Use the donation form."
+        self.donate.save()
+        self.assertEqual(self.search("online"), ["How do I volunteer?"])
+        self.assertEqual(self.search("form"), ["How can I donate?"])
+
+        self.volunteer.delete()
+        self.assertEqual(self.search("volunteer"), [])
+
+    def test_search_keeps_visibility_rules(self):
+        self.assertEqual(self.search("abroad"), [])
+        self.client.force_authenticate(make_staff_user())
+        self.assertEqual(self.search("abroad"), ["Can I volunteer abroad?"])
+
+    def test_rebuild_indexes_existing_rows(self):
+        ContactFAQ.objects.bulk_create(
+            [ContactFAQ(question="Where are you based?", answer="In Nepal.")]
+        )
+        self.assertEqual(self.search("nepal"), [])
+        call_command("rebuild_search_index", "api.ContactFAQ", stdout=StringIO())
+        self.assertEqual(self.search("nepal"), ["Where are you based?"])
+        self.assertEqual(self.search("volunteer"), ["How do I volunteer?"])
+
+
+class TokenTableSearchTests(FullTextSearchTests):
+    backend = "tokens"
+
+    def test_tokens_are_weighted_per_object(self):
+        tokens = SearchToken.objects.filter(
+            label="api.contactfaq", object_id=self.volunteer.pk
+        )
+        self.assertEqual(tokens.get(token="volunteers").weight, 1)
+        self.assertEqual(tokens.get(token="online").weight, 1)
+        self.assertEqual(tokens.get(token="how").weight, 1)
+
+
+@override_settings(API_SEARCH_BACKEND=None)
+class DisabledSearchIndexTests(APITestCase):
+    def test_search_falls_back_to_search_filter(self):
+        cache.clear()
+        make_team_member("Asha", bio="Leads the water projects")
+        self.assertIsNone(search.get_backend())
+        response = self.client.get("/api/team-members/", {"search": "ater proj"})
+        self.assertEqual(response.data["count"], 1)
+
+
+class ExplainListQueriesTests(APITestCase):
+    def explain(self, *args):
+        out = StringIO()
+        call_command("explain_list_queries", *args, stdout=out)
+        return {
+            line.split()[0]: line.split()[1:] for line in out.getvalue().splitlines()
+        }
+
+    def test_default_list_queries_use_indexes(self):
+        report = self.explain()
+        self.assertEqual(
+            report["TeamMemberViewSet"], ["index", "no", "api_team_active_order"]
+        )
+        self.assertEqual(
+            report["ContactFAQViewSet"], ["index", "no", "api_contactfaq_published"]
+        )
+        self.assertEqual(
+            report["ContactViewSet"], ["index", "no", "api_contact_created_id"]
+        )
+
+    def test_filters_and_staff_querysets_are_explained(self):
+        report = self.explain("--staff", "--query", "inquiry_type=media")
+        self.assertEqual(report["ContactViewSet"][:2], ["index", "no"])
+        self.assertIn("api_contact_inquiry", report["ContactViewSet"][2])
+
+
+class BenchEndpointsTests(APITestCase):
+    def test_writes_comparable_results_and_rolls_back(self):
+        output = Path(tempfile.mkdtemp()) / "bench.json"
+        self.addCleanup(shutil.rmtree, output.parent)
+        options = {"requests": 2, "warmup": 0, "stderr": StringIO()}
+        call_command(
+            "bench_endpoints",
+            "--seed",
+            "--scale=0.05",
+            "--staff",
+            f"--output={output}",
+            stdout=StringIO(),
+            **options,
+        )
+        results = json.loads(output.read_text())
+        endpoints = results["endpoints"]
+        self.assertEqual(endpoints["ContactViewSet.list"]["status"], [200])
+        self.assertEqual(endpoints["ProjectViewSet.retrieve"]["status"], [200])
+        self.assertIn("page:home", endpoints)
+        for result in endpoints.values():
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+            self.assertGreater(result["requests_per_second"], 0)
+        self.assertFalse(TeamMember.objects.exists())
+        self.assertFalse(Contact.objects.exists())
+
+        out = StringIO()
+        call_command(
+            "bench_endpoints",
+            f"--compare={output}",
+            "--endpoint=TeamMember",
+            stdout=out,
+            **options,
+        )
+        self.assertIn("TeamMemberViewSet.list", out.getvalue())
+        self.assertNotIn("ProjectViewSet", out.getvalue())
+
+
+class DatabaseConnectionTests(APITestCase):
+    def test_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+        # Read-only transactions do not take the write lock
+        self.assertIsNone(connection.transaction_mode)
+        self.assertTrue(connection.settings_dict["CONN_HEALTH_CHECKS"])
+
+    def test_bench_db_connections(self):
+        cache.clear()
+        make_team_member("Sita")
+        ContactFAQ.objects.create(question="How?", answer="Like this.")
+        settings_dict = dict(connection.settings_dict)
+        out = StringIO()
+        with override_settings(ALLOWED_HOSTS=["localhost"]):
+            call_command(
+                "bench_db_connections", "--requests=8", "--connects=2", stdout=out
+            )
+        rows = out.getvalue().splitlines()[1:]
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(rows[0].startswith("per request"))
+        self.assertTrue(rows[-1].startswith("persistent"))
+        self.assertEqual(connection.settings_dict, settings_dict)
+
+
+class ThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(
+            AnonRateThrottle, "THROTTLE_RATES", {"anon": "3/minute"}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertThrottledAfter(self, count):
+        for _ in range(count):
+            self.assertEqual(self.client.get("/api/team-members/").status_code, 200)
+        response = self.client.get("/api/team-members/")
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response["Retry-After"]), 60)
+
+    def test_fixed_window_counts_requests(self):
+        self.assertThrottledAfter(3)
+        self.assertIn(
+            "api.throttling.AnonRateThrottle",
+            settings.REST_FRAMEWORK["DEFAULT_THROTTLE_CLASSES"],
+        )
+
+    def test_counters_reset_in_the_next_window(self):
+        with mock.patch.object(AnonRateThrottle, "timer", return_value=6000.0):
+            self.assertThrottledAfter(3)
+        with mock.patch.object(AnonRateThrottle, "timer", return_value=6060.0):
+            self.assertThrottledAfter(3)
+
+    def test_deploy_check_warns_about_per_process_counters(self):
+        self.assertEqual([w.id for w in check_throttle_store(None)], ["api.W002"])
+        with override_settings(API_THROTTLE_STORE="sqlite"):
+            self.assertEqual(check_throttle_store(None), [])
+
+    def test_sqlite_store(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = Path(directory) / "throttle.sqlite3"
+        with override_settings(
+            API_THROTTLE_STORE="sqlite", API_THROTTLE_SQLITE_PATH=path
+        ):
+            self.assertThrottledAfter(3)
+
+            # Increments from separate connections are not lost
+            store = get_store()
+            threads = [
+                threading.Thread(
+                    target=lambda: [store.incr("key", 1, 60) for _ in range(50)]
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(store.incr("key", 1, 60), 201)
+            self.assertEqual(store.incr("key", 2, 120), 1)
+
+
+class ContactQueueTests(APITestCase):
+    payload = {
+        "first_name": "Sita",
+        "last_name": "Rai",
+        "email": "sita@example.com",
+        "inquiry_type": "volunteer",
+        "message": "I would like to help.",
+    }
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = Path(directory)
+        override = override_settings(
+            CONTACT_INGEST_MODE="queue", CONTACT_INGEST_QUEUE_DIR=directory
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def submit(self, **changes):
+        return self.client.post(
+            "/api/contact/", {**self.payload, **changes}, format="json"
+        )
+
+    def test_submissions_are_accepted_then_stored_in_batches(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 202)
+        self.submit(first_name="Ram")
+        self.assertFalse(Contact.objects.exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ContactQueue().flush(batch_size=10), 2)
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        contact = Contact.objects.get(first_name="Sita")
+        self.assertEqual(str(contact.submission_id), response.data["id"])
+        self.assertEqual(contact.inquiry_type, "volunteer")
+        self.assertEqual(ContactQueue().flush(), 0)
+
+    def test_flush_skips_while_another_worker_holds_the_lock(self):
+        self.submit()
+        queue = ContactQueue()
+        with queue.lock("worker.lock") as acquired:
+            self.assertTrue(acquired)
+            self.assertEqual(ContactQueue().flush(), 0)
+        self.assertEqual(queue.flush(), 1)
+
+    def test_invalid_submissions_are_rejected_before_queueing(self):
+        self.assertEqual(self.submit(email="not-an-email").status_code, 400)
+        self.assertEqual(ContactQueue().pending_bytes(), 0)
+
+    def test_replayed_batches_are_not_duplicated(self):
+        self.submit()
+        queue = ContactQueue()
+        queue.rotate()
+        batch = next(self.directory.glob("batch-*.jsonl"))
+        replay = batch.read_text()
+        queue.flush()
+        # A worker that died before deleting the batch stores it again
+        (self.directory / "batch-0.jsonl").write_text(replay + '{"id": "trunc')
+        with self.assertLogs("api.ingest", "WARNING"):
+            self.assertEqual(queue.flush(), 1)
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_full_queue_applies_backpressure(self):
+        with override_settings(CONTACT_INGEST_MAX_QUEUE_BYTES=1):
+            self.assertEqual(self.submit().status_code, 202)
+            response = self.submit()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "30")
+
+    @override_settings(CONTACT_INGEST_MODE="direct")
+    def test_direct_mode_saves_on_the_request(self):
+        self.assertEqual(self.submit().status_code, 201)
+        self.assertEqual(Contact.objects.count(), 1)
+
+
+class BulkMarkRespondedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = make_staff_user()
+        self.client.force_authenticate(self.staff)
+        self.contacts = [
+            Contact.objects.create(
+                first_name=f"Person{index}",
+                last_name="Doe",
+                email=f"person{index}@example.com",
+                inquiry_type="media" if index % 2 else "donation",
+                message="Hello",
+            )
+            for index in range(6)
+        ]
+
+    def mark(self, **data):
+        return self.client.post("/api/contact/mark-responded/", data, format="json")
+
+    def test_ids_are_marked_in_one_update(self):
+        ids = [contact.pk for contact in self.contacts[:3]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.mark(ids=ids, response_notes="Called back")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 3)
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        responded = Contact.objects.filter(responded=True)
+        self.assertCountEqual(responded.values_list("pk", flat=True), ids)
+        self.assertEqual(
+            set(responded.values_list("response_notes", flat=True)), {"Called back"}
+        )
+
+    def test_filters_select_contacts(self):
+        Contact.objects.filter(pk=self.contacts[5].pk).update(
+            created_at="2020-01-01T00:00:00Z"
+        )
+        response = self.mark(
+            inquiry_type="media", created_after="2021-01-01T00:00:00Z"
+        )
+        self.assertEqual(response.data["updated"], 2)
+        self.assertFalse(Contact.objects.get(pk=self.contacts[5].pk).responded)
+        self.assertEqual(
+            Contact.objects.get(pk=self.contacts[1].pk).response_notes, ""
+        )
+
+    def test_a_selector_is_required_and_staff_only(self):
+        self.assertEqual(self.mark(response_notes="All").status_code, 400)
+        self.assertFalse(Contact.objects.filter(responded=True).exists())
+        self.client.force_authenticate(None)
+        self.assertEqual(self.mark(ids=[1]).status_code, 403)
+
+    def test_ids_are_limited_per_request(self):
+        ids = [self.contacts[0].pk] * 1000
+        self.assertEqual(self.mark(ids=ids).data["updated"], 1)
+        response = self.mark(ids=ids + [self.contacts[1].pk])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ids", response.data)
+        self.assertFalse(Contact.objects.get(pk=self.contacts[1].pk).responded)
+
+    def test_admin_action_marks_selection(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser(
+                "admin@example.com", "admin", password="password"
+            )
+        )
+        response = self.client.post(
+            "/admin/api/contact/",
+            {
+                "action": "mark_responded",
+                "_selected_action": [self.contacts[0].pk, self.contacts[1].pk],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Contact.objects.filter(responded=True).count(), 2)
+
+
+class ContactExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(make_staff_user())
+        for index, inquiry_type in enumerate(["media", "donation", "media"]):
+            Contact.objects.create(
+                first_name=f"Person{index}",
+                last_name="Doe",
+                email=f"person{index}@example.com",
+                inquiry_type=inquiry_type,
+                message="=HYPERLINK(1)" if index == 2 else "Hello, world",
+            )
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_streams_matching_rows(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/contact/export/", {"inquiry_type": "media"}
+            )
+            rows = list(csv.DictReader(StringIO(self.content(response))))
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        self.assertIn("attachment;", response["Content-Disposition"])
+        self.assertEqual([row["first_name"] for row in rows], ["Person2", "Person0"])
+        self.assertEqual(rows[0]["message"], "'=HYPERLINK(1)")
+        self.assertEqual(rows[1]["responded"], "False")
+        self.assertTrue(rows[1]["created_at"].endswith("Z"))
+
+    def test_ndjson_export_and_date_filters(self):
+        Contact.objects.filter(first_name="Person0").update(
+            created_at="2020-01-01T00:00:00Z"
+        )
+        response = self.client.get(
+            "/api/contact/export/",
+            {"format": "ndjson", "created_before": "2021-01-01T00:00:00Z"},
+        )
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["message"], "Hello, world")
+        self.assertEqual(rows[0]["created_at"], "2020-01-01T00:00:00Z")
+
+    def test_export_is_staff_only(self):
+        self.client.force_authenticate(None)
+        response = self.client.get("/api/contact/export/")
+        self.assertEqual(response.status_code, 403)
+
+
+class MediaServingTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.name = default_storage.save("docs/report.txt", ContentFile(b"0123456789"))
+
+    def get(self, name, **headers):
+        return self.client.get(f"/media/{name}", headers=headers)
+
+    def test_uploads_are_named_after_their_content(self):
+        self.assertRegex(self.name, r"^docs/report\.[0-9a-f]{16}\.txt$")
+        again = default_storage.save("docs/report.txt", ContentFile(b"0123456789"))
+        self.assertEqual(again, self.name)
+        other = default_storage.save("docs/report.txt", ContentFile(b"changed"))
+        self.assertNotEqual(other, self.name)
+
+    def test_long_names_are_shortened_before_the_hash(self):
+        name = "docs/" + "r" * 120 + ".txt"
+        saved = default_storage.save(name, ContentFile(b"0123"), max_length=100)
+        self.assertEqual(len(saved), 100)
+        self.assertRegex(saved, r"^docs/r+\.[0-9a-f]{16}\.txt$")
+        again = default_storage.save(name, ContentFile(b"0123"), max_length=100)
+        self.assertEqual(again, saved)
+
+    def test_hashed_files_are_cached_forever(self):
+        response = self.get(self.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual(
+            response["Cache-Control"], "public, max-age=31536000, immutable"
+        )
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        not_modified = self.get(self.name, if_none_match=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        (Path(default_storage.location) / "plain.txt").write_bytes(b"plain")
+        self.assertEqual(self.get("plain.txt")["Cache-Control"], "public, max-age=3600")
+
+    def test_range_requests(self):
+        response = self.get(self.name, range="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+
+        response = self.get(self.name, range="bytes=-3")
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+        self.assertEqual(self.get(self.name, range="bytes=20-").status_code, 416)
+        response = self.get(self.name, range="bytes=2-5", if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_paths_outside_media_root_are_not_found(self):
+        self.assertEqual(self.get("../settings.py").status_code, 404)
+        self.assertEqual(self.get("docs").status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect")
+    def test_sendfile_header_delegates_the_body(self):
+        response = self.get(self.name)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["Content-Type"], "text/plain")
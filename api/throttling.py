@@ -0,0 +1,152 @@
+"""
+Constant-time request throttles.
+
+DRF's ``SimpleRateThrottle`` keeps the timestamp of every request made in the
+rate's duration in the cache, and reads and rewrites that whole list on each
+request: up to a thousand entries per hit at "1000/day", with concurrent
+workers overwriting each other's history. The throttles here are drop-in
+replacements (same scopes, rates and cache keys) that count requests in fixed
+windows instead, one window per duration aligned on the epoch, with a single
+atomic increment per request.
+
+Counters are kept by the store selected with ``API_THROTTLE_STORE``:
+
+* ``"cache"`` increments keys of the default cache, which is atomic across
+  processes with memcached or Redis, and per process with the local memory
+  cache,
+* ``"sqlite"`` keeps them in the SQLite file ``API_THROTTLE_SQLITE_PATH``,
+  shared by every worker process of a host.
+
+A client can make up to twice its rate around a window boundary, the price of
+keeping one counter instead of a history.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import throttling
+
+_sqlite_stores = {}
+_sqlite_stores_lock = threading.Lock()
+
+
+class CacheStore:
+    """Counters in the default cache, one key per client and window."""
+
+    name = "cache"
+
+    def incr(self, key, window, expires):
+        key = f"{key}:{window}"
+        # A little longer than the window, so that it cannot expire between
+        # the add() and the incr()
+        timeout = max(1, int(expires - time.time()) + 60)
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Evicted in between
+            cache.add(key, 1, timeout)
+            return 1
+
+
+class SQLiteStore:
+    """
+    Counters in a SQLite file, one row per client, updated by a single UPSERT
+    statement, which SQLite runs atomically across processes.
+    """
+
+    name = "sqlite"
+    # Expired rows are deleted once every this many increments of a connection
+    prune_every = 1000
+
+    create_sql = (
+        "CREATE TABLE IF NOT EXISTS throttle_counter ("
+        "key TEXT PRIMARY KEY, period INTEGER NOT NULL, "
+        "count INTEGER NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+    )
+    incr_sql = (
+        "INSERT INTO throttle_counter (key, period, count, expires) "
+        "VALUES (?, ?, 1, ?) ON CONFLICT (key) DO UPDATE SET "
+        "count = CASE WHEN period = excluded.period THEN count + 1 ELSE 1 END, "
+        "period = excluded.period, expires = excluded.expires "
+        "RETURNING count"
+    )
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.local = threading.local()
+
+    def connect(self):
+        connection = getattr(self.local, "connection", None)
+        # Connections are not shared with forked workers
+        if connection is None or self.local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(self.create_sql)
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+            self.local.increments = 0
+        return connection
+
+    def incr(self, key, window, expires):
+        connection = self.connect()
+        (count,) = connection.execute(self.incr_sql, (key, window, expires)).fetchone()
+        self.local.increments += 1
+        if self.local.increments % self.prune_every == 0:
+            connection.execute(
+                "DELETE FROM throttle_counter WHERE expires < ?", (time.time(),)
+            )
+        return count
+
+    def clear(self):
+        self.connect().execute("DELETE FROM throttle_counter")
+
+
+def get_store():
+    """Return the store configured by ``API_THROTTLE_STORE``."""
+    name = getattr(settings, "API_THROTTLE_STORE", "cache")
+    if name == CacheStore.name:
+        return CacheStore()
+    if name == SQLiteStore.name:
+        path = str(settings.API_THROTTLE_SQLITE_PATH)
+        with _sqlite_stores_lock:
+            if path not in _sqlite_stores:
+                _sqlite_stores[path] = SQLiteStore(path)
+            return _sqlite_stores[path]
+    raise ImproperlyConfigured(f"Unknown API_THROTTLE_STORE: {name!r}")
+
+
+class FixedWindowMixin:
+    """Count requests per window instead of keeping their timestamps."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.expires = (window + 1) * self.duration
+        self.count = get_store().incr(self.key, window, self.expires)
+        return self.count <= self.num_requests
+
+    def wait(self):
+        return max(0.0, self.expires - self.now)
+
+
+class AnonRateThrottle(FixedWindowMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(FixedWindowMixin, throttling.UserRateThrottle):
+    pass
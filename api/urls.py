@@ -11,5 +11,7 @@ router.register(r"contact-faqs", views.ContactFAQViewSet, basename="contact-faq"
 
 # The API URLs are determined automatically by the router
 urlpatterns = [
+    path("pages/<slug:page>/", views.PageBundleView.as_view(), name="page-bundle"),
+    path("stats/endpoints/", views.EndpointStatsView.as_view(), name="endpoint-stats"),
     path("", include(router.urls)),
 ]
@@ -1,26 +1,63 @@
-from rest_framework import viewsets, permissions, filters
+import hashlib
+
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
+from .filters import ContactFilter
+from .ingest import ContactQueue
+from . import instrumentation, pages
+from .asyncviews import AsyncReadMixin
+from .fastpath import ValuesSerializer
+from .mixins import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SerializerTimingMixin,
+    ValuesListMixin,
+    not_modified_response,
+    set_validators,
+)
+from .pagination import KeysetPagination
+from .renderers import CSVRenderer, NDJSONRenderer
 from .models import TeamMember, Contact, Testimonial, ContactFAQ, MembershipFAQ
 from .serializers import (
     TeamMemberSerializer,
     ContactSerializer,
+    ContactBulkRespondSerializer,
     TestimonialSerializer,
     ContactFAQSerializer,
     MembershipFAQSerializer,
 )
+from .search import FullTextSearchFilter
 
 
-class TeamMemberViewSet(viewsets.ModelViewSet):
+class TeamMemberViewSet(
+    AsyncReadMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet,
+):
     """ViewSet for viewing and editing TeamMember instances."""
 
     queryset = TeamMember.objects.filter(is_active=True)
     serializer_class = TeamMemberSerializer
+    values_serializer_class = ValuesSerializer
+    # Queries per request, searches and session authentication included
+    query_budget = {"list": 12, "retrieve": 4}
+    cache_retrieve = True
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_ordering = ["order", "name", "id"]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        FullTextSearchFilter,
         filters.OrderingFilter,
     ]
     filterset_fields = ["role"]
@@ -37,18 +74,43 @@ class TeamMemberViewSet(viewsets.ModelViewSet):
         return TeamMember.objects.filter(is_active=True)
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+CONTACT_EXPORT_FIELDS = [
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone_number",
+    "inquiry_type",
+    "message",
+    "responded",
+    "response_notes",
+    "created_at",
+    "updated_at",
+]
+
+
+class ContactViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing Contact instances."""
 
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
+    query_budget = {
+        "list": 6,
+        "retrieve": 4,
+        "create": 4,
+        "mark_responded": 5,
+        "bulk_mark_responded": 4,
+        "export": 3,
+    }
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_ordering = ["-created_at", "-id"]
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
         filters.OrderingFilter,
     ]
-    filterset_fields = ["inquiry_type", "responded"]
+    filterset_class = ContactFilter
     search_fields = ["first_name", "last_name", "email", "message"]
     ordering_fields = ["created_at"]
 
@@ -61,6 +123,21 @@ class ContactViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [permissions.IsAdminUser()]
 
+    def create(self, request, *args, **kwargs):
+        """
+        Store a submission, or queue it for the process_contact_queue worker
+        when ``CONTACT_INGEST_MODE`` is "queue".
+        """
+        if getattr(settings, "CONTACT_INGEST_MODE", "direct") != "queue":
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        submission_id = ContactQueue().put(serializer.validated_data)
+        return Response(
+            {"status": "contact queued", "id": submission_id},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
     @action(detail=True, methods=["post"])
     def mark_responded(self, request, pk=None):
         """
@@ -74,16 +151,62 @@ class ContactViewSet(viewsets.ModelViewSet):
         contact.save()
         return Response({"status": "contact marked as responded"})
 
+    @action(detail=False, methods=["post"], url_path="mark-responded")
+    def bulk_mark_responded(self, request):
+        """
+        Mark many contact submissions as responded in a single query. They
+        are selected by ``ids``, ``inquiry_type`` and/or a ``created_after``
+        and ``created_before`` range; ``response_notes`` replaces their notes.
+        """
+        serializer = ContactBulkRespondSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = serializer.filter_queryset(Contact.objects.all()).mark_responded(
+            serializer.validated_data.get("response_notes")
+        )
+        return Response(
+            {"status": "contacts marked as responded", "updated": updated}
+        )
+
+    @action(detail=False, renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Stream every submission matching the list filters as CSV, or as
+        NDJSON with ``?format=ndjson``, without loading them all in memory.
+        """
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values_list(*CONTACT_EXPORT_FIELDS)
+            .iterator(chunk_size=2000)
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(CONTACT_EXPORT_FIELDS, rows),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        filename = f"contacts-{timezone.now():%Y%m%d}.{renderer.format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
 
-class TestimonialViewSet(viewsets.ModelViewSet):
+class TestimonialViewSet(
+    AsyncReadMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet,
+):
     """ViewSet for viewing and editing Testimonial instances."""
 
     queryset = Testimonial.objects.filter(is_featured=True)
     serializer_class = TestimonialSerializer
+    values_serializer_class = ValuesSerializer
+    query_budget = {"list": 12, "retrieve": 4}
+    cache_retrieve = True
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        FullTextSearchFilter,
         filters.OrderingFilter,
     ]
     filterset_fields = ["rating", "is_featured"]
@@ -100,15 +223,25 @@ class TestimonialViewSet(viewsets.ModelViewSet):
         return Testimonial.objects.filter(is_featured=True)
 
 
-class ContactFAQViewSet(viewsets.ModelViewSet):
+class ContactFAQViewSet(
+    AsyncReadMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet,
+):
     """ViewSet for viewing and editing ContactFAQ instances."""
 
     queryset = ContactFAQ.objects.filter(is_published=True)
     serializer_class = ContactFAQSerializer
+    values_serializer_class = ValuesSerializer
+    query_budget = {"list": 12, "retrieve": 4}
+    cache_retrieve = True
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        FullTextSearchFilter,
         filters.OrderingFilter,
     ]
     filterset_fields = ["category", "is_published"]
@@ -125,11 +258,19 @@ class ContactFAQViewSet(viewsets.ModelViewSet):
         return ContactFAQ.objects.filter(is_published=True)
 
 
-class MembershipFAQViewSet(viewsets.ModelViewSet):
+class MembershipFAQViewSet(
+    AsyncReadMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet,
+):
     """ViewSet for viewing and editing ContactFAQ instances."""
 
     queryset = MembershipFAQ.objects.filter(is_published=True)
     serializer_class = MembershipFAQSerializer
+    query_budget = {"list": 12, "retrieve": 4}
+    cache_retrieve = True
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [
         DjangoFilterBackend,
@@ -148,3 +289,43 @@ class MembershipFAQViewSet(viewsets.ModelViewSet):
         if self.request.user.is_staff:
             return ContactFAQ.objects.all()
         return ContactFAQ.objects.filter(is_published=True)
+
+
+class PageBundleView(APIView):
+    """
+    Every section a page of the site needs, in one response: the public
+    listings named by ``API_PAGES[page]``, each cached on its own, under an
+    ETag combining them (see api.pages).
+    """
+
+    # One query per section missing from the cache
+    query_budget = 6
+
+    def get(self, request, page):
+        sections = pages.get_page(page)
+        if sections is None:
+            raise NotFound(f"Unknown page: {page}.")
+        keys = pages.section_keys(sections, request)
+        parts = [page, request.accepted_renderer.format, *keys]
+        etag = '"%s"' % hashlib.md5("|".join(parts).encode()).hexdigest()
+        response = not_modified_response(request, etag, None)
+        if response is None:
+            response = Response(pages.render_page(sections, keys, request))
+            set_validators(response, etag, None)
+        return response
+
+
+class EndpointStatsView(APIView):
+    """
+    Query counts, timings and response sizes aggregated per endpoint by this
+    process since it started (see api.instrumentation). DELETE resets them.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(instrumentation.stats.snapshot())
+
+    def delete(self, request):
+        instrumentation.stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -38,6 +39,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.WhiteNoiseMiddleware",
+    "api.instrumentation.InstrumentationMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -65,17 +68,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "core.wsgi.application"
 
+TEST_RUNNER = "api.testing.QueryBudgetTestRunner"
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+#
+# Read from the environment of each deployment (DB_ENGINE, DB_NAME, DB_USER,
+# DB_PASSWORD, DB_HOST, DB_PORT), defaulting to the project's SQLite file.
+# Connections are reused by the requests of the next DB_CONN_MAX_AGE seconds
+# ("none" for no limit, 0 to close them after every request), and checked
+# before their first query in each request unless DB_CONN_HEALTH_CHECKS=0.
+
+db_engine = os.environ.get("DB_ENGINE", "django.db.backends.sqlite3")
+db_conn_max_age = os.environ.get("DB_CONN_MAX_AGE", "60")
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "ENGINE": db_engine,
+        "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
+        "USER": os.environ.get("DB_USER", ""),
+        "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+        "HOST": os.environ.get("DB_HOST", ""),
+        "PORT": os.environ.get("DB_PORT", ""),
+        "CONN_MAX_AGE": (
+            None if db_conn_max_age.lower() == "none" else int(db_conn_max_age)
+        ),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
 
+# OPTIONS of SQLite databases, picked with DB_SQLITE_PROFILE. "tuned" runs
+# these pragmas on every new connection: write-ahead logging lets requests
+# read while another one writes, synchronous=NORMAL only syncs the log at
+# checkpoints, reads go through a memory map of the file, and writers wait
+# for the lock instead of failing with "database is locked".
+# "tuned-writes" also begins every transaction with BEGIN IMMEDIATE, so that
+# two transactions upgrading from a read to a write cannot deadlock, for
+# write-heavy deployments. It comes at a cost: read-only atomic() blocks, like
+# the search index queries of api.search, then take the write lock too and
+# queue behind each other and behind writers.
+SQLITE_TUNING = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA mmap_size=268435456;"
+    "PRAGMA busy_timeout=5000"
+)
+SQLITE_PROFILES = {
+    "default": {},
+    "tuned": {"init_command": SQLITE_TUNING},
+    "tuned-writes": {"init_command": SQLITE_TUNING, "transaction_mode": "IMMEDIATE"},
+}
+
+if db_engine == "django.db.backends.sqlite3":
+    DATABASES["default"]["OPTIONS"] = SQLITE_PROFILES[
+        os.environ.get("DB_SQLITE_PROFILE", "tuned")
+    ]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,6 +162,23 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = BASE_DIR / "staticfiles"
+WHITENOISE_AUTOREFRESH = DEBUG
+
+# Uploads are named after their content so that their URLs can be cached
+# forever (see api.storage and api.media). collectstatic stores hashed and
+# gzip/brotli precompressed static files served by WhiteNoise; development
+# keeps serving them from the apps.
+STORAGES = {
+    "default": {"BACKEND": "api.storage.HashedFileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG
+            else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        )
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -134,35 +201,11 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
-    ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "100/day", "user": "1000/day"},
-}
-
-
-REST_FRAMEWORK = {
-    "DEFAULT_PERMISSION_CLASSES": [
-        "rest_framework.permissions.IsAuthenticatedOrReadOnly",
-    ],
-    "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.SessionAuthentication",
-        "rest_framework.authentication.BasicAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",  # If using JWT
-    ],
-    "DEFAULT_FILTER_BACKENDS": [
-        "django_filters.rest_framework.DjangoFilterBackend",
-        "rest_framework.filters.SearchFilter",
-        "rest_framework.filters.OrderingFilter",
-    ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
-    "PAGE_SIZE": 10,
-    "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "api.throttling.AnonRateThrottle",
+        "api.throttling.UserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {"anon": "100/day", "user": "1000/day"},
 }
@@ -211,5 +254,91 @@ DJOSER = {
     "USER_ID_FIELD": "username",
 }
 
+# Cached API responses and the model versions invalidating them (see
+# api.cache) are kept in the default cache, read from CACHE_BACKEND and
+# CACHE_LOCATION. The local memory default is private to each process: with
+# several worker processes, a save made through one of them is only seen by
+# the others once their entries expire, so multi-worker deployments must use
+# a shared backend such as "django.core.cache.backends.redis.RedisCache" or
+# "django.core.cache.backends.memcached.PyMemcacheCache"
+# (check --deploy warns about it).
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Seconds a cached API list response is kept; entries are also invalidated
+# as soon as one of the models they depend on changes
+API_RESPONSE_CACHE_TIMEOUT = 60 * 15
+
+# Full-text search index used by the API search filter: "auto" picks SQLite
+# FTS5 when available, "tokens" forces the portable token table, None
+# disables the index in favour of plain SearchFilter scans
+API_SEARCH_BACKEND = "auto"
+
+# Searches matching at most this many rows are ordered by relevance
+API_SEARCH_MAX_RANKED = 200
+
+# Per-endpoint query counts and timings (see api.instrumentation), sent in
+# Server-Timing headers to every client in development and only to staff
+# users otherwise, as they tell which endpoints are expensive. Requests over
+# their view's query_budget are logged ("warn") or fail ("raise", set by the
+# test runner)
+API_INSTRUMENTATION = True
+API_SERVER_TIMING = True if DEBUG else "staff"
+API_QUERY_BUDGETS = "warn"
+
+# Sections bundled by /api/pages/<page>/ (see api.pages); sections missing
+# from the cache are built by this many threads, 0 builds them inline
+API_PAGES = {
+    "home": ["team_members", "testimonials", "projects"],
+    "contact": ["contact_faqs", "membership_faqs"],
+}
+API_PAGE_WORKERS = 0
+
+# Serve cached list and detail responses from async views (see api.asyncviews)
+# when API_ASYNC_VIEWS=1. Off by default: bench_asgi shows no consistent gain
+# over sync views under ASGI yet
+API_ASYNC_VIEWS = os.environ.get("API_ASYNC_VIEWS") == "1"
+
+# Request counters of the API throttles (see api.throttling): "cache" keeps
+# them in the default cache, "sqlite" in a file shared by the processes of a
+# host. With the local memory cache, each worker process counts on its own
+# (check --deploy warns about it), so several workers need "sqlite" or a
+# shared CACHE_BACKEND
+API_THROTTLE_STORE = os.environ.get("API_THROTTLE_STORE", "cache")
+API_THROTTLE_SQLITE_PATH = BASE_DIR / "var" / "throttle.sqlite3"
+
+# Contact form submissions are saved on the request thread ("direct") or
+# spooled and stored in batches by the process_contact_queue worker ("queue")
+CONTACT_INGEST_MODE = "direct"
+CONTACT_INGEST_QUEUE_DIR = BASE_DIR / "var" / "contact_queue"
+CONTACT_INGEST_BATCH_SIZE = 500
+# Submissions are refused with a 503 once this much is waiting in the spool
+CONTACT_INGEST_MAX_QUEUE_BYTES = 64 * 1024 * 1024
+CONTACT_INGEST_RETRY_AFTER = 30
+
+# Resized copies of uploaded images, exposed as srcset values (see api.images)
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280]
+IMAGE_DERIVATIVE_FORMATS = ["webp", "jpeg"]
+IMAGE_DERIVATIVE_QUALITY = 80
+# Threads generating derivatives after an upload; 0 generates them inline
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Media URLs in API responses: "absolute" (scheme and host of the request),
+# "relative" (MEDIA_URL paths), or "cdn" (prefixed with API_MEDIA_CDN_URL)
+API_MEDIA_URLS = "absolute"
+API_MEDIA_CDN_URL = None
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Cache lifetime of media files not stored under a content-hashed name
+MEDIA_CACHE_MAX_AGE = 60 * 60
+# Let the front-end server send media files: "X-Accel-Redirect" (nginx, with
+# an internal location at MEDIA_SENDFILE_PREFIX) or "X-Sendfile" (Apache)
+MEDIA_SENDFILE_HEADER = None
+MEDIA_SENDFILE_PREFIX = "/protected-media/"
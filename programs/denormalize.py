@@ -0,0 +1,101 @@
+"""
+Denormalized list fields of projects.
+
+Project lists render from the project row: ``Project.cover_image`` points at
+the project's first image by order, and ``Project.tag_cache`` holds its tags
+as serialized by TagSerializer. Both are kept in sync by programs.signals.
+Changes that send no signals, like ``QuerySet.update()`` or raw SQL, can leave
+them stale; the ``check_project_denormalization`` command finds and repairs
+such drift.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from api.cache import bump_version_on_commit
+from .models import Project, ProjectImage
+
+
+def first_image():
+    """Subquery of the id of the first image of the outer project."""
+    images = ProjectImage.objects.filter(project=OuterRef("pk"))
+    return Subquery(images.order_by("order", "pk").values("pk")[:1])
+
+
+def build_tag_caches(project_ids):
+    """Return ``{project_id: tag_cache}`` for the given projects."""
+    rows = (
+        Project.tags.through.objects.filter(project_id__in=project_ids)
+        .order_by("tag__name")
+        .values_list("project_id", "tag_id", "tag__name", "tag__slug")
+    )
+    caches = defaultdict(list)
+    for project_id, tag_id, name, slug in rows:
+        caches[project_id].append({"id": tag_id, "name": name, "slug": slug})
+    return {pk: caches.get(pk, []) for pk in project_ids}
+
+
+def refresh_cover_images(project_ids):
+    project_ids = {pk for pk in project_ids if pk is not None}
+    if project_ids:
+        Project.objects.filter(pk__in=project_ids).update(cover_image=first_image())
+
+
+def refresh_tag_caches(project_ids):
+    """Rebuild the tag caches of the given projects and return them by id."""
+    project_ids = {pk for pk in project_ids if pk is not None}
+    if not project_ids:
+        return {}
+    caches = build_tag_caches(project_ids)
+    Project.objects.bulk_update(
+        [Project(pk=pk, tag_cache=cache) for pk, cache in caches.items()],
+        ["tag_cache"],
+    )
+    return caches
+
+
+def find_drift(batch_size=500):
+    """
+    Yield ``(project_id, changes)`` for every project whose denormalized
+    fields differ from what they are derived from.
+    """
+    rows = (
+        Project.objects.order_by("pk")
+        .annotate(first_image_id=first_image())
+        .values_list("pk", "cover_image_id", "first_image_id", "tag_cache")
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield from _batch_drift(batch)
+            batch = []
+    if batch:
+        yield from _batch_drift(batch)
+
+
+def _batch_drift(rows):
+    caches = build_tag_caches([row[0] for row in rows])
+    for pk, cover_image_id, first_image_id, tag_cache in rows:
+        changes = {}
+        if cover_image_id != first_image_id:
+            changes["cover_image_id"] = first_image_id
+        if tag_cache != caches[pk]:
+            changes["tag_cache"] = caches[pk]
+        if changes:
+            yield pk, changes
+
+
+def repair_drift(drift):
+    """Apply the changes found by ``find_drift()``."""
+    if not drift:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        for pk, changes in drift:
+            Project.objects.filter(pk=pk).update(updated_at=now, **changes)
+    # update() sends no post_save, so cached responses are expired here
+    bump_version_on_commit(Project)
@@ -0,0 +1,66 @@
+from api.management.commands import bench_list_serializers
+from programs.denormalize import refresh_cover_images
+from programs.models import Project, ProjectImage
+from programs.serializers import ProjectListSerializer, ProjectListValuesSerializer
+
+TAG_CACHE = [
+    {"id": 1, "name": "Schools", "slug": "schools"},
+    {"id": 2, "name": "Water", "slug": "water"},
+]
+
+
+class Command(bench_list_serializers.Command):
+    help = (
+        "Compare rows per second of ProjectListSerializer and of its "
+        "ValuesSerializer fast path, and check that their output is identical. "
+        "Benchmark rows are rolled back."
+    )
+
+    def cases(self):
+        yield (
+            "projects",
+            ProjectListSerializer,
+            ProjectListValuesSerializer,
+            self.project,
+        )
+
+    def project(self, index):
+        return Project(
+            title=f"Project {index}",
+            slug=f"bench-project-{index}",
+            category="Health",
+            year="2024",
+            description="Clean water for rural schools " * 5,
+            full_description="",
+            location="Kathmandu",
+            beneficiaries="100 families",
+            duration="6 months",
+            tag_cache=TAG_CACHE,
+        )
+
+    def seed(self, model, make, size):
+        projects = super().seed(model, make, size)
+        ProjectImage.objects.bulk_create(
+            [self.cover(project) for project in projects], batch_size=1000
+        )
+        refresh_cover_images([project.pk for project in projects])
+        return projects
+
+    def cover(self, project):
+        name = f"project_images/bench-{project.pk}.jpg"
+        derivatives = [
+            f"project_images/derivatives/bench-{project.pk}-{width}w.webp"
+            for width in (320, 640)
+        ]
+        return ProjectImage(
+            project=project,
+            image=name,
+            image_derivatives={
+                "name": name,
+                "widths": [320, 640],
+                "files": {"webp": derivatives},
+            },
+        )
+
+    def get_queryset(self, model):
+        return model.objects.with_cover_image()
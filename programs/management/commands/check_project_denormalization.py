@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.denormalize import find_drift, repair_drift
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the denormalized cover images and tag caches of projects "
+        "against their images and tags, and optionally repair them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Rewrite the stale fields instead of failing.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        drift = list(find_drift(options["batch_size"]))
+        for pk, changes in drift:
+            self.stdout.write(f"Project {pk}: stale {', '.join(sorted(changes))}")
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Denormalized fields are in sync."))
+        elif options["repair"]:
+            repair_drift(drift)
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} projects."))
+        else:
+            raise CommandError(
+                f"{len(drift)} projects are out of sync, run with --repair."
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from programs.models import Project, RelatedProject
+from programs.related import rebuild_related_projects
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed related projects index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "slugs",
+            nargs="*",
+            help="Only rebuild the index of these projects.",
+        )
+
+    def handle(self, *args, **options):
+        project_ids = None
+        if options["slugs"]:
+            project_ids = list(
+                Project.objects.filter(slug__in=options["slugs"]).values_list(
+                    "pk", flat=True
+                )
+            )
+        rebuild_related_projects(project_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {RelatedProject.objects.count()} related project entries."
+            )
+        )
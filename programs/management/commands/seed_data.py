@@ -0,0 +1,334 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from api import search
+from api.cache import bump_version_on_commit
+from api.models import Contact, ContactFAQ, MembershipFAQ, TeamMember, Testimonial
+from programs.denormalize import refresh_cover_images, refresh_tag_caches
+from programs.models import (
+    Partner,
+    Project,
+    ProjectImage,
+    ProjectOutcome,
+    ProjectPhase,
+    Tag,
+)
+from programs.related import rebuild_related_projects
+
+# Relative weights of the project categories, most projects being about
+# education and health as on the live site
+CATEGORY_WEIGHTS = {
+    "Education": 30,
+    "Health": 25,
+    "Environment": 18,
+    "Infrastructure": 12,
+    "Youth Development": 10,
+    "Other": 5,
+}
+TAG_NAMES = (
+    "Schools, Water, Sanitation, Girls Education, Nutrition, Reforestation, "
+    "Clean Energy, Maternal Health, Literacy, Roads, Disaster Relief, Agriculture, "
+    "Vaccination, Libraries, Scholarships, Climate, Hygiene, Bridges, "
+    "Mental Health, Digital Skills, Community Health, Recycling, Irrigation, "
+    "Sports, Vocational Training, Early Childhood, Solar, Microfinance, "
+    "Women Empowerment, Housing"
+).split(", ")
+ADJECTIVES = "Clean Safe Bright Green Healthy Resilient Open Shared".split()
+SUBJECTS = "Water Classrooms Futures Villages Mothers Forests Schools Clinics".split()
+PLACES = (
+    "Kathmandu Pokhara Lalitpur Bhaktapur Chitwan Dhading Gorkha Sindhupalchok "
+    "Dolakha Kaski Nuwakot Rasuwa"
+).split()
+WORDS = (
+    "community school water health training project local families support "
+    "district village children program access improve youth women build"
+).split()
+ROLES = ["Board", "Staff", "Volunteer", "Advisor"]
+FAQ_CATEGORIES = ["general", "donations", "volunteering", "projects", "membership"]
+INQUIRY_TYPES = [choice for choice, _ in Contact.INQUIRY_CHOICES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Add synthetic projects, tags, images, phases, outcomes, partners, team "
+        "members, testimonials, FAQs and contacts, with realistic category and "
+        "tag distributions, for benchmarks and local development. The same "
+        "--seed generates the same rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=200)
+        parser.add_argument("--tags", type=int, default=30)
+        parser.add_argument("--partners", type=int, default=50)
+        parser.add_argument(
+            "--images", type=int, default=4, help="Maximum images per project."
+        )
+        parser.add_argument(
+            "--phases", type=int, default=5, help="Maximum phases per project."
+        )
+        parser.add_argument(
+            "--outcomes", type=int, default=4, help="Maximum outcomes per project."
+        )
+        parser.add_argument("--team-members", type=int, default=40)
+        parser.add_argument("--testimonials", type=int, default=60)
+        parser.add_argument(
+            "--faqs", type=int, default=40, help="Contact and membership FAQs each."
+        )
+        parser.add_argument("--contacts", type=int, default=5000)
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiply every volume, e.g. 10 for a large data set.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["scale"] <= 0:
+            raise CommandError("--scale must be positive.")
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        # Seeding twice adds rows instead of failing on unique slugs
+        self.offset = Project.objects.count()
+
+        def volume(name):
+            return max(0, round(options[name] * options["scale"]))
+
+        with transaction.atomic():
+            tags = self.seed_tags(volume("tags"))
+            projects = self.seed_projects(volume("projects"), tags, options)
+            self.seed_partners(volume("partners"), projects)
+            self.seed_team_members(volume("team_members"))
+            self.seed_testimonials(volume("testimonials"))
+            self.seed_faqs(ContactFAQ, volume("faqs"))
+            self.seed_faqs(MembershipFAQ, volume("faqs"))
+            self.seed_contacts(volume("contacts"))
+
+            # bulk_create skips the signals maintaining the derived data
+            project_ids = [project.pk for project in projects]
+            refresh_cover_images(project_ids)
+            refresh_tag_caches(project_ids)
+            rebuild_related_projects()
+            for model in search.registered_models():
+                search.rebuild(model)
+            for model in (
+                Tag,
+                Project,
+                ProjectImage,
+                ProjectPhase,
+                ProjectOutcome,
+                Partner,
+                TeamMember,
+                Testimonial,
+                ContactFAQ,
+                MembershipFAQ,
+                Contact,
+            ):
+                bump_version_on_commit(model)
+
+        for model in (Project, Tag, ProjectImage, Partner, TeamMember, Contact):
+            self.stdout.write(
+                f"{model._default_manager.count():>8} "
+                f"{model._meta.verbose_name_plural}"
+            )
+        self.stdout.write(self.style.SUCCESS("Seeded."))
+
+    def create(self, model, objects):
+        return model._default_manager.bulk_create(objects, batch_size=self.batch_size)
+
+    def sentence(self, words):
+        text = " ".join(self.random.choice(WORDS) for _ in range(words))
+        return text.capitalize() + "."
+
+    def recent_year(self):
+        # Most projects are recent: one in two of the current year's
+        year = timezone.now().year
+        while self.random.random() < 0.5 and year > 2005:
+            year -= 1
+        return str(year)
+
+    def seed_tags(self, count):
+        names = TAG_NAMES[:count] + [
+            f"Topic {index}" for index in range(len(TAG_NAMES), count)
+        ]
+        existing = set(
+            Tag.objects.filter(name__in=names).values_list("name", flat=True)
+        )
+        self.create(
+            Tag,
+            [
+                Tag(name=name, slug=slugify(name))
+                for name in names
+                if name not in existing
+            ],
+        )
+        return list(Tag.objects.filter(name__in=names).order_by("pk"))
+
+    def seed_projects(self, count, tags, options):
+        categories = list(CATEGORY_WEIGHTS)
+        weights = list(CATEGORY_WEIGHTS.values())
+        projects = []
+        for index in range(count):
+            place = self.random.choice(PLACES)
+            title = (
+                f"{self.random.choice(ADJECTIVES)} {self.random.choice(SUBJECTS)} "
+                f"for {place}"
+            )
+            projects.append(
+                Project(
+                    title=title,
+                    slug=f"{slugify(title)}-{self.offset + index}",
+                    category=self.random.choices(categories, weights)[0],
+                    year=self.recent_year(),
+                    description=self.sentence(20),
+                    full_description=" ".join(self.sentence(25) for _ in range(4)),
+                    location=f"{place}, Nepal",
+                    beneficiaries=f"{self.random.randrange(50, 5000, 50)} people",
+                    duration=f"{self.random.randint(3, 36)} months",
+                )
+            )
+        projects = self.create(Project, projects)
+
+        # Zipf-like popularity: the n-th tag is used n times less than the first
+        tag_weights = [1 / (rank + 1) for rank in range(len(tags))]
+        tagged = []
+        images = []
+        phases = []
+        outcomes = []
+        for project in projects:
+            if tags:
+                chosen = {
+                    tag.pk
+                    for tag in self.random.choices(
+                        tags, tag_weights, k=self.random.randint(1, 5)
+                    )
+                }
+                tagged.extend(
+                    Project.tags.through(project_id=project.pk, tag_id=tag_id)
+                    for tag_id in chosen
+                )
+            for order in range(self.random.randint(1, max(1, options["images"]))):
+                images.append(
+                    ProjectImage(
+                        project=project,
+                        image=f"project_images/seed-{project.slug}-{order}.jpg",
+                        order=order,
+                    )
+                )
+            for order in range(self.random.randint(0, options["phases"])):
+                phases.append(
+                    ProjectPhase(
+                        project=project,
+                        name=f"Phase {order + 1}",
+                        duration=f"{self.random.randint(1, 12)} months",
+                        complete=self.random.random() < 0.6,
+                        order=order,
+                    )
+                )
+            for order in range(self.random.randint(0, options["outcomes"])):
+                outcomes.append(
+                    ProjectOutcome(
+                        project=project, description=self.sentence(12), order=order
+                    )
+                )
+        self.create(Project.tags.through, tagged)
+        if options["images"]:
+            self.create(ProjectImage, images)
+        self.create(ProjectPhase, phases)
+        self.create(ProjectOutcome, outcomes)
+        return projects
+
+    def seed_partners(self, count, projects):
+        partners = self.create(
+            Partner,
+            [Partner(name=f"Partner {index + 1}") for index in range(count)],
+        )
+        links = []
+        for partner in partners:
+            size = min(len(projects), self.random.randint(1, 6))
+            links.extend(
+                Partner.projects.through(partner_id=partner.pk, project_id=project.pk)
+                for project in self.random.sample(projects, size)
+            )
+        self.create(Partner.projects.through, links)
+
+    def seed_team_members(self, count):
+        self.create(
+            TeamMember,
+            [
+                TeamMember(
+                    name=f"Member {index + 1}",
+                    designation=self.random.choice(["Coordinator", "Director"]),
+                    role=self.random.choice(ROLES),
+                    bio=self.sentence(30),
+                    image=f"team_members/seed-{index}.jpg",
+                    email=f"member{index}@example.com",
+                    order=index,
+                    is_active=self.random.random() < 0.9,
+                )
+                for index in range(count)
+            ],
+        )
+
+    def seed_testimonials(self, count):
+        self.create(
+            Testimonial,
+            [
+                Testimonial(
+                    name=f"Supporter {index + 1}",
+                    designation="Director",
+                    company=self.random.choice(["", "Himalayan Trust", "Aid Nepal"]),
+                    message=self.sentence(40),
+                    is_featured=self.random.random() < 0.2,
+                    # Mostly five and four stars
+                    rating=self.random.choices([5, 4, 3, 2, 1], [60, 25, 9, 4, 2])[0],
+                )
+                for index in range(count)
+            ],
+        )
+
+    def seed_faqs(self, model, count):
+        self.create(
+            model,
+            [
+                model(
+                    question=self.sentence(8)[:-1] + "?",
+                    answer=self.sentence(50),
+                    category=self.random.choice(FAQ_CATEGORIES),
+                    order=index,
+                    is_published=self.random.random() < 0.95,
+                )
+                for index in range(count)
+            ],
+        )
+
+    def seed_contacts(self, count):
+        contacts = self.create(
+            Contact,
+            [
+                Contact(
+                    first_name=f"First{index}",
+                    last_name="Seed",
+                    email=f"contact{index}@example.com",
+                    inquiry_type=self.random.choice(INQUIRY_TYPES),
+                    message=self.sentence(30),
+                    responded=self.random.random() < 0.7,
+                )
+                for index in range(count)
+            ],
+        )
+        # Spread the submissions over the last year rather than this second
+        now = timezone.now()
+        for contact in contacts:
+            contact.created_at = now - timedelta(
+                minutes=self.random.randrange(365 * 24 * 60)
+            )
+        Contact.objects.bulk_update(
+            contacts, ["created_at"], batch_size=self.batch_size
+        )
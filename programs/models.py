@@ -18,6 +18,18 @@ class Tag(models.Model):
         ordering = ["name"]
 
 
+class ProjectQuerySet(models.QuerySet):
+    def with_cover_image(self):
+        """Fetch the denormalized cover image of each project in the same query."""
+        return self.select_related("cover_image")
+
+    def related_to(self, project):
+        """Projects in the precomputed related index of ``project``, by rank."""
+        return self.filter(related_index_entries__project=project).order_by(
+            "related_index_entries__rank"
+        )
+
+
 class Project(models.Model):
     CATEGORY_CHOICES = [
         ("Education", "Education"),
@@ -37,19 +49,60 @@ class Project(models.Model):
     beneficiaries = models.CharField(max_length=255)
     duration = models.CharField(max_length=100)
     tags = models.ManyToManyField(Tag, related_name="projects", blank=True)
+    # Denormalized for list rendering, kept in sync by programs.signals
+    cover_image = models.ForeignKey(
+        "ProjectImage",
+        related_name="+",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+    )
+    tag_cache = models.JSONField(default=list, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProjectQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    # Only written by programs.denormalize: saving an instance loaded before
+    # a change of its images or tags would write back stale values
+    denormalized_fields = ("cover_image", "tag_cache")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets programs.signals skip the related index when it cannot change
+        instance._loaded_category = instance.__dict__.get("category")
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            skipped = set(self.denormalized_fields) | self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in skipped
+                and field.attname not in skipped
+            ]
         super().save(*args, **kwargs)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="programs_project_created_id"
+            ),
+            models.Index(
+                fields=["category", "created_at"], name="programs_project_category"
+            ),
+            models.Index(fields=["year", "created_at"], name="programs_project_year"),
+        ]
 
 
 class ProjectImage(models.Model):
@@ -57,10 +110,16 @@ class ProjectImage(models.Model):
         Project, related_name="images", on_delete=models.CASCADE
     )
     image = models.ImageField(upload_to="project_images/")
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     order = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["order"]
+        indexes = [
+            models.Index(
+                fields=["project", "order"], name="programs_image_project_order"
+            ),
+        ]
 
     def __str__(self):
         return f"Image for {self.project.title} ({self.order})"
@@ -85,6 +144,11 @@ class ProjectPhase(models.Model):
 
     class Meta:
         ordering = ["order"]
+        indexes = [
+            models.Index(
+                fields=["project", "order"], name="programs_phase_project_order"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.project.title}"
@@ -99,6 +163,36 @@ class ProjectOutcome(models.Model):
 
     class Meta:
         ordering = ["order"]
+        indexes = [
+            models.Index(
+                fields=["project", "order"], name="programs_outcome_project_order"
+            ),
+        ]
 
     def __str__(self):
         return f"Outcome for {self.project.title}"
+
+
+class RelatedProject(models.Model):
+    """Precomputed neighbour of a project, kept in sync by programs.signals."""
+
+    project = models.ForeignKey(
+        Project, related_name="related_index", on_delete=models.CASCADE
+    )
+    related = models.ForeignKey(
+        Project, related_name="related_index_entries", on_delete=models.CASCADE
+    )
+    rank = models.PositiveSmallIntegerField()
+    shared_tags = models.PositiveIntegerField(default=0)
+    same_category = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["project", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "rank"], name="unique_related_project_rank"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.related.title} related to {self.project.title} ({self.rank})"
@@ -0,0 +1,134 @@
+"""
+Related projects ranking engine.
+
+Candidates for a project are the projects sharing its category or at least
+one of its tags. They are ranked inside the database, so that at most
+``limit`` rows per project ever leave it:
+
+1. projects sharing both tags and the category come first,
+2. then by number of shared tags,
+3. then projects in the same category,
+4. then the most recently created ones.
+
+``rank_related_batch`` ranks any number of projects in a single round trip
+using a window function, which SQLite (3.25+) and PostgreSQL both support.
+"""
+
+from collections import namedtuple
+
+from django.db import connection
+
+from .models import Project
+
+# Number of related projects returned when no limit is requested
+RELATED_PROJECTS_LIMIT = 5
+
+# Number of source projects ranked per query
+BATCH_SIZE = 500
+
+RankedProject = namedtuple(
+    "RankedProject", ["related_id", "shared_tags", "same_category"]
+)
+
+RANKING_SQL = """
+WITH sources AS (
+    SELECT id, category FROM {project} {where}
+),
+shared AS (
+    SELECT source.project_id AS source_id,
+           candidate.project_id AS related_id,
+           COUNT(*) AS shared_tags
+    FROM {project_tags} source
+    INNER JOIN {project_tags} candidate
+        ON candidate.tag_id = source.tag_id
+        AND candidate.project_id <> source.project_id
+    WHERE source.project_id IN (SELECT id FROM sources)
+    GROUP BY source.project_id, candidate.project_id
+),
+candidates AS (
+    SELECT sources.id AS source_id, project.id AS related_id
+    FROM sources
+    INNER JOIN {project} project
+        ON project.category = sources.category AND project.id <> sources.id
+    UNION
+    SELECT source_id, related_id FROM shared
+),
+scored AS (
+    SELECT candidates.source_id,
+           candidates.related_id,
+           COALESCE(shared.shared_tags, 0) AS shared_tags,
+           CASE WHEN project.category = sources.category THEN 1 ELSE 0 END
+               AS same_category,
+           project.created_at
+    FROM candidates
+    INNER JOIN sources ON sources.id = candidates.source_id
+    INNER JOIN {project} project ON project.id = candidates.related_id
+    LEFT OUTER JOIN shared
+        ON shared.source_id = candidates.source_id
+        AND shared.related_id = candidates.related_id
+),
+ranked AS (
+    SELECT source_id, related_id, shared_tags, same_category,
+           ROW_NUMBER() OVER (
+               PARTITION BY source_id
+               ORDER BY
+                   CASE WHEN shared_tags > 0 AND same_category = 1
+                       THEN 1 ELSE 0 END DESC,
+                   shared_tags DESC,
+                   same_category DESC,
+                   created_at DESC,
+                   related_id DESC
+           ) AS position
+    FROM scored
+)
+SELECT source_id, related_id, shared_tags, same_category
+FROM ranked
+WHERE position <= %s
+ORDER BY source_id, position
+"""
+
+
+def _rank(project_ids, limit):
+    if project_ids is None:
+        where, params = "", []
+    else:
+        placeholders = ", ".join(["%s"] * len(project_ids))
+        where, params = f"WHERE id IN ({placeholders})", list(project_ids)
+    sql = RANKING_SQL.format(
+        project=connection.ops.quote_name(Project._meta.db_table),
+        project_tags=connection.ops.quote_name(Project.tags.through._meta.db_table),
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+def rank_related_batch(project_ids=None, limit=RELATED_PROJECTS_LIMIT):
+    """
+    Rank the neighbours of several projects, or of every project when
+    ``project_ids`` is None.
+
+    Returns a dict mapping each project id to its ordered ``RankedProject``
+    list. Projects without any neighbour map to an empty list.
+    """
+    if project_ids is None:
+        rows = _rank(None, limit)
+        ranked = {pk: [] for pk in Project.objects.values_list("pk", flat=True)}
+    else:
+        project_ids = sorted(set(project_ids))
+        ranked = {pk: [] for pk in project_ids}
+        rows = []
+        for start in range(0, len(project_ids), BATCH_SIZE):
+            rows.extend(_rank(project_ids[start : start + BATCH_SIZE], limit))
+
+    for source_id, related_id, shared_tags, same_category in rows:
+        ranked.setdefault(source_id, []).append(
+            RankedProject(related_id, shared_tags, bool(same_category))
+        )
+    return ranked
+
+
+def rank_related(project, limit=RELATED_PROJECTS_LIMIT):
+    """Return the ordered ``RankedProject`` neighbours of ``project``."""
+    return rank_related_batch([project.pk], limit)[project.pk]
@@ -0,0 +1,21 @@
+"""
+Registration of the programs models with the image derivatives, search index
+and page bundles, imported by ProgramsConfig.ready.
+"""
+
+from api import images, pages, search
+from .models import Project, ProjectImage, Tag
+from .serializers import ProjectListSerializer
+from .views import ProjectViewSet
+
+search.register(Project, ProjectViewSet.search_fields)
+
+images.register(ProjectImage)
+
+pages.register(
+    "projects",
+    Project.objects.with_cover_image(),
+    ProjectListSerializer,
+    dependencies=[Project, ProjectImage, Tag, Project.tags.through],
+    limit=6,
+)
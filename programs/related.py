@@ -0,0 +1,87 @@
+"""
+Materialized "related projects" index.
+
+Every project keeps its ranked neighbours in ``RelatedProject`` so that read
+paths fetch them with a single query instead of scoring the whole category on
+every request. Neighbours are ranked by programs.ranking and the index is
+rebuilt incrementally by programs.signals for just the projects a change can
+affect.
+"""
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Project, RelatedProject
+from .ranking import rank_related_batch
+
+# Number of neighbours stored per project, and the largest ``?limit=`` served
+RELATED_PROJECTS_INDEX_SIZE = 20
+
+
+def affected_project_ids(project_ids, tag_ids=None):
+    """
+    Return the ids of every project whose neighbours may change when the
+    given projects change: the projects themselves, the projects sharing a
+    category or a tag with them and the projects currently listing them.
+
+    When only the tags ``tag_ids`` of the projects changed, scores can only
+    change between the projects and the other projects tagged with them, so
+    the rest of their categories is left alone.
+    """
+    project_ids = set(project_ids)
+    if not project_ids:
+        return set()
+    listing = RelatedProject.objects.filter(related_id__in=project_ids).values(
+        "project_id"
+    )
+    if tag_ids is None:
+        projects = Project.objects.filter(pk__in=project_ids)
+        tag_ids = Project.tags.through.objects.filter(
+            project_id__in=project_ids
+        ).values("tag_id")
+        neighbours = Q(category__in=projects.values("category")) | Q(
+            tags__in=tag_ids
+        )
+    else:
+        neighbours = Q(tags__in=list(tag_ids))
+    affected = Project.objects.filter(
+        Q(pk__in=project_ids) | neighbours | Q(pk__in=listing)
+    )
+    return set(affected.values_list("pk", flat=True).distinct())
+
+
+def rebuild_related_projects(project_ids=None):
+    """
+    Recompute the index for the given projects, or for every project when
+    ``project_ids`` is None.
+    """
+    with transaction.atomic():
+        ranked = rank_related_batch(project_ids, RELATED_PROJECTS_INDEX_SIZE)
+        stale = RelatedProject.objects.all()
+        if project_ids is not None:
+            stale = stale.filter(project_id__in=list(ranked))
+        stale.delete()
+        RelatedProject.objects.bulk_create(
+            [
+                RelatedProject(
+                    project_id=project_id,
+                    related_id=neighbour.related_id,
+                    rank=rank,
+                    shared_tags=neighbour.shared_tags,
+                    same_category=neighbour.same_category,
+                )
+                for project_id, neighbours in ranked.items()
+                for rank, neighbour in enumerate(neighbours)
+            ],
+            batch_size=1000,
+        )
+
+
+def refresh_related_projects(project_ids, tag_ids=None):
+    """
+    Rebuild the index entries that a change to ``project_ids``, or to their
+    tags ``tag_ids``, may affect.
+    """
+    affected = affected_project_ids(project_ids, tag_ids)
+    if affected:
+        rebuild_related_projects(affected)
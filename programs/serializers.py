@@ -1,5 +1,26 @@
 from rest_framework import serializers
+from api.fastpath import ValuesSerializer
+from api.images import build_srcset
+from api.serializers import ImageSrcsetField, MediaModelSerializer, SparseFieldsetMixin
+from api.storage import MediaURLBuilder
 from .models import Project, ProjectImage, Partner, ProjectPhase, ProjectOutcome, Tag
+from .ranking import RELATED_PROJECTS_LIMIT
+
+
+def image_urls(request=None):
+    """Return the request's ``MediaURLBuilder`` for project images."""
+    storage = ProjectImage._meta.get_field("image").storage
+    return MediaURLBuilder.for_request(request, storage)
+
+
+def build_image_url(name, request=None):
+    """Return the URL of a stored project image file name, or None."""
+    return image_urls(request).url(name)
+
+
+def build_image_srcset(name, derivatives, request=None):
+    """Return the ``{format: srcset}`` of a stored project image file name."""
+    return build_srcset(name, derivatives, image_urls(request))
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -8,20 +29,16 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug"]
 
 
-class ProjectImageSerializer(serializers.ModelSerializer):
+class ProjectImageSerializer(MediaModelSerializer):
     image_url = serializers.SerializerMethodField()
+    srcset = ImageSrcsetField()
 
     def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get("request")
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
+        return build_image_url(obj.image.name, self.context.get("request"))
 
     class Meta:
         model = ProjectImage
-        fields = ["id", "image", "image_url", "order"]
+        fields = ["id", "image", "image_url", "srcset", "order"]
 
 
 class PartnerSerializer(serializers.ModelSerializer):
@@ -42,20 +59,29 @@ class ProjectOutcomeSerializer(serializers.ModelSerializer):
         fields = ["id", "description", "order"]
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class ProjectListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     category = serializers.CharField(source="get_category_display")
-    tags = TagSerializer(many=True, read_only=True)
+    # Denormalized on the project (see programs.denormalize)
+    tags = serializers.ReadOnlyField(source="tag_cache")
+    images = ProjectImageSerializer(many=True, read_only=True)
+    partners = PartnerSerializer(many=True, read_only=True)
+    phases = ProjectPhaseSerializer(many=True, read_only=True)
+    outcomes = ProjectOutcomeSerializer(many=True, read_only=True)
+
+    def get_cover(self, obj):
+        cover = obj.cover_image
+        if cover is None:
+            return None, None
+        return cover.image.name, cover.image_derivatives
 
     def get_image(self, obj):
-        # Get the first image of the project or return None
-        first_image = obj.images.first()
-        if first_image and first_image.image:
-            request = self.context.get("request")
-            if request:
-                return request.build_absolute_uri(first_image.image.url)
-            return first_image.image.url
-        return None
+        name, _ = self.get_cover(obj)
+        return build_image_url(name, self.context.get("request"))
+
+    def get_image_srcset(self, obj):
+        return build_image_srcset(*self.get_cover(obj), self.context.get("request"))
 
     class Meta:
         model = Project
@@ -67,11 +93,36 @@ class ProjectListSerializer(serializers.ModelSerializer):
             "description",
             "year",
             "image",
+            "image_srcset",
             "tags",
+            "images",
+            "partners",
+            "phases",
+            "outcomes",
         ]
+        expandable_fields = ["images", "partners", "phases", "outcomes"]
+        field_prefetches = {
+            "images": ["images"],
+            "partners": ["partners"],
+            "phases": ["phases"],
+            "outcomes": ["outcomes"],
+        }
+
+
+class ProjectListValuesSerializer(ValuesSerializer):
+    """Fast path of ``ProjectListSerializer``, reading the cover by join."""
+
+    def get_image_getter(self, field):
+        urls = image_urls(self.request)
+        return ["cover_image__image"], lambda row: urls.url(row["cover_image__image"])
+
+    def get_image_srcset_getter(self, field):
+        urls = image_urls(self.request)
+        columns = ["cover_image__image", "cover_image__image_derivatives"]
+        return columns, lambda row: build_srcset(row[columns[0]], row[columns[1]], urls)
 
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     images = ProjectImageSerializer(many=True, read_only=True)
     partners = PartnerSerializer(many=True, read_only=True)
     phases = ProjectPhaseSerializer(many=True, read_only=True)
@@ -81,64 +132,27 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
     def get_related_projects(self, obj):
-        # Find related projects automatically based on shared attributes
-        # Prioritize projects with same category and shared tags
-
-        # Start with projects in the same category (excluding the current project)
-        same_category = Project.objects.filter(category=obj.category).exclude(id=obj.id)
-
-        # Find projects with shared tags
-        projects_with_shared_tags = (
-            Project.objects.filter(tags__in=obj.tags.all())
-            .exclude(id=obj.id)
-            .distinct()
-        )
-
-        # Combine and prioritize projects with both same category and shared tags
-        # (they'll appear first in the list)
-        related = list(
-            same_category.filter(
-                id__in=projects_with_shared_tags.values_list("id", flat=True)
-            )
-        )
-
-        # Add remaining projects with shared tags
-        for project in projects_with_shared_tags:
-            if project not in related:
-                related.append(project)
-
-        # Add remaining projects with same category
-        for project in same_category:
-            if project not in related:
-                related.append(project)
-
-        # Limit to 5 related projects
-        related = related[:5]
-
-        # Serialize projects
-        serialized_projects = []
+        # Read the precomputed related projects index (see programs.related)
+        related = Project.objects.related_to(obj).with_cover_image()[
+            :RELATED_PROJECTS_LIMIT
+        ]
+        request = self.context.get("request")
+        related_projects = []
         for project in related:
-            # Get the first image or None
-            first_image = project.images.first()
-            image_url = None
-            if first_image and first_image.image:
-                request = self.context.get("request")
-                if request:
-                    image_url = request.build_absolute_uri(first_image.image.url)
-                else:
-                    image_url = first_image.image.url
-
-            serialized_projects.append(
+            cover = project.cover_image
+            name = cover.image.name if cover else None
+            derivatives = cover.image_derivatives if cover else None
+            related_projects.append(
                 {
                     "id": project.id,
                     "title": project.title,
                     "slug": project.slug,
                     "category": project.get_category_display(),
-                    "image": image_url,
+                    "image": build_image_url(name, request),
+                    "image_srcset": build_image_srcset(name, derivatives, request),
                 }
             )
-
-        return serialized_projects
+        return related_projects
 
     class Meta:
         model = Project
@@ -162,3 +176,10 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        field_prefetches = {
+            "images": ["images"],
+            "partners": ["partners"],
+            "phases": ["phases"],
+            "outcomes": ["outcomes"],
+            "tags": ["tags"],
+        }
@@ -0,0 +1,194 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api import images
+from api.cache import track_versions
+from .models import (
+    Partner,
+    Project,
+    ProjectImage,
+    ProjectOutcome,
+    ProjectPhase,
+    RelatedProject,
+    Tag,
+)
+from .denormalize import refresh_cover_images, refresh_tag_caches
+from .related import refresh_related_projects
+
+track_versions(
+    Project,
+    ProjectImage,
+    Tag,
+    Project.tags.through,
+    # Rendered by the lists' ?expand=
+    Partner,
+    Partner.projects.through,
+    ProjectPhase,
+    ProjectOutcome,
+)
+
+
+def touch_projects(project_ids):
+    """
+    Bump ``updated_at`` of projects whose serialized form changed through a
+    related row, so that their HTTP validators change too.
+    """
+    project_ids = [pk for pk in project_ids if pk is not None]
+    if project_ids:
+        Project.objects.filter(pk__in=project_ids).update(updated_at=timezone.now())
+
+
+def changed_project_ids(instance, action, reverse, pk_set):
+    """Return the project ids affected by an m2m change on a project relation."""
+    if not reverse:
+        return [instance.pk]
+    if action == "post_clear":
+        return getattr(instance, "_cleared_project_ids", [])
+    return list(pk_set)
+
+
+def refresh_related_on_commit(project_ids, tag_ids):
+    """
+    Refresh the related index once the transaction commits, for a change of
+    the tags ``tag_ids`` of the projects ``project_ids``.
+    """
+    project_ids = list(project_ids)
+    transaction.on_commit(lambda: refresh_related_projects(project_ids, tag_ids))
+
+
+def category_changed(instance, update_fields):
+    if update_fields is not None and "category" not in update_fields:
+        return False
+    # Instances not loaded from the database may have any category
+    return getattr(instance, "_loaded_category", None) != instance.category
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created=False, raw=False, **kwargs):
+    # Saves leave the denormalized fields alone (see Project.save), so only
+    # the related index can need a refresh, when the category changes
+    if raw or not (created or category_changed(instance, kwargs["update_fields"])):
+        return
+    instance._loaded_category = instance.category
+    pk = instance.pk
+    transaction.on_commit(lambda: refresh_related_projects([pk]))
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleting(sender, instance, **kwargs):
+    # Remember who lists this project before the index rows cascade away
+    instance._listed_by = list(
+        RelatedProject.objects.filter(related=instance).values_list(
+            "project_id", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    refresh_related_projects(getattr(instance, "_listed_by", []))
+
+
+@receiver(m2m_changed, sender=Project.tags.through)
+def project_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_project_ids = list(
+            instance.projects.values_list("pk", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    project_ids = changed_project_ids(instance, action, reverse, pk_set)
+    caches = refresh_tag_caches(project_ids)
+    if not reverse:
+        instance.tag_cache = caches[instance.pk]
+    tag_ids = [instance.pk] if reverse else list(pk_set or ())
+    refresh_related_on_commit(project_ids, tag_ids)
+    touch_projects(project_ids)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    project_ids = list(instance.projects.values_list("pk", flat=True))
+    refresh_tag_caches(project_ids)
+    touch_projects(project_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    # Deleting a tag removes its through rows without sending m2m_changed
+    instance._tagged_project_ids = list(
+        instance.projects.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    project_ids = getattr(instance, "_tagged_project_ids", [])
+    refresh_tag_caches(project_ids)
+    refresh_related_on_commit(project_ids, [instance.pk])
+    touch_projects(project_ids)
+
+
+@receiver(post_save, sender=ProjectImage)
+@receiver(post_delete, sender=ProjectImage)
+def project_image_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # An image moved to another project stops being the old project's cover
+    project_ids = {instance.project_id}
+    project_ids.update(
+        Project.objects.filter(cover_image=instance.pk).values_list("pk", flat=True)
+    )
+    refresh_cover_images(project_ids)
+    touch_projects(project_ids)
+
+
+@receiver(post_save, sender=ProjectPhase)
+@receiver(post_delete, sender=ProjectPhase)
+@receiver(post_save, sender=ProjectOutcome)
+@receiver(post_delete, sender=ProjectOutcome)
+def project_child_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    touch_projects([instance.project_id])
+
+
+@receiver(images.derivatives_generated, sender=ProjectImage)
+def project_image_derivatives_generated(sender, pk, **kwargs):
+    image = ProjectImage.objects.filter(pk=pk)
+    touch_projects(image.values_list("project_id", flat=True))
+
+
+@receiver(post_save, sender=Partner)
+def partner_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    touch_projects(instance.projects.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Partner)
+def partner_deleting(sender, instance, **kwargs):
+    instance._partner_project_ids = list(
+        instance.projects.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Partner)
+def partner_deleted(sender, instance, **kwargs):
+    touch_projects(getattr(instance, "_partner_project_ids", []))
+
+
+@receiver(m2m_changed, sender=Partner.projects.through)
+def partner_projects_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Forward changes come from a partner, reverse ones from a project
+    if action == "pre_clear" and not reverse:
+        instance._cleared_project_ids = list(
+            instance.projects.values_list("pk", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    touch_projects(changed_project_ids(instance, action, not reverse, pk_set))
@@ -1,3 +1,841 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpRequest
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from .denormalize import find_drift
+from .models import (
+    Partner,
+    Project,
+    ProjectImage,
+    ProjectPhase,
+    RelatedProject,
+    Tag,
+)
+from .ranking import rank_related, rank_related_batch
+from .related import affected_project_ids, rebuild_related_projects
+from api.instrumentation import QueryBudgetExceeded
+from .serializers import ProjectListSerializer, ProjectListValuesSerializer
+from .views import ProjectViewSet
+
+
+def make_project(title, category="Education", **kwargs):
+    defaults = {
+        "year": "2024",
+        "description": f"{title} description",
+        "full_description": f"{title} full description",
+        "location": "Kathmandu",
+        "beneficiaries": "100 families",
+        "duration": "6 months",
+    }
+    defaults.update(kwargs)
+    # Run the commit hooks, as when created outside the test's transaction
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return Project.objects.create(title=title, category=category, **defaults)
+
+
+def make_upload(name, width=800, height=600):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "teal").save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ProjectListQueryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.tags = [Tag.objects.create(name=name) for name in ("Water", "Schools")]
+
+    def add_projects(self, count):
+        for index in range(Project.objects.count(), Project.objects.count() + count):
+            project = make_project(f"Project {index}")
+            project.tags.set(self.tags)
+            ProjectImage.objects.create(
+                project=project, image=f"project_images/{index}-b.jpg", order=2
+            )
+            ProjectImage.objects.create(
+                project=project, image=f"project_images/{index}-a.jpg", order=1
+            )
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/projects/")
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.add_projects(2)
+        small_page, _ = self.count_list_queries()
+        self.add_projects(8)
+        full_page, response = self.count_list_queries()
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(small_page, full_page)
+
+    def test_list_uses_lowest_ordered_image_as_cover(self):
+        self.add_projects(1)
+        _, response = self.count_list_queries()
+        result = response.data["results"][0]
+        self.assertEqual(
+            result["image"], "http://testserver/media/project_images/0-a.jpg"
+        )
+        self.assertEqual(
+            [tag["name"] for tag in result["tags"]], ["Schools", "Water"]
+        )
+
+    def test_cursor_pages_keep_the_list_shape(self):
+        self.add_projects(12)
+        first = self.client.get("/api/projects/", {"cursor": "", "count": "false"})
+        self.assertNotIn("count", first.data)
+        second = self.client.get(first.data["next"]).data
+        self.assertIsNone(second["next"])
+        titles = [
+            item["title"] for item in first.data["results"] + second["results"]
+        ]
+        self.assertEqual(
+            titles, list(Project.objects.values_list("title", flat=True))
+        )
+        self.assertTrue(all(item["image"] for item in second["results"]))
+
+
+class ProjectDenormalizationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = make_project("Clean Water")
+        self.water = Tag.objects.create(name="Water")
+        self.schools = Tag.objects.create(name="Schools")
+
+    def cached(self):
+        self.project.refresh_from_db()
+        names = [tag["name"] for tag in self.project.tag_cache]
+        return self.project.cover_image_id, names
+
+    def test_cover_image_follows_image_changes(self):
+        second = ProjectImage.objects.create(
+            project=self.project, image="project_images/b.jpg", order=2
+        )
+        self.assertEqual(self.cached()[0], second.pk)
+        first = ProjectImage.objects.create(
+            project=self.project, image="project_images/a.jpg", order=1
+        )
+        self.assertEqual(self.cached()[0], first.pk)
+
+        first.order = 3
+        first.save()
+        self.assertEqual(self.cached()[0], second.pk)
+        second.delete()
+        self.assertEqual(self.cached()[0], first.pk)
+
+        other = make_project("Schools")
+        first.project = other
+        first.save()
+        self.assertIsNone(self.cached()[0])
+        other.refresh_from_db()
+        self.assertEqual(other.cover_image_id, first.pk)
+
+    def test_saving_a_stale_instance_keeps_denormalized_fields(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        image = ProjectImage.objects.create(
+            project=self.project, image="project_images/a.jpg"
+        )
+        self.project.tags.add(self.water)
+        stale.title = "Clean Water for All"
+        stale.save()
+        self.assertEqual(self.cached(), (image.pk, ["Water"]))
+        self.assertEqual(self.project.title, "Clean Water for All")
+
+    def test_tag_cache_follows_tag_changes(self):
+        self.project.tags.add(self.water, self.schools)
+        self.assertEqual(self.project.tag_cache[0]["name"], "Schools")
+        self.assertEqual(self.cached()[1], ["Schools", "Water"])
+
+        self.water.name = "Clean water"
+        self.water.save()
+        self.assertEqual(self.cached()[1], ["Clean water", "Schools"])
+        self.schools.projects.remove(self.project)
+        self.assertEqual(self.cached()[1], ["Clean water"])
+        self.water.delete()
+        self.assertEqual(self.cached()[1], [])
+
+    def test_list_renders_from_the_project_row(self):
+        self.project.tags.add(self.water)
+        ProjectImage.objects.create(
+            project=self.project, image="project_images/a.jpg"
+        )
+        # The validator, the count and the page, with covers joined in
+        with self.assertNumQueries(3):
+            result = self.client.get("/api/projects/").data["results"][0]
+        self.assertEqual(
+            result["tags"],
+            [{"id": self.water.pk, "name": "Water", "slug": "water"}],
+        )
+        self.assertEqual(
+            result["image"], "http://testserver/media/project_images/a.jpg"
+        )
+
+    def test_consistency_check_repairs_drift(self):
+        self.project.tags.add(self.water)
+        image = ProjectImage.objects.create(
+            project=self.project, image="project_images/a.jpg"
+        )
+        self.assertEqual(list(find_drift()), [])
+
+        # update() sends no signals
+        Tag.objects.filter(pk=self.water.pk).update(name="Rivers")
+        Project.objects.filter(pk=self.project.pk).update(cover_image=None)
+        with self.assertRaises(CommandError):
+            call_command("check_project_denormalization", stdout=StringIO())
+
+        out = StringIO()
+        call_command("check_project_denormalization", "--repair", stdout=out)
+        self.assertIn("Repaired 1 projects", out.getvalue())
+        self.assertEqual(self.cached(), (image.pk, ["Rivers"]))
+        self.assertEqual(list(find_drift()), [])
+
+
+class ProjectSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = make_project("Clean Water")
+        self.project.tags.add(Tag.objects.create(name="Water"))
+        ProjectImage.objects.create(
+            project=self.project, image="project_images/a.jpg"
+        )
+        self.url = f"/api/projects/{self.project.slug}/"
+
+    def test_detail_fields_skip_relations_and_related_projects(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.url)
+        cache.clear()
+        with mock.patch(
+            "programs.serializers.ProjectDetailSerializer.get_related_projects"
+        ) as related:
+            # The fingerprint and the project, no prefetches or related index
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url, {"fields": "title,slug"})
+        related.assert_not_called()
+        self.assertEqual(response.data, {"title": "Clean Water", "slug": "clean-water"})
+        self.assertGreater(len(full), 2)
+
+        response = self.client.get(self.url, {"fields": "title,images"})
+        self.assertEqual(list(response.data), ["title", "images"])
+        self.assertEqual(response.data["images"][0]["order"], 0)
+
+    def test_list_expands_relations_with_prefetches(self):
+        make_project("Clinic").phases.create(name="Build", duration="1 month")
+        response = self.client.get("/api/projects/")
+        self.assertNotIn("images", response.data["results"][0])
+
+        def expanded_list():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    "/api/projects/",
+                    {"expand": "images,phases", "fields": "slug,images,phases"},
+                )
+            return len(queries), response.data["results"]
+
+        queries, results = expanded_list()
+        self.assertEqual(
+            [list(result) for result in results], [["slug", "images", "phases"]] * 2
+        )
+        self.assertEqual(results[0]["phases"][0]["name"], "Build")
+        self.assertEqual(results[1]["images"][0]["order"], 0)
+
+        cache.clear()
+        make_project("School").images.create(image="project_images/b.jpg")
+        self.assertEqual(expanded_list()[0], queries)
+
+    def test_unknown_expansions_are_rejected(self):
+        response = self.client.get("/api/projects/", {"expand": "tags"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectPageSectionTests(APITestCase):
+    def test_home_page_lists_the_latest_projects(self):
+        cache.clear()
+        for index in range(8):
+            make_project(f"Project {index}")
+        etag = self.client.get("/api/pages/home/")["ETag"]
+        projects = self.client.get("/api/pages/home/").data["projects"]
+        listing = self.client.get("/api/projects/").data["results"]
+        self.assertEqual(projects, listing[:6])
+
+        Tag.objects.create(name="Water").projects.add(Project.objects.first())
+        response = self.client.get("/api/pages/home/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data["projects"][0]["tags"][0]["name"], "Water")
+
+
+class ProjectValuesListTests(APITestCase):
+    def test_list_is_identical_to_the_serializer(self):
+        cache.clear()
+        water = Tag.objects.create(name="Water")
+        for index in range(12):
+            project = make_project(f"Project {index}", category="Health")
+            if index % 3:
+                project.tags.add(water)
+            if index % 2:
+                ProjectImage.objects.create(
+                    project=project, image=f"project_images/{index}.jpg"
+                )
+        ProjectImage.objects.filter(image="project_images/1.jpg").update(
+            image_derivatives={
+                "name": "project_images/1.jpg",
+                "widths": [320],
+                "files": {"jpeg": ["project_images/derivatives/1-320w.jpg"]},
+            }
+        )
+        self.assertTrue(
+            ProjectListValuesSerializer(
+                ProjectListSerializer(context={"request": None})
+            ).supported
+        )
+
+        for params in ({}, {"cursor": ""}, {"category": "Health", "page": 2}):
+            fast = self.client.get("/api/projects/", params)
+            cache.clear()
+            with mock.patch.object(
+                ProjectViewSet, "values_serializer_class", None
+            ):
+                regular = self.client.get("/api/projects/", params)
+            cache.clear()
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content, regular.content)
+        self.assertIn(b"1-320w.jpg 320w", fast.content)
+
+
+class ProjectQueryBudgetTests(APITestCase):
+    def test_per_row_queries_go_over_the_list_budget(self):
+        cache.clear()
+        for index in range(10):
+            ProjectImage.objects.create(
+                project=make_project(f"Project {index}"),
+                image=f"project_images/{index}.jpg",
+            )
+
+        def first_image(serializer, obj):
+            image = obj.images.first()
+            return image.image.name, image.image_derivatives
+
+        with mock.patch.object(
+            ProjectViewSet, "values_serializer_class", None
+        ), mock.patch.object(ProjectListSerializer, "get_cover", first_image):
+            with self.assertRaisesRegex(QueryBudgetExceeded, "ProjectViewSet.list"):
+                self.client.get("/api/projects/")
+
+
+class SeedDataTests(APITestCase):
+    def seed(self, **options):
+        options = {
+            "projects": 20,
+            "tags": 8,
+            "partners": 5,
+            "team_members": 3,
+            "testimonials": 3,
+            "faqs": 2,
+            "contacts": 10,
+            **options,
+        }
+        call_command("seed_data", stdout=StringIO(), **options)
+
+    def test_seeds_consistent_derived_data(self):
+        self.seed()
+        self.assertEqual(Project.objects.count(), 20)
+        self.assertEqual(Tag.objects.count(), 8)
+        self.assertFalse(Project.objects.filter(cover_image=None).exists())
+        self.assertEqual(list(find_drift()), [])
+        self.assertTrue(RelatedProject.objects.exists())
+        self.assertEqual(Partner.objects.count(), 5)
+
+    def test_tags_follow_a_skewed_distribution(self):
+        self.seed(projects=200)
+        counts = list(
+            Tag.objects.annotate(uses=Count("projects"))
+            .order_by("pk")
+            .values_list("uses", flat=True)
+        )
+        self.assertGreater(counts[0], 3 * counts[-1])
+
+    def test_seed_is_repeatable(self):
+        self.seed()
+        first = list(Project.objects.order_by("pk").values_list("title", "category"))
+        Project.objects.all().delete()
+        self.seed()
+        second = list(Project.objects.order_by("pk").values_list("title", "category"))
+        self.assertEqual(first, second)
+        self.seed(scale=0.5)
+        self.assertEqual(Project.objects.count(), 30)
+
+
+class RelatedProjectIndexTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.water = Tag.objects.create(name="Water")
+        self.schools = Tag.objects.create(name="Schools")
+        self.project = make_project("Clean Water", category="Health")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.tags.set([self.water, self.schools])
+
+    def related_slugs(self, project):
+        return list(
+            Project.objects.related_to(project).values_list("slug", flat=True)
+        )
+
+    def test_neighbours_are_ranked_by_tags_and_category(self):
+        same_category = make_project("Clinic", category="Health")
+        one_tag = make_project("Wells", category="Environment")
+        two_tags = make_project("School Taps", category="Education")
+        both = make_project("Hospital Water", category="Health")
+        make_project("Unrelated", category="Other")
+        with self.captureOnCommitCallbacks(execute=True):
+            one_tag.tags.add(self.water)
+            two_tags.tags.add(self.water, self.schools)
+            both.tags.add(self.water)
+
+        self.assertEqual(
+            self.related_slugs(self.project),
+            [both.slug, two_tags.slug, one_tag.slug, same_category.slug],
+        )
+
+    def test_index_follows_tag_changes(self):
+        neighbour = make_project("Wells", category="Environment")
+        self.assertEqual(self.related_slugs(self.project), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            neighbour.tags.add(self.water)
+        self.assertEqual(self.related_slugs(self.project), [neighbour.slug])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.water.projects.remove(neighbour)
+        self.assertEqual(self.related_slugs(self.project), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            neighbour.tags.add(self.schools)
+            self.schools.delete()
+        self.assertEqual(self.related_slugs(self.project), [])
+
+    def test_tag_changes_refresh_only_projects_sharing_the_tags(self):
+        listing = make_project("Clinic", category="Health")
+        make_project("Library", category="Culture")
+        wells = make_project("Wells", category="Environment")
+        pumps = Tag.objects.create(name="Pumps")
+        with self.captureOnCommitCallbacks(execute=True):
+            wells.tags.add(pumps)
+        self.assertEqual(self.related_slugs(listing), [self.project.slug])
+
+        self.assertEqual(
+            affected_project_ids([self.project.pk], [pumps.pk]),
+            {self.project.pk, listing.pk, wells.pk},
+        )
+
+        # The index is refreshed once the transaction commits
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.project.tags.add(pumps)
+        self.assertEqual(self.related_slugs(self.project), [listing.slug])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            self.related_slugs(self.project), [wells.slug, listing.slug]
+        )
+
+    def test_index_follows_category_changes_and_deletes(self):
+        neighbour = make_project("Clinic", category="Health")
+        self.assertEqual(self.related_slugs(self.project), [neighbour.slug])
+
+        neighbour.category = "Other"
+        with self.captureOnCommitCallbacks(execute=True):
+            neighbour.save()
+        self.assertEqual(self.related_slugs(self.project), [])
+
+        neighbour.category = "Health"
+        with self.captureOnCommitCallbacks(execute=True):
+            neighbour.save()
+        neighbour.delete()
+        self.assertEqual(self.related_slugs(self.project), [])
+
+    def test_saves_refresh_the_index_only_on_category_changes(self):
+        neighbour = make_project("Clinic", category="Health")
+        neighbour = Project.objects.get(pk=neighbour.pk)
+        neighbour.description = "A rural clinic"
+        with mock.patch("programs.signals.refresh_related_projects") as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                neighbour.save()
+        refresh.assert_not_called()
+
+        # Not run until the transaction commits
+        neighbour.category = "Other"
+        with self.captureOnCommitCallbacks() as callbacks:
+            neighbour.save()
+        self.assertEqual(self.related_slugs(self.project), [neighbour.slug])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.related_slugs(self.project), [])
+
+    def test_full_rebuild_matches_incremental_index(self):
+        for index in range(4):
+            make_project(f"Clinic {index}", category="Health").tags.add(self.water)
+        entries = RelatedProject.objects.values_list("project", "related", "rank")
+        incremental = list(entries)
+        rebuild_related_projects()
+        self.assertEqual(list(entries), incremental)
+
+    def test_read_paths_read_the_index_in_one_query(self):
+        for index in range(7):
+            neighbour = make_project(f"Clinic {index}", category="Health")
+            ProjectImage.objects.create(
+                project=neighbour, image=f"project_images/{index}.jpg"
+            )
+
+        url = f"/api/projects/{self.project.slug}/"
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["related_projects"]), 5)
+        self.assertEqual(
+            response.data["related_projects"][0]["image"],
+            "http://testserver/media/project_images/6.jpg",
+        )
+
+        # Project lookup and index read, tags are denormalized on the project
+        with self.assertNumQueries(2):
+            response = self.client.get(f"{url}related/")
+        self.assertEqual(
+            [item["slug"] for item in response.data],
+            [item["slug"] for item in self.client.get(url).data["related_projects"]],
+        )
+
+
+class RelatedProjectRankingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.water = Tag.objects.create(name="Water")
+        self.projects = [
+            make_project(f"Clinic {index}", category="Health") for index in range(8)
+        ]
+        self.projects[0].tags.add(self.water)
+        self.projects[3].tags.add(self.water)
+
+    def test_rank_is_limited_and_ordered_in_the_database(self):
+        ranked = rank_related(self.projects[0], limit=3)
+        self.assertEqual(
+            [neighbour.related_id for neighbour in ranked],
+            [self.projects[3].pk, self.projects[7].pk, self.projects[6].pk],
+        )
+        self.assertEqual(ranked[0].shared_tags, 1)
+        self.assertTrue(ranked[0].same_category)
+
+    def test_batch_matches_single_project_ranking(self):
+        other = make_project("Lonely", category="Other")
+        project_ids = [project.pk for project in self.projects] + [other.pk]
+        ranked = rank_related_batch(project_ids)
+        self.assertEqual(ranked[other.pk], [])
+        for project in self.projects:
+            self.assertEqual(ranked[project.pk], rank_related(project))
+
+    def test_related_action_accepts_a_limit(self):
+        url = f"/api/projects/{self.projects[0].slug}/related/"
+        self.assertEqual(len(self.client.get(url).data), 5)
+        self.assertEqual(len(self.client.get(url, {"limit": 2}).data), 2)
+        self.assertEqual(len(self.client.get(url, {"limit": 50}).data), 7)
+        self.assertEqual(self.client.get(url, {"limit": "x"}).status_code, 400)
+
+
+class ProjectConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = make_project("Clean Water", category="Health")
+        self.neighbour = make_project("Clinic", category="Health")
+
+    def assertChanges(self, url, change):
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        change()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_list_follows_images_and_tags(self):
+        tag = Tag.objects.create(name="Water")
+        self.assertChanges(
+            "/api/projects/",
+            lambda: ProjectImage.objects.create(
+                project=self.project, image="project_images/a.jpg"
+            ),
+        )
+        self.assertChanges("/api/projects/", lambda: self.project.tags.add(tag))
+
+        def rename():
+            tag.name = "Clean water"
+            tag.save()
+
+        self.assertChanges("/api/projects/", rename)
+
+    def test_detail_follows_partners_and_related_projects(self):
+        url = f"/api/projects/{self.project.slug}/"
+        partner = Partner.objects.create(name="Red Cross")
+        self.assertChanges(url, lambda: partner.projects.add(self.project))
+
+        def rename_neighbour():
+            self.neighbour.title = "Health Post"
+            self.neighbour.save()
+
+        self.assertChanges(url, rename_neighbour)
+
+
+class ProjectListCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = make_project("Clean Water")
+
+    def test_list_cache_follows_images_and_tags(self):
+        self.client.get("/api/projects/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/projects/")
+
+        ProjectImage.objects.create(
+            project=self.project, image="project_images/a.jpg"
+        )
+        result = self.client.get("/api/projects/").data["results"][0]
+        self.assertEqual(
+            result["image"], "http://testserver/media/project_images/a.jpg"
+        )
+
+        self.project.tags.add(Tag.objects.create(name="Water"))
+        result = self.client.get("/api/projects/").data["results"][0]
+        self.assertEqual([tag["name"] for tag in result["tags"]], ["Water"])
+
+    def test_expanded_list_cache_follows_phases_and_partners(self):
+        phase = ProjectPhase.objects.create(
+            project=self.project, name="Survey", duration="1 month"
+        )
+        partner = Partner.objects.create(name="Red Cross")
+        partner.projects.add(self.project)
+        url = "/api/projects/?expand=phases,partners"
+        etag = self.client.get(url)["ETag"]
+
+        phase.complete = True
+        phase.save()
+        response = self.client.get(url)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertTrue(response.data["results"][0]["phases"][0]["complete"])
+
+        partner.name = "Red Crescent"
+        partner.save()
+        result = self.client.get(url).data["results"][0]
+        self.assertEqual(result["partners"][0]["name"], "Red Crescent")
+
+        partner.projects.remove(self.project)
+        self.assertEqual(self.client.get(url).data["results"][0]["partners"], [])
+
+
+class ProjectFacetEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = make_project("Clean Water", year="2022")
+        make_project("Clinic", year="2024")
+        make_project("Schools", year="2022")
+        Tag.objects.create(name="Water")
+
+    def test_categories_are_static_with_a_validator(self):
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/projects/categories/")
+        self.assertEqual(response.data[0], {"id": "Education", "name": "Education"})
+        response = self.client.get(
+            "/api/projects/categories/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_years_are_sorted_cached_and_invalidated(self):
+        response = self.client.get("/api/projects/years/")
+        self.assertEqual(response.data, ["2024", "2022"])
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                "/api/projects/years/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(cached.status_code, 304)
+
+        self.project.year = "2025"
+        self.project.save()
+        response = self.client.get(
+            "/api/projects/years/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.data, ["2025", "2024", "2022"])
+
+    def test_tags_are_invalidated_only_by_tag_changes(self):
+        response = self.client.get("/api/projects/tags/")
+        self.assertEqual([tag["name"] for tag in response.data], ["Water"])
+        make_project("Library")
+        with self.assertNumQueries(0):
+            self.client.get("/api/projects/tags/")
+
+        Tag.objects.create(name="Health")
+        response = self.client.get("/api/projects/tags/")
+        self.assertEqual([tag["name"] for tag in response.data], ["Health", "Water"])
+
+
+class ProjectFacetsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        water = Tag.objects.create(name="Water")
+        schools = Tag.objects.create(name="Schools")
+        make_project("Clean Water", category="Health", year="2023").tags.add(water)
+        make_project("Wells", category="Environment", year="2024").tags.add(water)
+        make_project("Classrooms", year="2024").tags.add(water, schools)
+
+    def test_facets_count_categories_years_and_tags(self):
+        # Three grouped queries for the facets themselves
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/projects/facets/")
+        categories = {item["id"]: item["count"] for item in response.data["categories"]}
+        self.assertEqual(categories["Health"], 1)
+        self.assertEqual(categories["Education"], 1)
+        self.assertEqual(categories["Other"], 0)
+        self.assertEqual(
+            response.data["years"],
+            [{"year": "2024", "count": 2}, {"year": "2023", "count": 1}],
+        )
+        self.assertEqual(
+            [(tag["name"], tag["count"]) for tag in response.data["tags"]],
+            [("Schools", 1), ("Water", 3)],
+        )
+
+    def test_facets_follow_filters_and_search(self):
+        response = self.client.get("/api/projects/facets/", {"year": "2024"})
+        self.assertEqual(response.data["years"], [{"year": "2024", "count": 2}])
+        self.assertEqual(
+            [(tag["name"], tag["count"]) for tag in response.data["tags"]],
+            [("Schools", 1), ("Water", 2)],
+        )
+
+        response = self.client.get("/api/projects/facets/", {"search": "wells"})
+        self.assertEqual(
+            [(tag["name"], tag["count"]) for tag in response.data["tags"]],
+            [("Water", 1)],
+        )
+
+
+@override_settings(
+    IMAGE_DERIVATIVE_WIDTHS=[320, 640, 1280],
+    IMAGE_DERIVATIVE_FORMATS=["webp", "jpeg"],
+    IMAGE_DERIVATIVE_WORKERS=0,
+)
+class ImageDerivativeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.project = make_project("Clean Water")
+
+    def add_image(self, name="cover.png", **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ProjectImage.objects.create(
+                project=self.project, image=make_upload(name, **kwargs)
+            )
+
+    def test_uploads_get_smaller_derivatives_in_every_format(self):
+        image = self.add_image()
+        image.refresh_from_db()
+        derivatives = image.image_derivatives
+        self.assertEqual(derivatives["name"], image.image.name)
+        self.assertEqual(derivatives["widths"], [320, 640])
+        self.assertEqual(sorted(derivatives["files"]), ["jpeg", "webp"])
+        small, large = derivatives["files"]["webp"]
+        self.assertRegex(
+            small, r"^project_images/derivatives/cover-320w\.\w{16}\.webp$"
+        )
+        with default_storage.open(small) as derivative:
+            self.assertEqual(Image.open(derivative).size, (320, 240))
+        with default_storage.open(derivatives["files"]["jpeg"][1]) as derivative:
+            self.assertEqual(Image.open(derivative).format, "JPEG")
+
+    def test_list_and_detail_expose_srcsets(self):
+        image = self.add_image()
+        image.refresh_from_db()
+        small, large = image.image_derivatives["files"]["webp"]
+        result = self.client.get("/api/projects/").data["results"][0]
+        self.assertEqual(
+            result["image_srcset"]["webp"],
+            f"http://testserver/media/{small} 320w, "
+            f"http://testserver/media/{large} 640w",
+        )
+        detail = self.client.get(f"/api/projects/{self.project.slug}/").data
+        self.assertEqual(detail["images"][0]["srcset"], result["image_srcset"])
+
+    def test_replaced_files_do_not_advertise_old_derivatives(self):
+        image = self.add_image()
+        image.refresh_from_db()
+        image.image = "project_images/other.png"
+        image.save()
+        result = self.client.get("/api/projects/").data["results"][0]
+        self.assertEqual(result["image_srcset"], {})
+
+    def test_backfill_processes_existing_images(self):
+        image = self.add_image()
+        ProjectImage.objects.filter(pk=image.pk).update(image_derivatives={})
+        call_command(
+            "generate_image_derivatives",
+            "programs.ProjectImage",
+            "--workers=0",
+            stdout=StringIO(),
+        )
+        image.refresh_from_db()
+        self.assertEqual(image.image_derivatives["widths"], [320, 640])
+
+
+class MediaURLTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = make_project("Clean Water")
+        for index in range(3):
+            ProjectImage.objects.create(
+                project=self.project, image=f"project_images/{index} a.jpg", order=index
+            )
+
+    def image_urls(self):
+        detail = self.client.get(f"/api/projects/{self.project.slug}/").data
+        return [(image["image"], image["image_url"]) for image in detail["images"]]
+
+    def test_absolute_urls_resolve_the_host_once_per_request(self):
+        with mock.patch.object(
+            HttpRequest,
+            "build_absolute_uri",
+            autospec=True,
+            side_effect=HttpRequest.build_absolute_uri,
+        ) as build_absolute_uri:
+            urls = self.image_urls()
+        self.assertEqual(build_absolute_uri.call_count, 1)
+        self.assertEqual(
+            urls[0],
+            (
+                "http://testserver/media/project_images/0%20a.jpg",
+                "http://testserver/media/project_images/0%20a.jpg",
+            ),
+        )
+
+    @override_settings(API_MEDIA_URLS="relative")
+    def test_relative_urls(self):
+        self.assertEqual(self.image_urls()[1][0], "/media/project_images/1%20a.jpg")
+        card = self.client.get("/api/projects/").data["results"][0]
+        self.assertEqual(card["image"], "/media/project_images/0%20a.jpg")
+
+    @override_settings(
+        API_MEDIA_URLS="cdn", API_MEDIA_CDN_URL="https://cdn.example.org/m"
+    )
+    def test_cdn_urls(self):
+        self.assertEqual(
+            self.image_urls()[2][1],
+            "https://cdn.example.org/m/project_images/2%20a.jpg",
+        )
@@ -1,10 +1,27 @@
-from rest_framework import viewsets, filters
+import hashlib
+
+from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count, Q
+from api.asyncviews import AsyncReadMixin
+from api.instrumentation import serializing
+from api.mixins import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SerializerTimingMixin,
+    ValuesListMixin,
+    not_modified_response,
+    set_validators,
+)
+from api.pagination import KeysetPagination
+from api.search import FullTextSearchFilter
 from .models import Project, ProjectImage, Partner, ProjectPhase, ProjectOutcome, Tag
 from .serializers import (
     ProjectListSerializer,
+    ProjectListValuesSerializer,
     ProjectDetailSerializer,
     ProjectImageSerializer,
     PartnerSerializer,
@@ -12,19 +29,89 @@ from .serializers import (
     ProjectOutcomeSerializer,
     TagSerializer,
 )
+from .ranking import RELATED_PROJECTS_LIMIT
+from .related import RELATED_PROJECTS_INDEX_SIZE
 
+# Categories are static, so their payload and validator are computed once
+PROJECT_CATEGORIES = [
+    {"id": choice[0], "name": choice[1]} for choice in Project.CATEGORY_CHOICES
+]
+PROJECT_CATEGORIES_ETAG = '"%s"' % hashlib.md5(
+    repr(PROJECT_CATEGORIES).encode()
+).hexdigest()
 
-class ProjectViewSet(viewsets.ModelViewSet):
+
+class ProjectViewSet(
+    AsyncReadMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SerializerTimingMixin,
+    viewsets.ModelViewSet,
+):
     """
     API endpoint for projects
     """
 
     queryset = Project.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    values_serializer_class = ProjectListValuesSerializer
+    # Queries per request, searches and session authentication included
+    query_budget = {
+        "list": 12,
+        "retrieve": 11,
+        "related": 5,
+        "facets": 12,
+        "years": 3,
+        "tags": 3,
+        "categories": 2,
+    }
+    cache_dependencies = (
+        Project,
+        ProjectImage,
+        Tag,
+        Project.tags.through,
+        # Rendered by ?expand=
+        Partner,
+        Partner.projects.through,
+        ProjectPhase,
+        ProjectOutcome,
+    )
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    pagination_class = KeysetPagination
+    keyset_ordering = ["-created_at", "-id"]
     filterset_fields = ["category", "year", "tags"]
     search_fields = ["title", "description", "location"]
     lookup_field = "slug"
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if self.action == "list" and (
+            serializer_class.renders_field("image", self.request)
+            or serializer_class.renders_field("image_srcset", self.request)
+        ):
+            # Covers and tags are denormalized, so a page is a single query
+            queryset = queryset.with_cover_image()
+        if self.action in ("list", "retrieve"):
+            # Relations left out by ?fields= or ?expand= are not fetched at all
+            queryset = queryset.prefetch_related(
+                *serializer_class.get_prefetches(self.request)
+            )
+        return queryset
+
+    def get_detail_fingerprint_queryset(self):
+        # The detail also renders the related projects, so they are part of it
+        project = super().get_detail_fingerprint_queryset()
+        if not ProjectDetailSerializer.renders_field("related_projects", self.request):
+            return project
+        related = Project.objects.filter(
+            related_index_entries__project__in=project,
+            related_index_entries__rank__lt=RELATED_PROJECTS_LIMIT,
+        )
+        return Project.objects.filter(
+            Q(pk__in=project.values("pk")) | Q(pk__in=related.values("pk"))
+        )
+
     def get_serializer_class(self):
         if self.action == "list":
             return ProjectListSerializer
@@ -37,66 +124,100 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=False)
     def categories(self, request):
         """Returns all available project categories"""
-        categories = [
-            {"id": choice[0], "name": choice[1]} for choice in Project.CATEGORY_CHOICES
-        ]
-        return Response(categories)
+        response = not_modified_response(request, PROJECT_CATEGORIES_ETAG, None)
+        if response is None:
+            response = Response(PROJECT_CATEGORIES)
+            set_validators(response, PROJECT_CATEGORIES_ETAG, None)
+        return response
 
     @action(detail=False)
     def years(self, request):
         """Returns all project years"""
-        years = Project.objects.values_list("year", flat=True).distinct()
-        return Response(sorted(years, reverse=True))
+
+        def build():
+            years = (
+                Project.objects.order_by("-year")
+                .values_list("year", flat=True)
+                .distinct()
+            )
+            return Response(list(years))
+
+        return self.cached_response(request, "years", build, dependencies=[Project])
 
     @action(detail=False)
     def tags(self, request):
         """Returns all project tags"""
-        tags = Tag.objects.all()
-        serializer = TagSerializer(tags, many=True)
-        return Response(serializer.data)
 
-    @action(detail=True)
-    def related(self, request, slug=None):
-        """Returns related projects for a specific project"""
-        project = self.get_object()
+        def build():
+            serializer = TagSerializer(Tag.objects.all(), many=True)
+            with serializing():
+                return Response(serializer.data)
 
-        # Find related projects based on same category and shared tags
-        same_category = Project.objects.filter(category=project.category).exclude(
-            id=project.id
-        )
-        projects_with_shared_tags = (
-            Project.objects.filter(tags__in=project.tags.all())
-            .exclude(id=project.id)
-            .distinct()
-        )
+        return self.cached_response(request, "tags", build, dependencies=[Tag])
 
-        # Combine and prioritize projects with both same category and shared tags
-        related = list(
-            same_category.filter(
-                id__in=projects_with_shared_tags.values_list("id", flat=True)
+    @action(detail=False)
+    def facets(self, request):
+        """
+        Returns project counts per category, year and tag for the current
+        filters and search, in three grouped queries.
+        """
+
+        def build():
+            filtered = self.filter_queryset(self.get_queryset())
+            projects = Project.objects.filter(pk__in=filtered.values("pk"))
+
+            category_counts = dict(
+                projects.order_by()
+                .values_list("category")
+                .annotate(count=Count("pk"))
+            )
+            years = (
+                projects.order_by("-year")
+                .values("year")
+                .annotate(count=Count("pk"))
+            )
+            tags = (
+                Tag.objects.filter(projects__in=projects)
+                .annotate(count=Count("projects"))
+                .order_by("name")
+                .values("id", "name", "slug", "count")
+            )
+            return Response(
+                {
+                    "categories": [
+                        dict(category, count=category_counts.get(category["id"], 0))
+                        for category in PROJECT_CATEGORIES
+                    ],
+                    "years": list(years),
+                    "tags": list(tags),
+                }
             )
-        )
 
-        # Add remaining projects with shared tags
-        for related_project in projects_with_shared_tags:
-            if related_project not in related:
-                related.append(related_project)
+        return self.cached_response(request, "facets", build)
 
-        # Add remaining projects with same category
-        for related_project in same_category:
-            if related_project not in related:
-                related.append(related_project)
+    @action(detail=True)
+    def related(self, request, slug=None):
+        """
+        Returns related projects for a specific project.
+        Accepts ``?limit=`` up to the size of the related projects index.
+        """
+        try:
+            limit = int(request.query_params.get("limit", RELATED_PROJECTS_LIMIT))
+        except ValueError:
+            raise ValidationError({"limit": "A valid integer is required."})
+        limit = max(1, min(limit, RELATED_PROJECTS_INDEX_SIZE))
 
-        # Limit to 5 related projects
-        related = related[:5]
+        project = self.get_object()
+        related = Project.objects.related_to(project).with_cover_image()[:limit]
 
         serializer = ProjectListSerializer(
             related, many=True, context={"request": request}
         )
-        return Response(serializer.data)
+        with serializing():
+            return Response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint for tags
     """
@@ -106,7 +227,7 @@ class TagViewSet(viewsets.ModelViewSet):
     lookup_field = "slug"
 
 
-class ProjectImageViewSet(viewsets.ModelViewSet):
+class ProjectImageViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint for project images
     """
@@ -120,7 +241,7 @@ class ProjectImageViewSet(viewsets.ModelViewSet):
         return context
 
 
-class PartnerViewSet(viewsets.ModelViewSet):
+class PartnerViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint for partners
     """
@@ -129,7 +250,7 @@ class PartnerViewSet(viewsets.ModelViewSet):
     serializer_class = PartnerSerializer
 
 
-class ProjectPhaseViewSet(viewsets.ModelViewSet):
+class ProjectPhaseViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint for project phases
     """
@@ -139,7 +260,7 @@ class ProjectPhaseViewSet(viewsets.ModelViewSet):
     filterset_fields = ["project", "complete"]
 
 
-class ProjectOutcomeViewSet(viewsets.ModelViewSet):
+class ProjectOutcomeViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """
     API endpoint for project outcomes
     """